@@ -1,7 +1,7 @@
 # authentication/admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, ProjectSubmission, Project, Team, Group
+from .models import User, ProjectSubmission, Project, Team, Group, BackgroundJob, ChatSession, VivaQuestionSet
 
 # Use a custom admin class to display the 'role' field
 class CustomUserAdmin(BaseUserAdmin):
@@ -15,6 +15,17 @@ class ProjectSubmissionAdmin(admin.ModelAdmin):
     list_filter = ('status', 'submitted_at')
     search_fields = ('title', 'student__username')
 
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'queue', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('queue', 'status', 'kind')
+
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'project', 'unsummarized_tokens', 'updated_at')
+
+class VivaQuestionSetAdmin(admin.ModelAdmin):
+    list_display = ('id', 'project', 'band', 'generated_at')
+    list_filter = ('band',)
+
 # Register the Group model we created
 admin.site.register(Group)
 
@@ -22,4 +33,7 @@ admin.site.register(Group)
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(ProjectSubmission, ProjectSubmissionAdmin)
 admin.site.register(Project)
-admin.site.register(Team)
\ No newline at end of file
+admin.site.register(Team)
+admin.site.register(BackgroundJob, BackgroundJobAdmin)
+admin.site.register(ChatSession, ChatSessionAdmin)
+admin.site.register(VivaQuestionSet, VivaQuestionSetAdmin)
@@ -0,0 +1,167 @@
+# authentication/chat.py
+"""
+Server-side chatbot conversations. Each prompt sent to Gemini carries:
+
+* the project context, built once per project and kept in the
+  CHAT_PROJECT_CONTEXT_CACHE cache, shared by all workers (dropped by
+  signals.py when the project or its submission changes),
+* the running summary of the older part of the conversation,
+* the most recent messages that fit in CHAT_HISTORY_TOKEN_BUDGET.
+
+When the messages not yet summarized grow past CHAT_SUMMARY_TRIGGER_TOKENS, a
+`summarize_chat` job folds the ones outside the window into the summary, so the
+prompt stays bounded however long the conversation gets.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from project_management import metrics
+
+from .jobs import claim, enqueue, run_job
+from .models import BackgroundJob, ChatMessage, ChatSession, Project
+
+SPEAKERS = {'user': 'Student', 'model': 'Assistant'}
+
+
+def estimate_tokens(text):
+    """Rough Gemini token count (about four characters per token), without an API call."""
+    return max(1, len(text) // 4)
+
+
+# --- Project context ---
+
+def _project_context_key(project_id):
+    return f'chat:project-context:{project_id}'
+
+
+def _context_cache():
+    return caches[settings.CHAT_PROJECT_CONTEXT_CACHE]
+
+
+def project_context(project_id):
+    context = _context_cache().get(_project_context_key(project_id))
+    metrics.record_cache('chat_project_context', context is not None)
+    if context is None:
+        project = Project.objects.select_related('submission').get(id=project_id)
+        submission = project.submission
+        lines = [
+            f"Title: {project.title}",
+            f"Category: {project.category}",
+            f"Status: {project.status} ({project.progress_percentage}% complete)",
+            f"Abstract: {' '.join(project.abstract.split())[:settings.CHAT_PROJECT_CONTEXT_MAX_CHARS]}",
+        ]
+        if submission.relevance_score is not None:
+            lines.append(
+                f"Scores: relevance {submission.relevance_score}, feasibility {submission.feasibility_score}, "
+                f"innovation {submission.innovation_score}"
+            )
+        context = '\n'.join(lines)
+        _context_cache().set(_project_context_key(project_id), context, settings.CHAT_PROJECT_CONTEXT_TTL)
+    return context
+
+
+def invalidate_project_context(project_id):
+    _context_cache().delete(_project_context_key(project_id))
+
+
+# --- Sessions ---
+
+def accessible_projects(user):
+    if user.role in ('Teacher', 'HOD/Admin'):
+        return Project.objects.all()
+    return Project.objects.filter(Q(submission__student=user) | Q(team__members=user)).distinct()
+
+
+def open_session(user, session_id=None, project_id=None):
+    """
+    Returns the user's session `session_id`, or a new one (about `project_id`
+    if given). Raises ChatSession.DoesNotExist / Project.DoesNotExist.
+    """
+    if session_id:
+        return ChatSession.objects.get(id=session_id, user=user)
+    project = accessible_projects(user).get(id=project_id) if project_id else None
+    return ChatSession.objects.create(user=user, project=project)
+
+
+def _window(session):
+    """The newest unsummarized messages that fit in the token budget, oldest first."""
+    messages = (
+        session.messages.filter(id__gt=session.summarized_through)
+        .order_by('-id').values_list('id', 'role', 'content', 'token_count')
+    )
+    window, used = [], 0
+    for message in messages.iterator():
+        if used + message[3] > settings.CHAT_HISTORY_TOKEN_BUDGET:
+            break
+        window.append(message)
+        used += message[3]
+    return window[::-1]
+
+
+def _transcript(messages):
+    return '\n'.join(f"{SPEAKERS[role]}: {content}" for _, role, content, _ in messages)
+
+
+def conversation_history(session):
+    """Context sent ahead of the new prompt: project, summary and recent messages."""
+    parts = []
+    if session.project_id:
+        parts.append(f"Project the student is working on:\n{project_context(session.project_id)}")
+    if session.summary:
+        parts.append(f"Summary of the earlier conversation:\n{session.summary}")
+    window = _window(session)
+    if window:
+        parts.append(f"Recent messages:\n{_transcript(window)}")
+    return '\n\n'.join(parts)
+
+
+def record_exchange(session, prompt, answer):
+    """Stores a prompt and its answer; schedules a summary once enough history builds up."""
+    messages = [
+        ChatMessage(session=session, role='user', content=prompt, token_count=estimate_tokens(prompt)),
+        ChatMessage(session=session, role='model', content=answer, token_count=estimate_tokens(answer)),
+    ]
+    with transaction.atomic():
+        ChatMessage.objects.bulk_create(messages)
+        ChatSession.objects.filter(id=session.id).update(
+            unsummarized_tokens=F('unsummarized_tokens') + sum(m.token_count for m in messages),
+            updated_at=timezone.now(),
+        )
+        session.refresh_from_db(fields=['unsummarized_tokens'])
+
+    if session.unsummarized_tokens < settings.CHAT_SUMMARY_TRIGGER_TOKENS:
+        return
+    pending = BackgroundJob.objects.filter(
+        kind='summarize_chat', payload__session_id=session.id, status__in=('Queued', 'Running'),
+    ).exists()
+    if not pending:
+        job = enqueue('summarize_chat', {'session_id': session.id})
+        if not settings.ANALYSIS_ASYNC:
+            run_job(claim(job.id, 'inline'))
+
+
+def summarize_session(session_id):
+    """Folds the messages outside the window into the session summary."""
+    # Imported here: signals.py loads this module before the analyzer is needed
+    from project_management.project_analyzer import analyzer
+
+    session = ChatSession.objects.get(id=session_id)
+    window = _window(session)
+    older = session.messages.filter(id__gt=session.summarized_through)
+    if window:
+        older = older.filter(id__lt=window[0][0])
+    older = list(older.order_by('id').values_list('id', 'role', 'content', 'token_count'))
+    if not older:
+        return {'summarized': 0}
+
+    summary = analyzer.summarize_conversation(session.summary, _transcript(older))
+    # The filter on summarized_through skips the update if another run got there first
+    updated = ChatSession.objects.filter(id=session.id, summarized_through=session.summarized_through).update(
+        summary=summary[:settings.CHAT_SUMMARY_MAX_CHARS],
+        summarized_through=older[-1][0],
+        unsummarized_tokens=F('unsummarized_tokens') - sum(m[3] for m in older),
+    )
+    return {'summarized': len(older) if updated else 0}
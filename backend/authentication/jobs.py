@@ -0,0 +1,203 @@
+# authentication/jobs.py
+"""
+A small database-backed job queue, so slow work (LLM calls) runs outside
+the web workers without needing an external broker.
+
+Handlers are registered by name with ``@register('kind')`` and receive the
+job row. Raising ``RetryJob`` (or any other exception) schedules a retry with
+exponential backoff until ``max_attempts`` is reached; after the last attempt
+the job is marked Failed and the handler's ``on_failure`` hook runs.
+
+A claimed job is leased to its worker: the lease is renewed while the
+handler runs, and a job whose lease ran out (its worker died) is requeued.
+The outcome is only written while the worker still holds the lease.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from project_management import metrics
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+class RetryJob(Exception):
+    """Raised by a handler to request another attempt."""
+
+
+def register(kind, on_failure=None):
+    """Registers a job handler under ``kind``."""
+    def decorator(func):
+        HANDLERS[kind] = (func, on_failure)
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, queue='analysis', max_attempts=None, delay=0):
+    """Adds a job to the queue and returns it."""
+    return BackgroundJob.objects.create(
+        queue=queue,
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts or settings.JOB_QUEUE['MAX_ATTEMPTS'],
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_many(kind, payloads, queue='analysis', max_attempts=None):
+    """enqueue for several jobs of one kind, in one INSERT."""
+    now = timezone.now()
+    return BackgroundJob.objects.bulk_create([
+        BackgroundJob(
+            queue=queue, kind=kind, payload=payload, run_after=now,
+            max_attempts=max_attempts or settings.JOB_QUEUE['MAX_ATTEMPTS'],
+        )
+        for payload in payloads
+    ])
+
+
+def requeue_stale_jobs(queue):
+    """Puts back jobs whose worker died while holding them (their lease was not renewed)."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_QUEUE['LEASE_SECONDS'])
+    return BackgroundJob.objects.filter(
+        queue=queue, status='Running', locked_at__lt=cutoff
+    ).update(status='Queued', locked_by='', locked_at=None)
+
+
+def claim_next(queue, worker_id):
+    """
+    Atomically claims the oldest runnable job in ``queue``. The claim is a
+    conditional UPDATE (status must still be Queued), which is safe across
+    processes on both SQLite and PostgreSQL.
+    """
+    candidates = BackgroundJob.objects.filter(
+        queue=queue, status='Queued', run_after__lte=timezone.now()
+    ).order_by('run_after', 'id').values_list('id', flat=True)[:10]
+
+    for job_id in candidates:
+        job = claim(job_id, worker_id)
+        if job is not None:
+            return job
+    return None
+
+
+def claim(job_id, worker_id):
+    """Claims a specific queued job; returns None if another worker got it first."""
+    claimed = BackgroundJob.objects.filter(id=job_id, status='Queued').update(
+        status='Running', locked_by=worker_id, locked_at=timezone.now(), attempts=F('attempts') + 1,
+    )
+    return BackgroundJob.objects.get(id=job_id) if claimed else None
+
+
+def wait_for_job(job, timeout, poll_interval=0.25):
+    """Polls until ``job`` finishes or ``timeout`` seconds pass; returns the refreshed row."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job.refresh_from_db(fields=['status', 'result', 'last_error'])
+        if job.status in ('Succeeded', 'Failed') or time.monotonic() >= deadline:
+            return job
+        time.sleep(poll_interval)
+
+
+async def await_job(job, timeout, poll_interval=0.25):
+    """wait_for_job for async views: no thread is held between polls."""
+    deadline = time.monotonic() + timeout
+    while True:
+        await job.arefresh_from_db(fields=['status', 'result', 'last_error'])
+        if job.status in ('Succeeded', 'Failed') or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(poll_interval)
+
+
+def _backoff_seconds(attempts):
+    base = settings.JOB_QUEUE['RETRY_BACKOFF_SECONDS']
+    return base * (2 ** (attempts - 1)) * (1 + random.random())
+
+
+def _held(job):
+    """The job row while ``job``'s worker still holds the lease (a new claim changes ``attempts``)."""
+    return BackgroundJob.objects.filter(id=job.id, status='Running', locked_by=job.locked_by, attempts=job.attempts)
+
+
+class LeaseHeartbeat(threading.Thread):
+    """Renews the lease of a running job every third of LEASE_SECONDS until stopped."""
+
+    def __init__(self, job):
+        super().__init__(name=f'job-{job.id}-lease', daemon=True)
+        self.job = job
+        self.interval = settings.JOB_QUEUE['LEASE_SECONDS'] / 3
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                if not _held(self.job).update(locked_at=timezone.now()):
+                    return  # the lease was lost; the final write will be skipped
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _release(job):
+    """Writes the outcome of ``job`` and releases its lease; False if the lease was lost."""
+    held = _held(job)
+    job.locked_by, job.locked_at, job.updated_at = '', None, timezone.now()
+    return held.update(
+        result=job.result, status=job.status, last_error=job.last_error, run_after=job.run_after,
+        locked_by='', locked_at=None, updated_at=job.updated_at,
+    ) == 1
+
+
+def run_job(job):
+    """Executes a claimed job and records its outcome."""
+    start = time.perf_counter()
+    metrics.JOB_QUEUE_WAIT_SECONDS.labels(job.kind).observe(max((timezone.now() - job.run_after).total_seconds(), 0))
+    try:
+        handler, on_failure = HANDLERS[job.kind]
+    except KeyError:
+        job.status = 'Failed'
+        job.last_error = f"No handler registered for '{job.kind}'."
+        _release(job)
+        return job
+
+    heartbeat = LeaseHeartbeat(job)
+    heartbeat.start()
+    try:
+        job.result = handler(job)
+        job.status = 'Succeeded'
+        job.last_error = ''
+    except Exception as e:
+        job.last_error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        if job.attempts < job.max_attempts:
+            job.status = 'Queued'
+            job.run_after = timezone.now() + timedelta(seconds=_backoff_seconds(job.attempts))
+        else:
+            job.status = 'Failed'
+    finally:
+        heartbeat.stop()
+
+    if not _release(job):
+        logger.warning("Job %s (%s) lost its lease while running; its outcome was discarded.", job.id, job.kind)
+        return job
+    if job.status == 'Failed':
+        if on_failure:
+            on_failure(job)
+        logger.warning("Job %s (%s) failed after %s attempts: %s", job.id, job.kind, job.attempts, job.last_error)
+    metrics.JOB_SECONDS.labels(job.kind, job.status.lower()).observe(time.perf_counter() - start)
+    return job
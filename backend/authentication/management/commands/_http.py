@@ -0,0 +1,106 @@
+"""HTTP requests against the ASGI and WSGI handlers or a running server, shared by the benchmark commands."""
+import asyncio
+import json
+import time
+from http.client import HTTPConnection
+from io import BytesIO
+from urllib.parse import urlsplit
+
+
+async def asgi_post(application, path, token, payload):
+    """
+    POSTs ``payload`` as JSON to the ASGI application, as uvicorn would.
+    Returns (status, ms to the first body byte, ms to the end of the body).
+    """
+    return await asgi_request(application, 'POST', path, token, payload)
+
+
+async def asgi_request(application, method, path, token, payload=None):
+    """asgi_post for any method; ``payload`` None sends no body."""
+    body = b'' if payload is None else json.dumps(payload).encode()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '',
+        'headers': [
+            (b'host', b'localhost'),
+            (b'authorization', f'Bearer {token}'.encode()),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    sent = False
+    disconnect = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    start = time.perf_counter()
+    marks = {}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            marks['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            if message.get('body') and 'first' not in marks:
+                marks['first'] = time.perf_counter()
+            if not message.get('more_body'):
+                marks['end'] = time.perf_counter()
+
+    await application(scope, receive, send)
+    disconnect.set()
+    end = marks['end']
+    return marks['status'], (marks.get('first', end) - start) * 1000, (end - start) * 1000
+
+
+def wsgi_post(application, path, token, payload):
+    """POSTs ``payload`` as JSON to the WSGI application; returns (status, ms)."""
+    body = json.dumps(payload).encode()
+    environ = {
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': path,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'HTTP_AUTHORIZATION': f'Bearer {token}',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': BytesIO(),
+        'wsgi.url_scheme': 'http',
+    }
+    status = {}
+    start = time.perf_counter()
+    response = application(environ, lambda line, headers: status.update(line=line))
+    b''.join(response)
+    return int(status['line'].split()[0]), (time.perf_counter() - start) * 1000
+
+
+def http_request(base_url, method, path, token, payload=None, timeout=120):
+    """
+    Sends the request to a running server at ``base_url`` (blocking).
+    Returns (status, ms to the first body byte, ms to the end of the body).
+    """
+    parts = urlsplit(base_url)
+    body = None if payload is None else json.dumps(payload).encode()
+    headers = {'Authorization': f'Bearer {token}'}
+    if body is not None:
+        headers['Content-Type'] = 'application/json'
+    connection = HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    start = time.perf_counter()
+    try:
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        response.read(1)
+        first = time.perf_counter()
+        response.read()
+    finally:
+        connection.close()
+    end = time.perf_counter()
+    return response.status, (first - start) * 1000, (end - start) * 1000
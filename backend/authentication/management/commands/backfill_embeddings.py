@@ -0,0 +1,51 @@
+"""
+Computes embeddings for submissions that were stored without one.
+
+    python manage.py backfill_embeddings [--all]
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from authentication.models import ProjectSubmission
+from project_management.embeddings import get_embedder
+
+
+class Command(BaseCommand):
+    help = "Fills ProjectSubmission.embedding_vector using the configured embedding backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-encode every submission.")
+        parser.add_argument('--batch-size', type=int, default=256)
+
+    def handle(self, *args, **options):
+        embedder = get_embedder()
+        queryset = ProjectSubmission.objects.order_by('id')
+        if not options['all']:
+            # Missing vectors, or vectors produced by a different backend/version
+            queryset = queryset.filter(
+                Q(embedding_vector__isnull=True) | ~Q(embedding_model=embedder.model_version)
+            )
+
+        updated = 0
+        batch = []
+        for submission in queryset.only('id', 'title', 'abstract_text').iterator(chunk_size=options['batch_size']):
+            batch.append(submission)
+            if len(batch) >= options['batch_size']:
+                updated += self._encode(embedder, batch)
+                batch = []
+        if batch:
+            updated += self._encode(embedder, batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Encoded {updated} submissions with {embedder.model_version}."))
+
+    def _encode(self, embedder, batch):
+        vectors = embedder.encode([s.abstract_text or s.title for s in batch])
+        now = timezone.now()
+        for submission, vector in zip(batch, vectors):
+            submission.set_embedding(vector, embedder.model_version)
+            submission.updated_at = now  # bulk_update does not apply auto_now
+        ProjectSubmission.objects.bulk_update(batch, [
+            'embedding_vector', 'embedding_dim', 'embedding_dtype', 'embedding_scale', 'embedding_model', 'updated_at',
+        ])
+        return len(batch)
@@ -0,0 +1,104 @@
+"""
+Load test for the AI endpoints: how many concurrent requests one web worker
+holds open under the ASGI deployment (async views on uvicorn) compared with
+the sync WSGI deployment (gunicorn sync or gthread workers).
+
+    python manage.py bench_ai_concurrency --requests 100 --llm-latency 1.0 --sync-threads 1 4
+
+All ``--requests`` are sent at once. The WSGI deployment is modelled as a
+pool of ``--sync-threads`` threads (1 for a gunicorn sync worker), each
+holding a request until Gemini answers; the ASGI deployment runs every
+request on one event loop. Gemini is replaced by a stub that sleeps for
+``--llm-latency`` seconds; "held open" is the peak number of Gemini calls
+waiting at once. The LLM rate and concurrency limits are lifted to measure
+the worker itself (see bench_llm_limits for those). Rows created by the
+benchmark are deleted at the end.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.asgi import get_asgi_application
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import ProjectSubmission, User
+from project_management.llm_limits import LLMGate
+from project_management.llm_transport import StubGenerativeModel
+from project_management.project_analyzer import analyzer
+from ._http import asgi_post, wsgi_post
+
+ENDPOINTS = {
+    'viva': ('/ai/viva/', lambda submission, i: {'project_id': submission.id}),
+    'evaluate': ('/ai/viva/evaluate/', lambda submission, i: {
+        'project_id': submission.id, 'question': 'What sensors do you use?', 'answer': f'Soil moisture sensors ({i}).',
+    }),
+    'chat': ('/ai/chat/', lambda submission, i: {'prompt': f'How do I calibrate sensor {i}?'}),
+}
+
+
+class Command(BaseCommand):
+    help = "Compares concurrent AI requests held open per worker under ASGI vs sync WSGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--llm-latency', type=float, default=1.0)
+        parser.add_argument('--sync-threads', type=int, nargs='+', default=[1, 4])
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='viva')
+
+    def handle(self, *args, **options):
+        original_model, original_cache, original_gate = analyzer.llm_model, analyzer.cache, analyzer.gate
+        analyzer.cache = None
+        analyzer.gate = LLMGate(None, options['requests'], queue_timeout=60)
+        student = User.objects.create(username='bench-ai-load', role='Student')
+        # Distinct projects, so identical prompts are not coalesced into one call
+        submissions = [
+            ProjectSubmission.objects.create(
+                student=student, title=f'Load test project {i}', abstract_text='A smart irrigation system using soil sensors.',
+            )
+            for i in range(options['requests'])
+        ]
+        path, payload = ENDPOINTS[options['endpoint']]
+        payloads = [payload(submission, i) for i, submission in enumerate(submissions)]
+        token = str(AccessToken.for_user(student))
+        try:
+            self.stdout.write(
+                f"{'deployment':>14} {'requests':>9} {'held open':>10} {'wall s':>7} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8}"
+            )
+            for threads in options['sync_threads']:
+                analyzer.llm_model = StubGenerativeModel(options['llm_latency'])
+                application = WSGIHandler()
+                start = time.perf_counter()
+
+                def queued_post(body):
+                    # Latency includes the wait for a free thread, as a client would see it
+                    status, _ = wsgi_post(application, path, token, body)
+                    return status, (time.perf_counter() - start) * 1000
+
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    results = list(pool.map(queued_post, payloads))
+                self._report(f'wsgi x{threads}', results, time.perf_counter() - start)
+
+            analyzer.llm_model = StubGenerativeModel(options['llm_latency'])
+            application = get_asgi_application()
+            start = time.perf_counter()
+            results = asyncio.run(self._asgi_load(application, path, token, payloads))
+            self._report('asgi', results, time.perf_counter() - start)
+        finally:
+            analyzer.llm_model, analyzer.cache, analyzer.gate = original_model, original_cache, original_gate
+            student.delete()
+
+    async def _asgi_load(self, application, path, token, payloads):
+        results = await asyncio.gather(*(asgi_post(application, path, token, body) for body in payloads))
+        return [(status, total) for status, _, total in results]
+
+    def _report(self, deployment, results, wall):
+        statuses = {status for status, _ in results}
+        assert statuses == {200}, statuses
+        latencies = [ms for _, ms in results]
+        self.stdout.write(
+            f"{deployment:>14} {len(results):>9} {analyzer.llm_model.peak_in_flight:>10} {wall:>7.1f} "
+            f"{len(results) / wall:>7.1f} {np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 95):>8.0f}"
+        )
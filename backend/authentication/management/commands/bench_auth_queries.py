@@ -0,0 +1,83 @@
+"""
+Compares queries and latency per request when authenticating with a plain
+access token (user and group memberships loaded from the database) and with
+an access token carrying role and group claims (see authentication/tokens.py).
+
+    python manage.py bench_auth_queries --requests 200
+
+All rows created by the benchmark are rolled back at the end.
+"""
+import logging
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import Group, ProjectSubmission, User
+from authentication.tokens import ClaimsRefreshToken
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measures queries and latency per request with plain vs claims-carrying JWTs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        teacher = User.objects.create(username='bench-auth-teacher', role='Teacher')
+        student = User.objects.create(username='bench-auth-student', role='Student')
+        group = Group.objects.create(name='bench-auth-group')
+        group.teachers.add(teacher)
+        group.students.add(student)
+        submission = ProjectSubmission.objects.create(
+            student=student, group=group, title='Bench auth project', abstract_text='Abstract', status='Submitted',
+        )
+        other = ProjectSubmission.objects.create(student=student, title='Ungrouped project', abstract_text='Abstract')
+
+        endpoints = [
+            # (name, user, method, path, body)
+            ('analytics', teacher, 'get', '/analytics/', None),
+            ('teacher appointed', teacher, 'get', '/teacher/appointed/', None),
+            ('teacher unappointed', teacher, 'get', '/teacher/unappointed/', None),
+            ('review (forbidden)', teacher, 'patch', f'/teacher/submissions/{other.id}/', {'status': 'Approved'}),
+            ('student submissions', student, 'get', '/student/submissions/', None),
+            ('submission analysis', student, 'get', f'/projects/submit/{submission.id}/analysis/', None),
+        ]
+        tokens = {
+            'plain': {user.id: str(AccessToken.for_user(user)) for user in (teacher, student)},
+            'claims': {user.id: str(ClaimsRefreshToken.for_user(user).access_token) for user in (teacher, student)},
+        }
+
+        client = APIClient(HTTP_HOST='localhost')
+        logging.getLogger('django.request').setLevel(logging.ERROR)  # the forbidden review logs a warning
+        self.stdout.write(f"{'endpoint':>20} {'token':>7} {'queries':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, user, method, path, body in endpoints:
+            for kind in ('plain', 'claims'):
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens[kind][user.id]}')
+                timings = []
+                for _ in range(options['requests']):
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        response = getattr(client, method)(path, body, format='json')
+                        timings.append((time.perf_counter() - start) * 1000)
+                    assert response.status_code in (200, 403), (path, response.status_code)
+                self.stdout.write(
+                    f"{name:>20} {kind:>7} {len(queries):>8} "
+                    f"{np.percentile(timings, 50):>8.2f} {np.percentile(timings, 95):>8.2f}"
+                )
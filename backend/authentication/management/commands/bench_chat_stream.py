@@ -0,0 +1,64 @@
+"""
+Compares time to first byte and total time of the buffered chatbot endpoint
+(POST /ai/chat/) with the streamed one (POST /ai/chat/stream/) under
+concurrent requests.
+
+    python manage.py bench_chat_stream --concurrency 20 --llm-latency 0.8 --chunk-latency 0.05
+
+Requests are sent straight to the ASGI application, as uvicorn would; the
+buffered endpoint answers only once Gemini has finished. Gemini is replaced by a stub that waits ``--llm-latency`` for the
+first chunk and ``--chunk-latency`` per further word. The benchmark user is
+deleted at the end.
+"""
+import asyncio
+
+import numpy as np
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import User
+from project_management.latency import latency_summaries
+from project_management.llm_transport import StubGenerativeModel
+from project_management.project_analyzer import analyzer
+from ._http import asgi_post
+
+
+class Command(BaseCommand):
+    help = "Measures TTFB and total latency of the buffered vs streamed chatbot endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10])
+        parser.add_argument('--llm-latency', type=float, default=0.8)
+        parser.add_argument('--chunk-latency', type=float, default=0.05)
+
+    def handle(self, *args, **options):
+        original_model, original_cache = analyzer.llm_model, analyzer.cache
+        analyzer.llm_model = StubGenerativeModel(options['llm_latency'], options['chunk_latency'])
+        analyzer.cache = None
+        student = User.objects.create(username='bench-chat', role='Student')
+        try:
+            token = str(AccessToken.for_user(student))
+            application = get_asgi_application()
+            self.stdout.write(f"{'endpoint':>16} {'streams':>8} {'TTFB p50':>9} {'TTFB p95':>9} {'total p50':>10} {'total p95':>10}")
+            for path in ('/ai/chat/', '/ai/chat/stream/'):
+                for concurrency in options['concurrency']:
+                    results = asyncio.run(self._load(application, path, token, concurrency))
+                    ttfb, total = zip(*results)
+                    self.stdout.write(
+                        f"{path:>16} {concurrency:>8} {np.percentile(ttfb, 50):>9.0f} {np.percentile(ttfb, 95):>9.0f} "
+                        f"{np.percentile(total, 50):>10.0f} {np.percentile(total, 95):>10.0f}"
+                    )
+            for name, summary in latency_summaries().items():
+                self.stdout.write(f"{name}: {summary}")
+        finally:
+            analyzer.llm_model, analyzer.cache = original_model, original_cache
+            student.delete()
+
+    async def _load(self, application, path, token, concurrency):
+        results = await asyncio.gather(*(
+            asgi_post(application, path, token, {'prompt': f"Explain question {i} about IoT sensors."})
+            for i in range(concurrency)
+        ))
+        assert all(status == 200 for status, _, _ in results), [status for status, _, _ in results]
+        return [(ttfb, total) for _, ttfb, total in results]
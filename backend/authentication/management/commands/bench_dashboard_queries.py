@@ -0,0 +1,160 @@
+"""
+Checks with EXPLAIN that every dashboard query is served by an index, and
+times each query with and without the dashboard indexes.
+
+    python manage.py bench_dashboard_queries --submissions 50000
+
+Works on SQLite and PostgreSQL. A query fails the check when the plan reads
+all of submissions or projects: a full table scan followed by a sort (a scan
+in index order that stops at the LIMIT is fine). All rows created by the
+benchmark (and the temporarily dropped indexes) are rolled back at the end.
+"""
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from authentication.models import Group, Project, ProjectSubmission, User
+
+
+class _Rollback(Exception):
+    pass
+
+
+WATCHED_TABLES = {ProjectSubmission._meta.db_table, Project._meta.db_table}
+
+# SQLite: "SCAN <table>" without "USING ... INDEX"; PostgreSQL: "Seq Scan on <table>"
+FULL_SCAN_PATTERNS = (
+    re.compile(r'\bSCAN (\w+)(?: AS \w+)?\s*$'),
+    re.compile(r'Seq Scan on (\w+)'),
+)
+SORT_PATTERN = re.compile(r'USE TEMP B-TREE FOR ORDER BY|\bSort\b')
+
+
+def full_scans(plan):
+    """Returns the watched tables the plan reads in full before sorting."""
+    tables = set()
+    if not SORT_PATTERN.search(plan):
+        return tables
+    for line in plan.splitlines():
+        for pattern in FULL_SCAN_PATTERNS:
+            match = pattern.search(line)
+            if match and match.group(1) in WATCHED_TABLES:
+                tables.add(match.group(1))
+    return tables
+
+
+class Command(BaseCommand):
+    help = "EXPLAINs the dashboard queries at scale and fails if any of them does a full table scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=50000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--show-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                failures = self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        if failures:
+            raise CommandError(f"Full table scans in: {', '.join(failures)}")
+
+    def _fixture(self, options):
+        count = options['submissions']
+        teacher = User.objects.create(username='bench-teacher', role='Teacher')
+        groups = Group.objects.bulk_create([Group(name=f'bench-group-{i}') for i in range(options['groups'])])
+        groups[0].teachers.add(teacher)
+        students = User.objects.bulk_create(
+            [User(username=f'bench-student-{i}', role='Student') for i in range(max(1, count // 5))]
+        )
+        statuses = [s for s, _ in ProjectSubmission.STATUS_CHOICES]
+        submissions = ProjectSubmission.objects.bulk_create([
+            ProjectSubmission(
+                student=students[i % len(students)], group=groups[i % len(groups)],
+                title=f'Bench project {i}', abstract_text='Abstract', status=statuses[i % len(statuses)],
+                innovation_score=i % 10, relevance_score=i % 7, feasibility_score=i % 5,
+            )
+            for i in range(count)
+        ], batch_size=2000)
+        project_statuses = [s for s, _ in Project.STATUS_CHOICES]
+        Project.objects.bulk_create([
+            Project(submission=s, title=s.title, abstract='Abstract', status=project_statuses[i % len(project_statuses)])
+            for i, s in enumerate(submissions) if s.status in ('Approved', 'Completed', 'Archived')
+        ], batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return teacher, students[0]
+
+    def _queries(self, teacher, student):
+        """The querysets behind each dashboard, as built by the views."""
+        recent = ('-submitted_at', '-id')
+        teacher_groups = teacher.teaching_groups.all()
+        return {
+            'teacher submissions': ProjectSubmission.objects.select_related('student', 'group').order_by(*recent),
+            'student dashboard': ProjectSubmission.objects.filter(student=student).order_by(*recent),
+            'alumni portal': ProjectSubmission.objects.filter(
+                student=student, status__in=['Completed', 'Archived']
+            ).order_by(*recent),
+            'appointed': ProjectSubmission.objects.filter(
+                group__in=teacher_groups, status='Submitted'
+            ).select_related('student', 'group').order_by(*recent),
+            'unappointed': ProjectSubmission.objects.filter(
+                ~Q(group__in=teacher_groups)
+            ).select_related('student', 'group').order_by(*recent),
+            'top alumni': ProjectSubmission.objects.filter(
+                status__in=['Completed', 'Archived']
+            ).order_by('-innovation_score', '-relevance_score', '-feasibility_score'),
+            'approved projects': Project.objects.filter(
+                status__in=['In Progress', 'Completed', 'Archived']
+            ).order_by('-id'),
+            'analytics top innovative': Project.objects.filter(
+                status='Completed'
+            ).order_by('-submission__innovation_score'),
+        }
+
+    def _time(self, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset[:50])
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)[len(timings) // 2]
+
+    def _drop_indexes(self):
+        with connection.cursor() as cursor:
+            for model in (ProjectSubmission, Project):
+                for index in model._meta.indexes:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+
+    def _run(self, options):
+        start = time.perf_counter()
+        teacher, student = self._fixture(options)
+        self.stdout.write(f"fixture: {options['submissions']} submissions in {time.perf_counter() - start:.1f}s")
+
+        queries = self._queries(teacher, student)
+        failures, indexed = [], {}
+        for name, queryset in queries.items():
+            plan = queryset[:50].explain()
+            scans = full_scans(plan)
+            if scans:
+                failures.append(name)
+            if options['show_plans']:
+                self.stdout.write(f"--- {name}\n{plan}")
+            indexed[name] = (self._time(queryset, options['repeat']), scans)
+
+        self._drop_indexes()
+        self.stdout.write(f"{'query':>26} {'plan':>6} {'indexed ms':>11} {'no index ms':>12}")
+        for name, queryset in queries.items():
+            elapsed, scans = indexed[name]
+            plan = 'SCAN' if scans else 'INDEX'
+            self.stdout.write(
+                f"{name:>26} {plan:>6} {elapsed:>11.2f} {self._time(queryset, options['repeat']):>12.2f}"
+            )
+        return failures
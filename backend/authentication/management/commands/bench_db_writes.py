@@ -0,0 +1,153 @@
+"""
+Concurrent write load test for the configured database.
+
+    python manage.py bench_db_writes --threads 8 --seconds 10
+    DATABASE_URL=postgres://... python manage.py bench_db_writes --threads 8 --seconds 10
+
+Each thread has its own connection and loops over the two writes that
+collide in production: creating a submission and saving a progress update
+on a project. Run it once per backend to compare throughput. On SQLite,
+``--sqlite-profiles legacy wal`` also compares the previous settings
+(rollback journal, deferred transactions) with the WAL configuration.
+
+On SQLite the benchmark runs on a freshly migrated database in a temporary
+file, so the configured database keeps its journal mode and gets no rows.
+On PostgreSQL the rows it creates are deleted at the end.
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from authentication.models import Group, Project, ProjectSubmission, User
+from project_management.database import sqlite_config
+
+# Connection OPTIONS for each SQLite profile; each sets the journal mode it measures
+SQLITE_PROFILES = {
+    'legacy': {'timeout': 5, 'init_command': 'PRAGMA journal_mode=DELETE;'},
+    'wal': sqlite_config('', wal=True)['OPTIONS'],
+}
+
+
+class Command(BaseCommand):
+    help = "Measures concurrent write throughput (submissions + progress updates) on the configured database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--projects', type=int, default=50)
+        parser.add_argument(
+            '--sqlite-profiles', nargs='+', choices=sorted(SQLITE_PROFILES), default=None,
+            help="SQLite settings to compare (ignored on PostgreSQL).",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            with self._scratch_sqlite():
+                self._bench(options)
+        else:
+            self._bench(options)
+
+    @contextmanager
+    def _scratch_sqlite(self):
+        """Points the default connection (and the worker threads) at a new, migrated SQLite file."""
+        configured = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            connections.close_all()
+            connection.settings_dict['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            try:
+                call_command('migrate', verbosity=0, interactive=False)
+                yield
+            finally:
+                connections.close_all()
+                connection.settings_dict['NAME'] = configured
+
+    def _bench(self, options):
+        student, group, project_ids = self._setup(options['projects'])
+        configured = dict(connection.settings_dict.get('OPTIONS', {}))
+        profiles = options['sqlite_profiles'] if connection.vendor == 'sqlite' and options['sqlite_profiles'] else [None]
+        try:
+            self.stdout.write(f"backend: {connection.vendor} ({connection.settings_dict['NAME']})")
+            self.stdout.write(
+                f"{'profile':>8} {'threads':>8} {'writes/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'lock errors':>12}"
+            )
+            for profile in profiles:
+                # Worker threads open new connections from the shared settings dict
+                connection.settings_dict['OPTIONS'] = SQLITE_PROFILES.get(profile) or dict(configured)
+                connections.close_all()
+                connection.ensure_connection()
+                for threads in options['threads']:
+                    result = self._load(threads, options['seconds'], student, group, project_ids)
+                    self._report(profile or '-', threads, result)
+        finally:
+            connection.settings_dict['OPTIONS'] = configured
+            connections.close_all()
+            User.objects.filter(username='bench-writer').delete()
+            Group.objects.filter(name='bench-writes').delete()
+
+    def _setup(self, count):
+        student = User.objects.create(username='bench-writer', role='Student')
+        group = Group.objects.create(name='bench-writes')
+        project_ids = []
+        for i in range(count):
+            submission = ProjectSubmission.objects.create(
+                student=student, group=group, title=f'Bench write project {i}', abstract_text='Abstract',
+                status='Approved',
+            )
+            project_ids.append(Project.objects.create(submission=submission, title=submission.title, abstract='A').id)
+        return student, group, project_ids
+
+    def _load(self, threads, seconds, student, group, project_ids):
+        deadline = time.perf_counter() + seconds
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local_latencies, local_errors = [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            if rng.random() < 0.5:
+                                ProjectSubmission.objects.create(
+                                    student=student, group=group, title='Bench write', abstract_text='Abstract',
+                                )
+                            else:
+                                project = Project.objects.get(id=rng.choice(project_ids))
+                                project.progress_percentage = rng.randint(0, 100)
+                                project.save()
+                    except OperationalError:
+                        local_errors += 1
+                        continue
+                    local_latencies.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(local_latencies)
+                errors.append(local_errors)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return latencies, sum(errors), seconds
+
+    def _report(self, mode, threads, result):
+        latencies, errors, seconds = result
+        if not latencies:
+            self.stdout.write(f"{mode:>8} {threads:>8} {0:>10.1f} {'-':>8} {'-':>8} {errors:>12}")
+            return
+        self.stdout.write(
+            f"{mode:>8} {threads:>8} {len(latencies) / seconds:>10.1f} {np.percentile(latencies, 50):>8.1f} "
+            f"{np.percentile(latencies, 99):>8.1f} {errors:>12}"
+        )
@@ -0,0 +1,78 @@
+"""
+Compares storage size and load time of JSON vs binary embeddings.
+
+    python manage.py bench_embedding_storage --rows 10000 --dim 768
+    python manage.py bench_embedding_storage --archive
+
+``--archive`` also times loading the real archive from the database.
+"""
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from authentication.models import ProjectSubmission
+from project_management.vector_codec import pack_vector, stack_vectors
+
+
+class Command(BaseCommand):
+    help = "Reports bytes per archive and matrix load time for each embedding encoding."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--dim', type=int, default=768)
+        parser.add_argument('--archive', action='store_true', help="Also load the archive from the database.")
+
+    def handle(self, *args, **options):
+        rows, dim = options['rows'], options['dim']
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((rows, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        self.stdout.write(f"{rows} vectors x {dim} dims")
+        self.stdout.write(f"{'encoding':>8} {'total MB':>9} {'bytes/row':>10} {'load ms':>9} {'max err':>9}")
+
+        # JSON float lists (the previous JSONField layout)
+        texts = [json.dumps(v.tolist()) for v in vectors]
+        start = time.perf_counter()
+        matrix = np.array([json.loads(t) for t in texts], dtype=np.float32)
+        self._row('json', sum(len(t) for t in texts), rows, start, matrix, vectors)
+
+        for dtype in ('float32', 'int8'):
+            packed = [pack_vector(v, dtype) for v in vectors]
+            blobs = [p[0] for p in packed]
+            scales = [p[1] for p in packed]
+            start = time.perf_counter()
+            matrix = stack_vectors(blobs, dim, dtype, scales)
+            self._row(dtype, sum(len(b) for b in blobs), rows, start, matrix, vectors)
+
+        if options['archive']:
+            start = time.perf_counter()
+            stored = list(
+                ProjectSubmission.objects.filter(embedding_vector__isnull=False)
+                .values_list('embedding_vector', 'embedding_dim', 'embedding_dtype', 'embedding_scale')
+            )
+            if not stored:
+                self.stdout.write("Archive has no stored embeddings.")
+                return
+            groups = {}
+            for blob, row_dim, dtype, scale in stored:
+                groups.setdefault((row_dim, dtype), ([], []))
+                groups[(row_dim, dtype)][0].append(blob)
+                groups[(row_dim, dtype)][1].append(scale)
+            for (row_dim, dtype), (blobs, scales) in groups.items():
+                stack_vectors(blobs, row_dim, dtype, scales)
+            elapsed = (time.perf_counter() - start) * 1000
+            total = sum(len(row[0]) for row in stored)
+            self.stdout.write(
+                f"archive: {len(stored)} rows, {total / 2**20:.2f} MB binary, "
+                f"query + load {elapsed:.1f} ms"
+            )
+
+    def _row(self, name, total_bytes, rows, start, matrix, reference):
+        elapsed = (time.perf_counter() - start) * 1000
+        error = float(np.abs(matrix - reference).max())
+        self.stdout.write(
+            f"{name:>8} {total_bytes / 2**20:>9.2f} {total_bytes / rows:>10.0f} {elapsed:>9.1f} {error:>9.5f}"
+        )
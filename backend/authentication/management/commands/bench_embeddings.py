@@ -0,0 +1,71 @@
+"""
+Reports memory use and encode throughput of the embedding backends.
+
+    python manage.py bench_embeddings
+    python manage.py bench_embeddings --onnx-model model.onnx --onnx-tokenizer tokenizer.json
+"""
+import random
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from project_management.embeddings import create_embedder
+
+WORDS = (
+    "smart campus attendance face recognition blockchain iot sensor network "
+    "machine learning model prediction web portal mobile application secure "
+    "authentication cloud deployment dashboard analytics recommendation system "
+    "agriculture crop disease detection healthcare monitoring chatbot nlp"
+).split()
+
+
+def _rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = "Measures memory and throughput of each configured embedding backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--texts', type=int, default=2000)
+        parser.add_argument('--words', type=int, default=180, help="Words per synthetic abstract.")
+        parser.add_argument('--dim', type=int, default=512)
+        parser.add_argument('--onnx-model')
+        parser.add_argument('--onnx-tokenizer')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(0)
+        texts = [' '.join(rnd.choices(WORDS, k=options['words'])) for _ in range(options['texts'])]
+
+        backends = [('hashing', {'dim': options['dim']})]
+        if options['onnx_model']:
+            backends.append(('onnx', {
+                'model_path': options['onnx_model'],
+                'tokenizer_path': options['onnx_tokenizer'],
+            }))
+
+        self.stdout.write(
+            f"{'backend':>8} {'dim':>5} {'load MB':>8} {'peak MB':>8} {'RSS MB':>8} {'texts/s':>9}"
+        )
+        for name, backend_options in backends:
+            # Memory pass (tracemalloc slows encoding down, so it is timed separately)
+            tracemalloc.start()
+            embedder = create_embedder(name, **backend_options)
+            load_mb = tracemalloc.get_traced_memory()[0] / 2**20
+            for text in texts[:100]:
+                embedder.encode(text)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            for text in texts:
+                embedder.encode(text)
+            elapsed = time.perf_counter() - start
+
+            self.stdout.write(
+                f"{name:>8} {embedder.dim:>5} {load_mb:>8.2f} {peak_mb:>8.2f} {_rss_mb():>8.1f} "
+                f"{len(texts) / elapsed:>9.1f}"
+            )
@@ -0,0 +1,93 @@
+"""
+Measures payload size and response time of the listing endpoints on a large
+fixture, comparing the full list, a cursor page and a cursor page with a
+sparse ``fields=`` projection.
+
+    python manage.py bench_listings --submissions 50000
+
+All rows created by the benchmark are rolled back at the end.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from authentication.models import Group, Project, ProjectSubmission, User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measures listing payload bytes and latency for full lists vs cursor pages vs field projections."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--skip-full', action='store_true', help="Skip the unpaginated requests.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _fixture(self, count):
+        teacher = User.objects.create(username='bench-teacher', role='Teacher')
+        group = Group.objects.create(name='bench-group')
+        group.teachers.add(teacher)
+        students = User.objects.bulk_create(
+            [User(username=f'bench-student-{i}', role='Student') for i in range(max(1, count // 10))]
+        )
+        abstract = 'An IoT based smart attendance system using face recognition. ' * 30
+        vector = np.random.default_rng(0).standard_normal(512).astype(np.float32)
+
+        submissions = []
+        for i in range(count):
+            submission = ProjectSubmission(
+                student=students[i % len(students)], group=group, title=f'Bench project {i}',
+                abstract_text=abstract, status='Approved' if i % 2 else 'Submitted',
+            )
+            submission.set_embedding(vector, model_version='bench')
+            submissions.append(submission)
+        submissions = ProjectSubmission.objects.bulk_create(submissions, batch_size=2000)
+
+        Project.objects.bulk_create([
+            Project(submission=s, title=s.title, abstract=abstract, status='In Progress')
+            for s in submissions if s.status == 'Approved'
+        ], batch_size=2000)
+        return teacher
+
+    def _measure(self, client, url, repeat):
+        timings, size = [], 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+            size = len(response.content)
+        return np.median(timings), size
+
+    def _run(self, options):
+        start = time.perf_counter()
+        teacher = self._fixture(options['submissions'])
+        self.stdout.write(f"fixture: {options['submissions']} submissions in {time.perf_counter() - start:.1f}s")
+
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(teacher)
+        page = f"page_size={options['page_size']}"
+        variants = [('page', f'?{page}'), ('page+fields', f'?{page}&fields=id,title,status')]
+        if not options['skip_full']:
+            variants.insert(0, ('full', ''))
+
+        self.stdout.write(f"{'endpoint':>22} {'variant':>12} {'median ms':>10} {'bytes':>12}")
+        for endpoint in ('/teacher/submissions/', '/projects/all/'):
+            for name, query in variants:
+                elapsed, size = self._measure(client, endpoint + query, options['repeat'])
+                self.stdout.write(f"{endpoint:>22} {name:>12} {elapsed:>10.1f} {size:>12,}")
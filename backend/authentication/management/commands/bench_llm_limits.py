@@ -0,0 +1,119 @@
+"""
+Burst test of the Gemini admission control (project_management/llm_limits.py).
+
+    python manage.py bench_llm_limits --students 200 --rpm 600 --concurrency 16
+
+Every student asks for viva questions at the same moment through the ASGI
+application, and one extra student sends ``--heavy-requests`` about
+different projects at once. Many students share a project idea, so identical
+prompts overlap. The same burst runs without limits and with the ones given
+on the command line. The report shows upstream
+calls, peak concurrency, coalesced and rejected (503) requests, peak queue
+depth, and latency for the heavy user vs everyone else.
+
+Gemini is replaced by a stub that sleeps for ``--llm-latency`` seconds.
+Rows created by the benchmark are deleted at the end.
+"""
+import asyncio
+
+import numpy as np
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import ProjectSubmission, User
+from project_management.llm_limits import LLMGate, MemoryTokenBucket
+from project_management.llm_transport import StubGenerativeModel
+from project_management.project_analyzer import analyzer
+from ._http import asgi_post
+
+
+class Command(BaseCommand):
+    help = "Measures rate limiting, fair queuing and coalescing of Gemini calls under a burst of viva requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--ideas', type=int, default=40, help="Distinct project ideas shared by the students.")
+        parser.add_argument('--heavy-requests', type=int, default=50)
+        parser.add_argument('--llm-latency', type=float, default=1.0)
+        parser.add_argument('--rpm', type=int, default=600)
+        parser.add_argument('--burst', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--queue-timeout', type=float, default=20)
+
+    def handle(self, *args, **options):
+        original = analyzer.llm_model, analyzer.cache, analyzer.gate
+        analyzer.cache = None
+        students = [User.objects.create(username=f'bench-limits-{i}', role='Student') for i in range(options['students'] + 1)]
+        try:
+            requests = []
+            for i, student in enumerate(students[:-1]):
+                idea = i % options['ideas']
+                submission = ProjectSubmission.objects.create(
+                    student=student, title=f'Idea {idea}', abstract_text=f'Shared abstract of idea {idea}.',
+                )
+                requests.append((False, str(AccessToken.for_user(student)), submission.id))
+            # The heavy user asks about many different projects of their own
+            heavy, token = students[-1], str(AccessToken.for_user(students[-1]))
+            for i in range(options['heavy_requests']):
+                submission = ProjectSubmission.objects.create(
+                    student=heavy, title=f'Heavy idea {i}', abstract_text=f'Abstract of heavy idea {i}.',
+                )
+                requests.append((True, token, submission.id))
+
+            self.stdout.write(
+                f"{'setup':>10} {'requests':>9} {'upstream':>9} {'peak':>5} {'coalesced':>10} {'503':>5} "
+                f"{'max queue':>10} {'others p50':>11} {'others p95':>11} {'heavy p50':>10} {'heavy p95':>10}"
+            )
+            setups = {
+                'unlimited': LLMGate(None, len(requests), options['queue_timeout']),
+                'limited': LLMGate(
+                    MemoryTokenBucket(options['rpm'] / 60, options['burst']),
+                    options['concurrency'], options['queue_timeout'],
+                ),
+            }
+            for name, gate in setups.items():
+                analyzer.llm_model = StubGenerativeModel(options['llm_latency'])
+                analyzer.gate = gate
+                self._run(name, requests)
+        finally:
+            analyzer.llm_model, analyzer.cache, analyzer.gate = original
+            User.objects.filter(id__in=[s.id for s in students]).delete()
+
+    def _run(self, name, requests):
+        results, max_queue = asyncio.run(self._burst(requests))
+        by_group = {True: [], False: []}
+        for heavy, (status, _, total) in zip((r[0] for r in requests), results):
+            if status == 200:
+                by_group[heavy].append(total)
+        rejected = sum(1 for status, _, _ in results if status == 503)
+        stub, gate = analyzer.llm_model, analyzer.gate
+
+        def pct(values, q):
+            return f"{np.percentile(values, q):.0f}" if values else '-'
+
+        self.stdout.write(
+            f"{name:>10} {len(requests):>9} {stub.calls:>9} {stub.peak_in_flight:>5} {gate.coalesced:>10} {rejected:>5} "
+            f"{max_queue:>10} {pct(by_group[False], 50):>11} {pct(by_group[False], 95):>11} "
+            f"{pct(by_group[True], 50):>10} {pct(by_group[True], 95):>10}"
+        )
+
+    async def _burst(self, requests):
+        application = get_asgi_application()
+        max_queue = 0
+        done = asyncio.Event()
+
+        async def watch_queue():
+            nonlocal max_queue
+            while not done.is_set():
+                max_queue = max(max_queue, analyzer.gate.semaphore.waiting)
+                await asyncio.sleep(0.01)
+
+        watcher = asyncio.create_task(watch_queue())
+        results = await asyncio.gather(*(
+            asgi_post(application, '/ai/viva/', token, {'project_id': submission_id})
+            for _, token, submission_id in requests
+        ))
+        done.set()
+        await watcher
+        return results, max_queue
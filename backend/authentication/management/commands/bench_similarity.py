@@ -0,0 +1,65 @@
+"""
+Benchmarks plagiarism pre-screening latency for growing archives.
+
+    python manage.py bench_similarity --sizes 1000 10000 100000
+
+Uses synthetic unit vectors, so no database rows or API key are needed.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from project_management.vector_index import build_index
+
+
+class Command(BaseCommand):
+    help = "Measures per-submission top-k latency of the similarity index backends."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+        parser.add_argument('--dim', type=int, default=384)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--k', type=int, default=5)
+        parser.add_argument('--nprobe', type=int, default=8)
+        parser.add_argument('--abstract-chars', type=int, default=1200,
+                            help="Average abstract length used to estimate prompt size.")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(42)
+        dim, k = options['dim'], options['k']
+
+        self.stdout.write(
+            f"{'archive':>8} {'backend':>7} {'build ms':>9} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'recall@k':>8} {'prompt chars (all -> top-k)':>28}"
+        )
+        for size in options['sizes']:
+            # Clustered data so the approximate index has structure to exploit
+            centers = rng.standard_normal((max(1, size // 100), dim)).astype(np.float32)
+            vectors = centers[rng.integers(0, centers.shape[0], size)]
+            vectors += 0.3 * rng.standard_normal((size, dim)).astype(np.float32)
+            queries = vectors[rng.integers(0, size, options['queries'])]
+            queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+            ids = np.arange(size)
+
+            exact = None
+            for backend, backend_options in (('brute', {}), ('ivf', {'nprobe': options['nprobe']})):
+                start = time.perf_counter()
+                index = build_index(backend, dim, **backend_options)
+                index.add(ids, vectors)
+                build_ms = (time.perf_counter() - start) * 1000
+
+                timings, results = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    results.append({row_id for row_id, _ in index.search(query, k)})
+                    timings.append((time.perf_counter() - start) * 1000)
+
+                if exact is None:
+                    exact = results
+                recall = np.mean([len(a & b) / k for a, b in zip(results, exact)])
+                prompt = f"{size * options['abstract_chars']:,} -> {k * options['abstract_chars']:,}"
+                self.stdout.write(
+                    f"{size:>8} {backend:>7} {build_ms:>9.1f} {np.percentile(timings, 50):>8.3f} "
+                    f"{np.percentile(timings, 95):>8.3f} {recall:>8.3f} {prompt:>28}"
+                )
@@ -0,0 +1,80 @@
+"""
+Compares request latency of project submission with inline analysis (with and
+without concurrent fan-out of the LLM prompts) vs queued analysis.
+
+    python manage.py bench_submission_latency --requests 20 --llm-latency 1.5
+
+Gemini is replaced by a stub that sleeps for ``--llm-latency`` seconds per
+call. All rows created by the benchmark are rolled back at the end.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from authentication.jobs import claim_next, run_job
+from authentication.models import Group, User
+from project_management.llm_transport import StubGenerativeModel
+from project_management.project_analyzer import analyzer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measures POST /projects/submit/ latency for inline, inline fan-out and queued analysis."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument('--llm-latency', type=float, default=1.5)
+
+    def handle(self, *args, **options):
+        original_model, original_cache = analyzer.llm_model, analyzer.cache
+        analyzer.llm_model = StubGenerativeModel(options['llm_latency'])
+        analyzer.cache = None
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            analyzer.llm_model, analyzer.cache = original_model, original_cache
+
+    def _run(self, options):
+        student = User.objects.create(username='bench-student', role='Student')
+        group = Group.objects.create(name='bench-group')
+        group.students.add(student)
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(student)
+
+        self.stdout.write(f"{'mode':>12} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'req/min per worker':>19}")
+        modes = (('sync', False, False), ('sync+fanout', False, True), ('async', True, True))
+        for mode, is_async, fanout in modes:
+            timings = []
+            with override_settings(ANALYSIS_ASYNC=is_async, ANALYSIS_FANOUT=fanout):
+                for i in range(options['requests']):
+                    start = time.perf_counter()
+                    response = client.post('/projects/submit/', {
+                        'title': f'Benchmark project {mode} {i}',
+                        'abstract_text': f'An IoT based smart attendance system, variant {i}.',
+                    }, format='multipart')
+                    timings.append((time.perf_counter() - start) * 1000)
+                    assert response.status_code in (201, 202, 409), response.status_code
+            self.stdout.write(
+                f"{mode:>12} {np.percentile(timings, 50):>9.1f} {np.percentile(timings, 95):>9.1f} "
+                f"{max(timings):>9.1f} {60000 / np.mean(timings):>19.1f}"
+            )
+
+        # Time for a single background worker slot to drain the async backlog
+        start = time.perf_counter()
+        drained = 0
+        while (job := claim_next('analysis', 'bench')) is not None:
+            run_job(job)
+            drained += 1
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"worker drained {drained} analysis jobs in {elapsed:.1f}s (1 slot)")
@@ -0,0 +1,89 @@
+"""
+Measures the real-time factor (transcription time / audio duration) of the
+configured transcription backend on CPU.
+
+    python manage.py bench_transcription lecture.mp3 pitch.wav --model-size tiny.en base.en
+    python manage.py bench_transcription --seconds 120 --threads 1 2 4
+
+Without files, a synthetic WAV of ``--seconds`` is generated (the transcript
+is meaningless, but decoding cost depends on duration, not content). An RTF
+below 1.0 means faster than real time.
+"""
+import os
+import resource
+import tempfile
+import time
+import wave
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from project_management.transcription import TranscriptionUnavailable, create_transcriber
+
+
+def _write_synthetic_wav(path, seconds, rate=16000):
+    """Writes speech-band tones with noise, one second at a time."""
+    rng = np.random.default_rng(0)
+    with wave.open(path, 'wb') as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(2)
+        audio.setframerate(rate)
+        t = np.arange(rate) / rate
+        for second in range(seconds):
+            tone = np.sin(2 * np.pi * (200 + 40 * (second % 7)) * t) * 0.3
+            samples = tone + rng.normal(0, 0.05, rate)
+            audio.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+class Command(BaseCommand):
+    help = "Reports load time, real-time factor and peak RSS of the transcription backend."
+
+    def add_arguments(self, parser):
+        options = settings.TRANSCRIPTION_BACKEND.get('OPTIONS', {})
+        parser.add_argument('files', nargs='*')
+        parser.add_argument('--seconds', type=int, default=60, help="Length of the synthetic clip.")
+        parser.add_argument('--model-size', nargs='+', default=[options.get('model_size', 'base.en')])
+        parser.add_argument('--compute-type', default=options.get('compute_type', 'int8'))
+        parser.add_argument('--threads', type=int, nargs='+', default=[options.get('cpu_threads', 2)])
+        parser.add_argument('--chunk-seconds', type=int, default=options.get('chunk_seconds', 30))
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = options['files']
+            if not files:
+                synthetic = os.path.join(tmp, f"synthetic-{options['seconds']}s.wav")
+                _write_synthetic_wav(synthetic, options['seconds'])
+                files = [synthetic]
+
+            self.stdout.write(
+                f"{'model':>12} {'threads':>8} {'load s':>7} {'file':>24} {'audio s':>8} {'wall s':>8} "
+                f"{'RTF':>6} {'peak RSS MB':>12}"
+            )
+            for model_size in options['model_size']:
+                for threads in options['threads']:
+                    self._bench(model_size, threads, files, options)
+
+    def _bench(self, model_size, threads, files, options):
+        start = time.perf_counter()
+        try:
+            transcriber = create_transcriber(
+                settings.TRANSCRIPTION_BACKEND['NAME'], model_size=model_size,
+                compute_type=options['compute_type'], cpu_threads=threads,
+                chunk_seconds=options['chunk_seconds'],
+            )
+        except TranscriptionUnavailable as e:
+            raise CommandError(str(e))
+        except Exception as e:
+            # Typically the model download failing
+            raise CommandError(f"Could not load the '{model_size}' model: {e}")
+        load = time.perf_counter() - start
+
+        for path in files:
+            transcript = transcriber.transcribe(path)
+            rtf = transcript.elapsed / (transcript.duration or 1)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            self.stdout.write(
+                f"{model_size:>12} {threads:>8} {load:>7.1f} {os.path.basename(path)[-24:]:>24} "
+                f"{transcript.duration:>8.1f} {transcript.elapsed:>8.1f} {rtf:>6.2f} {peak:>12.0f}"
+            )
@@ -0,0 +1,125 @@
+"""
+Reports peak RSS of POST /projects/submit/ with a large audio upload.
+
+    python manage.py bench_uploads --size-mb 100
+
+Each upload handler setup runs in a fresh subprocess so that its peak RSS
+(``ru_maxrss``) is not inflated by the previous run. The request body is
+streamed from a file on disk through the WSGI handler, as gunicorn would.
+Rows and media created by the benchmark are removed at the end.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import BackgroundJob, Group, User
+
+HANDLER_SETUPS = {
+    # Current settings: chunks streamed to a temporary file
+    'streamed': {},
+    # Everything buffered in memory, for comparison
+    'in-memory': {
+        'FILE_UPLOAD_HANDLERS': ['django.core.files.uploadhandler.MemoryFileUploadHandler'],
+        'FILE_UPLOAD_MAX_MEMORY_SIZE': 2 ** 40,
+    },
+}
+
+BOUNDARY = 'BenchUploadBoundary'
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+class Command(BaseCommand):
+    help = "Measures peak RSS and latency of a large multipart submission upload."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=100)
+        parser.add_argument('--setup', choices=sorted(HANDLER_SETUPS), help="Run a single setup in this process.")
+
+    def handle(self, *args, **options):
+        if options['setup']:
+            self.stdout.write(json.dumps(self._run(options['setup'], options['size_mb'])))
+            return
+
+        self.stdout.write(f"{'setup':>10} {'upload MB':>10} {'baseline MB':>12} {'peak MB':>9} {'delta MB':>9} {'ms':>8}")
+        for setup in HANDLER_SETUPS:
+            output = subprocess.run(
+                [sys.executable, sys.argv[0], 'bench_uploads', '--setup', setup, '--size-mb', str(options['size_mb'])],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{setup:>10} {options['size_mb']:>10} {result['baseline']:>12.1f} {result['peak']:>9.1f} "
+                f"{result['peak'] - result['baseline']:>9.1f} {result['ms']:>8.0f}"
+            )
+
+    def _write_body(self, path, size_mb):
+        """Writes a multipart body with a WAV upload of ``size_mb`` MB, 1 MB at a time."""
+        with open(path, 'wb') as body:
+            body.write(
+                f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="title"\r\n\r\nUpload benchmark\r\n'
+                f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="abstract_text"\r\n\r\nBenchmark abstract\r\n'
+                f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="audio_file"; filename="talk.wav"\r\n'
+                f'Content-Type: audio/wav\r\n\r\n'.encode()
+            )
+            body.write(b'RIFF\x00\x00\x00\x00WAVE')
+            for _ in range(size_mb):
+                body.write(os.urandom(1024 * 1024))
+            body.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+            return body.tell()
+
+    def _run(self, setup, size_mb):
+        student = User.objects.create(username='bench-uploader', role='Student')
+        group = Group.objects.create(name='bench-uploads')
+        group.students.add(student)
+        token = str(AccessToken.for_user(student))
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(
+                    MEDIA_ROOT=media_root, ANALYSIS_ASYNC=True, AUDIO_FILE_MAX_BYTES=2 ** 40, **HANDLER_SETUPS[setup]):
+            body_path = os.path.join(media_root, 'body.bin')
+            length = self._write_body(body_path, size_mb)
+            baseline = _peak_rss_mb()
+
+            status_holder = {}
+            with open(body_path, 'rb') as body:
+                environ = {
+                    'REQUEST_METHOD': 'POST',
+                    'PATH_INFO': '/projects/submit/',
+                    'SERVER_NAME': 'localhost',
+                    'SERVER_PORT': '80',
+                    'HTTP_HOST': 'localhost',
+                    'HTTP_AUTHORIZATION': f'Bearer {token}',
+                    'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+                    'CONTENT_LENGTH': str(length),
+                    'wsgi.input': body,
+                    'wsgi.errors': BytesIO(),
+                    'wsgi.url_scheme': 'http',
+                }
+                start = time.perf_counter()
+                response = WSGIHandler()(environ, lambda status, headers: status_holder.update(status=status))
+                b''.join(response)
+                elapsed = (time.perf_counter() - start) * 1000
+            peak = _peak_rss_mb()
+
+        try:
+            assert status_holder['status'].startswith(('201', '202')), status_holder['status']
+        finally:
+            BackgroundJob.objects.filter(
+                kind='analyze_submission', payload__submission_id__in=list(student.submissions.values_list('id', flat=True)),
+            ).delete()
+            student.delete()
+            group.delete()
+        return {'baseline': baseline, 'peak': peak, 'ms': elapsed}
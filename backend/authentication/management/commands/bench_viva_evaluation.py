@@ -0,0 +1,77 @@
+"""
+Compares grading a viva one answer per request against the batch endpoint.
+
+    python manage.py bench_viva_evaluation --questions 5 --llm-latency 1.0
+
+Gemini is replaced by a stub with a fixed delay; the response cache is
+disabled and all rows are rolled back at the end.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from authentication.models import ProjectSubmission, User
+from project_management.llm_transport import StubGenerativeModel
+from project_management.project_analyzer import analyzer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measures end-to-end viva grading latency: per-answer loop vs batch endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=5)
+        parser.add_argument('--llm-latency', type=float, default=1.0)
+        parser.add_argument('--rounds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        original_model, original_cache = analyzer.llm_model, analyzer.cache
+        analyzer.llm_model = StubGenerativeModel(options['llm_latency'])
+        analyzer.cache = None
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            analyzer.llm_model, analyzer.cache = original_model, original_cache
+
+    def _run(self, options):
+        student = User.objects.create(username='bench-viva-student', role='Student')
+        submission = ProjectSubmission.objects.create(
+            student=student, title='Bench project', abstract_text='A campus navigation app. ' * 40,
+        )
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(student)
+        answers = [
+            {'question': f'{n}. Explain design decision {n}.', 'answer': f'We chose option {n} because...'}
+            for n in range(1, options['questions'] + 1)
+        ]
+
+        loop_times, batch_times = [], []
+        for _ in range(options['rounds']):
+            start = time.perf_counter()
+            for item in answers:
+                response = client.post('/ai/viva/evaluate/', {'project_id': submission.id, **item}, format='json')
+                assert response.status_code == 200, response.status_code
+            loop_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            response = client.post('/ai/viva/evaluate/batch/', {
+                'project_id': submission.id, 'answers': answers,
+            }, format='json')
+            assert response.status_code == 200, response.status_code
+            assert all(r['score'] != 'N/A' for r in response.data['results'])
+            batch_times.append(time.perf_counter() - start)
+
+        loop, batch = min(loop_times), min(batch_times)
+        self.stdout.write(f"{options['questions']} answers, {options['llm_latency']}s per LLM call")
+        self.stdout.write(f"  per-answer loop : {loop * 1000:8.1f} ms ({options['questions']} requests, {options['questions']} prompts)")
+        self.stdout.write(f"  batch endpoint  : {batch * 1000:8.1f} ms (1 request, 1 prompt)")
+        self.stdout.write(f"  speed-up        : {loop / batch:8.1f}x")
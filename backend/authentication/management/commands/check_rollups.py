@@ -0,0 +1,36 @@
+"""
+Rebuilds the analytics rollups from scratch and compares them with the live
+tables maintained by signals.
+
+    python manage.py check_rollups [--repair]
+
+Exits with an error when they differ, unless ``--repair`` is given, in
+which case the live tables are replaced by the rebuilt values.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.rollups import diff_rollups, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Checks AnalyticsCounter, ProjectScoreRollup and LeaderboardEntry against a rebuild from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help="Overwrite the live rollups with the rebuild.")
+        parser.add_argument('--limit', type=int, default=20, help="Maximum number of differences to print.")
+
+    def handle(self, *args, **options):
+        differences = diff_rollups()
+        if not differences:
+            self.stdout.write(self.style.SUCCESS("Rollups are consistent."))
+            return
+
+        for table, key, expected, live in differences[:options['limit']]:
+            self.stdout.write(f"{table} {key}: expected {expected}, live {live}")
+        if len(differences) > options['limit']:
+            self.stdout.write(f"... and {len(differences) - options['limit']} more")
+
+        if not options['repair']:
+            raise CommandError(f"{len(differences)} rollup rows differ. Run with --repair to rebuild them.")
+        rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups ({len(differences)} rows were stale)."))
@@ -0,0 +1,239 @@
+"""
+Load test of the AI paths with a mix of student and teacher traffic,
+reporting p50/p95/p99 latency per endpoint. No Gemini API key is needed.
+
+    python manage.py load_test_ai --students 40 --teachers 4 --duration 60 --gemini fake --profile flaky
+    python manage.py load_test_ai --url http://localhost:8000 --students 40 --teachers 4
+
+Each virtual user repeats an action picked by weight from STUDENT_MIX or
+TEACHER_MIX, with an exponentially distributed think time (mean ``--think``
+seconds) between actions. By default requests go straight to this process's
+ASGI application, as uvicorn would, and Gemini is replaced by the in-process
+stub (``--gemini stub``) or by the fake REST server (``--gemini fake``) with a
+latency and error ``--profile``. Submissions are then analysed inline, so
+their Gemini calls are part of the measured request.
+
+With ``--url`` the requests go over HTTP to a server running on the same
+database and settings, which uses its own LLM_TRANSPORT (for instance a
+``run_fake_gemini`` server). Users and rows created by the test are deleted
+at the end.
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import BackgroundJob, ChatSession, Group, Project, ProjectSubmission, User
+from project_management.fake_gemini import PROFILES, FakeGeminiServer
+from project_management.llm_transport import RestGenerativeModel, StubGenerativeModel
+from project_management.project_analyzer import analyzer
+from ._http import asgi_request, http_request
+
+TOPICS = ['soil moisture sensors', 'attendance by face recognition', 'crop disease detection', 'parking slot booking']
+
+
+def _chat(user, i):
+    return 'POST', '/ai/chat/', {'prompt': f"How should I test the {random.choice(TOPICS)} module? ({i})"}
+
+
+def _chat_stream(user, i):
+    return 'POST', '/ai/chat/stream/', {'prompt': f"Explain the architecture of {random.choice(TOPICS)}. ({i})"}
+
+
+def _viva(user, i):
+    return 'POST', '/ai/viva/', {'project_id': random.choice(user.submission_ids)}
+
+
+def _viva_evaluate(user, i):
+    return 'POST', '/ai/viva/evaluate/', {
+        'project_id': random.choice(user.submission_ids),
+        'question': 'Which sensors does your system use and why?',
+        'answer': f"Capacitive soil moisture sensors, since they do not corrode ({i}).",
+    }
+
+
+def _viva_batch(user, i):
+    return 'POST', '/ai/viva/evaluate/batch/', {
+        'project_id': random.choice(user.submission_ids),
+        'answers': [
+            {'question': f'Explain design decision {n}.', 'answer': f'It keeps the system simple ({i}).'}
+            for n in range(1, 6)
+        ],
+    }
+
+
+def _submit(user, i):
+    return 'POST', '/projects/submit/', {
+        'title': f'{user.username} project {i}',
+        'abstract_text': f"A system for {random.choice(TOPICS)} built on low-cost hardware, variant {i}.",
+    }
+
+
+def _student_dashboard(user, i):
+    return 'GET', '/student/submissions/', None
+
+
+def _teacher_submissions(user, i):
+    return 'GET', '/teacher/submissions/', None
+
+
+def _ai_metrics(user, i):
+    return 'GET', '/ai/metrics/', None
+
+
+# (weight, endpoint, request builder)
+STUDENT_MIX = [
+    (30, 'chat', _chat),
+    (15, 'chat stream', _chat_stream),
+    (15, 'viva', _viva),
+    (15, 'viva evaluate', _viva_evaluate),
+    (5, 'submit', _submit),
+    (20, 'student dashboard', _student_dashboard),
+]
+TEACHER_MIX = [
+    (40, 'teacher submissions', _teacher_submissions),
+    (30, 'viva batch', _viva_batch),
+    (20, 'viva', _viva),
+    (10, 'ai metrics', _ai_metrics),
+]
+
+
+class Command(BaseCommand):
+    help = "Drives student and teacher traffic against the AI endpoints; reports p50/p95/p99 per endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20)
+        parser.add_argument('--teachers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=30, help="Seconds.")
+        parser.add_argument('--think', type=float, default=1.0, help="Mean seconds between a user's actions.")
+        parser.add_argument('--url', help="Base URL of a running server instead of the in-process application.")
+        parser.add_argument('--gemini', choices=['stub', 'fake'], default='fake')
+        parser.add_argument('--profile', choices=sorted(PROFILES), default='healthy')
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        group = Group.objects.create(name=f'loadtest-{time.time_ns()}')
+        users = self._create_users(group, options['students'], options['teachers'])
+        try:
+            if options['url']:
+                results, wall = asyncio.run(self._load(options, users, None))
+            else:
+                results, wall = self._run_in_process(options, users)
+            self._report(results, wall)
+            if not options['url']:
+                self.stdout.write(f"llm_gate: {analyzer.gate.stats()}")
+                self.stdout.write(f"llm_resilience: {analyzer.resilience.stats()}")
+        finally:
+            submission_ids = list(ProjectSubmission.objects.filter(student__in=users).values_list('id', flat=True))
+            session_ids = list(ChatSession.objects.filter(user__in=users).values_list('id', flat=True))
+            BackgroundJob.objects.filter(payload__submission_id__in=submission_ids).delete()
+            BackgroundJob.objects.filter(payload__session_id__in=session_ids).delete()
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+            group.delete()
+
+    def _create_users(self, group, students, teachers):
+        """Students with one approved project each; teachers see all of them."""
+        prefix = group.name
+        users = []
+        for i in range(students):
+            student = User.objects.create(username=f'{prefix}-student-{i}', role='Student')
+            submission = ProjectSubmission.objects.create(
+                student=student, group=group, status='Approved', title=f'{prefix} seed project {i}',
+                abstract_text=f"A system for {TOPICS[i % len(TOPICS)]} using low-cost sensors and a web dashboard.",
+            )
+            Project.objects.create(
+                submission=submission, title=submission.title, abstract=submission.abstract_text,
+                status='In Progress', progress_percentage=random.choice([10, 50, 90]),
+            )
+            group.students.add(student)
+            student.submission_ids = [submission.id]
+            users.append(student)
+        submission_ids = [submission_id for student in users for submission_id in student.submission_ids]
+        for i in range(teachers):
+            teacher = User.objects.create(username=f'{prefix}-teacher-{i}', role='Teacher')
+            group.teachers.add(teacher)
+            teacher.submission_ids = submission_ids
+            users.append(teacher)
+        for user in users:
+            user.token = str(AccessToken.for_user(user))
+            user.mix = STUDENT_MIX if user.role == 'Student' else TEACHER_MIX
+        return users
+
+    def _run_in_process(self, options, users):
+        original_model = analyzer.llm_model
+        server = None
+        if options['gemini'] == 'fake':
+            server = FakeGeminiServer(seed=options['seed'], **PROFILES[options['profile']]).start()
+            analyzer.llm_model = RestGenerativeModel('gemini-2.0-flash', url=server.url, api_key='')
+        else:
+            profile = PROFILES[options['profile']]
+            analyzer.llm_model = StubGenerativeModel(profile['latency'], profile.get('chunk_latency', 0.0))
+        try:
+            with override_settings(ANALYSIS_ASYNC=False):
+                return asyncio.run(self._load(options, users, get_asgi_application()))
+        finally:
+            analyzer.llm_model = original_model
+            if server is not None:
+                server.stop()
+                self.stdout.write(f"fake Gemini served {server.requests} requests ({options['profile']})")
+
+    async def _load(self, options, users, application):
+        results = defaultdict(list)  # endpoint -> [(status, ttfb ms, total ms)]
+        pool = ThreadPoolExecutor(max_workers=len(users))
+        loop = asyncio.get_running_loop()
+
+        async def send(user, method, path, payload):
+            if application is not None:
+                return await asgi_request(application, method, path, user.token, payload)
+            return await loop.run_in_executor(pool, http_request, options['url'], method, path, user.token, payload)
+
+        async def virtual_user(user):
+            weights = [weight for weight, _, _ in user.mix]
+            i = 0
+            await asyncio.sleep(random.expovariate(1 / options['think']))  # ramp up
+            while time.monotonic() < deadline:
+                _, endpoint, build = random.choices(user.mix, weights)[0]
+                i += 1
+                try:
+                    results[endpoint].append(await send(user, *build(user, i)))
+                except Exception as e:
+                    results[endpoint].append((type(e).__name__, 0.0, 0.0))
+                await asyncio.sleep(random.expovariate(1 / options['think']))
+
+        start = time.monotonic()
+        deadline = start + options['duration']
+        try:
+            await asyncio.gather(*(virtual_user(user) for user in users))
+        finally:
+            pool.shutdown(wait=False)
+        return results, time.monotonic() - start
+
+    def _report(self, results, wall):
+        self.stdout.write(
+            f"{'endpoint':>20} {'requests':>9} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'TTFB p50':>9}  errors"
+        )
+        for endpoint, samples in sorted(results.items()):
+            ok = [(ttfb, total) for status, ttfb, total in samples if isinstance(status, int) and status < 400]
+            errors = defaultdict(int)
+            for status, _, _ in samples:
+                if not (isinstance(status, int) and status < 400):
+                    errors[status] += 1
+            error_text = ', '.join(f'{status} x{count}' for status, count in sorted(errors.items(), key=str)) or '-'
+            if ok:
+                ttfb, total = (np.array(column) for column in zip(*ok))
+                percentiles = ' '.join(f'{np.percentile(total, q):>8.0f}' for q in (50, 95, 99))
+                self.stdout.write(
+                    f"{endpoint:>20} {len(samples):>9} {len(samples) / wall:>7.1f} {percentiles} "
+                    f"{np.percentile(ttfb, 50):>9.0f}  {error_text}"
+                )
+            else:
+                self.stdout.write(f"{endpoint:>20} {len(samples):>9} {len(samples) / wall:>7.1f} {'':>36}  {error_text}")
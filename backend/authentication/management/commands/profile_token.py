@@ -0,0 +1,19 @@
+"""
+Prints a value for the X-Profile header, which has the request profiled when
+REQUEST_PROFILING is enabled (see project_management/profiling.py):
+
+    curl -H "X-Profile: $(python manage.py profile_token)" -H "Authorization: Bearer ..." \
+        https://.../admin/dashboard/
+
+The response's X-Profile-Id names the .folded and .txt files written.
+"""
+from django.core.management.base import BaseCommand
+
+from project_management.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = "Prints a signed X-Profile header value for on-demand request profiling."
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
@@ -0,0 +1,47 @@
+"""
+Runs the local fake Gemini REST server, so the AI endpoints can be exercised
+without an API key:
+
+    python manage.py run_fake_gemini --port 8765 --profile flaky
+
+and point the web workers at it with
+LLM_TRANSPORT = {'BACKEND': 'rest', 'OPTIONS': {'url': 'http://127.0.0.1:8765'}}.
+The profile's values can be overridden one by one (``--latency``, ``--error-rate``...).
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from project_management.fake_gemini import PROFILES, FakeGeminiServer
+
+
+class Command(BaseCommand):
+    help = "Serves canned Gemini responses with configurable latency and errors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--profile', choices=sorted(PROFILES), default='healthy')
+        parser.add_argument('--latency', type=float, help="Seconds before the first byte.")
+        parser.add_argument('--jitter', type=float, help="Extra latency, uniform between 0 and this.")
+        parser.add_argument('--chunk-latency', type=float, help="Seconds between streamed words.")
+        parser.add_argument('--error-rate', type=float, help="Share of requests that fail.")
+        parser.add_argument('--error-status', type=int, help="HTTP status of injected failures.")
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        config = dict(PROFILES[options['profile']])
+        for name in ('latency', 'jitter', 'chunk_latency', 'error_rate', 'error_status'):
+            if options[name] is not None:
+                config[name] = options[name]
+        server = FakeGeminiServer(host=options['host'], port=options['port'], seed=options['seed'], **config)
+
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+
+        with server:
+            self.stdout.write(f"Fake Gemini on {server.url} ({options['profile']}: {config})")
+            stopping.wait()
+        self.stdout.write(f"Stopped after {server.requests} requests.")
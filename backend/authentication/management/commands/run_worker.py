@@ -0,0 +1,82 @@
+"""
+Runs a pool of background job workers for one queue.
+
+    python manage.py run_worker --queue analysis --concurrency 4 --metrics-port 9101
+
+The job and Gemini metrics of a worker live in its own process; --metrics-port
+serves them for Prometheus to scrape, as /metrics does for the web workers.
+"""
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from prometheus_client import start_http_server
+
+from authentication import tasks  # noqa: F401  (registers the job handlers)
+from authentication.jobs import claim_next, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Claims and executes BackgroundJob rows with a bounded thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', default='analysis')
+        parser.add_argument('--concurrency', type=int, default=settings.JOB_QUEUE['CONCURRENCY'])
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_QUEUE['POLL_INTERVAL'])
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+        parser.add_argument('--metrics-port', type=int, help="Serve this worker's Prometheus metrics on this port.")
+        parser.add_argument('--metrics-addr', default='127.0.0.1', help="Address for --metrics-port (no authentication).")
+
+    def handle(self, *args, **options):
+        queue = options['queue']
+        concurrency = options['concurrency']
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        stopping = threading.Event()
+        slots = threading.BoundedSemaphore(concurrency)
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after in-flight jobs finish...")
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        if options['metrics_port']:
+            start_http_server(options['metrics_port'], addr=options['metrics_addr'])
+            self.stdout.write(f"Metrics on {options['metrics_addr']}:{options['metrics_port']}")
+
+        def execute(job):
+            try:
+                run_job(job)
+            finally:
+                close_old_connections()
+                slots.release()
+
+        self.stdout.write(f"Worker {worker_id} on '{queue}' with {concurrency} slots")
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            last_requeue = 0.0
+            while not stopping.is_set():
+                if time.monotonic() - last_requeue > settings.JOB_QUEUE['LEASE_SECONDS'] / 2:
+                    requeue_stale_jobs(queue)
+                    last_requeue = time.monotonic()
+
+                # Never claim more jobs than there are free slots
+                if not slots.acquire(timeout=options['poll_interval']):
+                    continue
+                job = claim_next(queue, worker_id)
+                if job is None:
+                    slots.release()
+                    if options['once'] and not in_flight:
+                        break
+                    stopping.wait(options['poll_interval'])
+                    continue
+                future = pool.submit(execute, job)
+                in_flight.add(future)
+                future.add_done_callback(in_flight.discard)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_remove_project_end_date_remove_project_start_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
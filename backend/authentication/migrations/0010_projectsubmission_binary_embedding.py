@@ -0,0 +1,110 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:13
+
+from django.db import migrations, models
+
+import numpy as np
+
+BATCH_SIZE = 500
+
+
+# The codec is copied here rather than imported from project_management.vector_codec,
+# so this migration keeps producing the same bytes if that module changes.
+def pack_float32(vector):
+    return np.asarray(vector, dtype='<f4').tobytes()
+
+
+def unpack_vector(data, dtype, scale):
+    if dtype == 'int8':
+        return np.frombuffer(data, dtype='i1').astype(np.float32) * np.float32(scale or 1.0)
+    return np.frombuffer(data, dtype='<f4')
+
+
+def _update_in_batches(model, rows, fields):
+    """bulk_update of ``rows`` (an iterator) in chunks, so the table is never held in memory."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, fields)
+
+
+def json_to_binary(apps, schema_editor):
+    """Packs existing JSON float lists into float32 bytes."""
+    ProjectSubmission = apps.get_model('authentication', 'ProjectSubmission')
+
+    def packed():
+        rows = ProjectSubmission.objects.exclude(embedding__isnull=True).only('id', 'embedding')
+        for submission in rows.iterator(chunk_size=BATCH_SIZE):
+            vector = submission.embedding
+            if not isinstance(vector, list) or not vector:
+                continue
+            submission.embedding_vector = pack_float32(vector)
+            submission.embedding_scale = None
+            submission.embedding_dim = len(vector)
+            submission.embedding_dtype = 'float32'
+            # The producing model was never recorded; backfill_embeddings re-encodes these
+            submission.embedding_model = 'legacy-json'
+            yield submission
+
+    _update_in_batches(
+        ProjectSubmission, packed(),
+        ['embedding_vector', 'embedding_scale', 'embedding_dim', 'embedding_dtype', 'embedding_model'],
+    )
+
+
+def binary_to_json(apps, schema_editor):
+    ProjectSubmission = apps.get_model('authentication', 'ProjectSubmission')
+
+    def unpacked():
+        rows = ProjectSubmission.objects.exclude(embedding_vector__isnull=True).only(
+            'id', 'embedding_vector', 'embedding_dtype', 'embedding_scale',
+        )
+        for submission in rows.iterator(chunk_size=BATCH_SIZE):
+            vector = unpack_vector(bytes(submission.embedding_vector), submission.embedding_dtype, submission.embedding_scale)
+            submission.embedding = vector.tolist()
+            yield submission
+
+    _update_in_batches(ProjectSubmission, unpacked(), ['embedding'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_projectsubmission_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='embedding_dim',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='embedding_dtype',
+            field=models.CharField(choices=[('float32', 'float32'), ('int8', 'int8')], default='float32', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='embedding_model',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='embedding_scale',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='embedding_vector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='projectsubmission',
+            name='embedding',
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0010_projectsubmission_binary_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='analysis_report',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='originality_status',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='similar_submission',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='authentication.projectsubmission'),
+        ),
+        migrations.AddField(
+            model_name='projectsubmission',
+            name='similarity_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='projectsubmission',
+            name='status',
+            field=models.CharField(choices=[('Pending Analysis', 'Pending Analysis'), ('Blocked', 'Blocked'), ('Submitted', 'Submitted'), ('Approved', 'Approved'), ('Rejected', 'Rejected'), ('In Progress', 'In Progress'), ('Completed', 'Completed'), ('Archived', 'Archived')], default='Submitted', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queue', models.CharField(default='analysis', max_length=32)),
+                ('kind', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('Queued', 'Queued'), ('Running', 'Running'), ('Succeeded', 'Succeeded'), ('Failed', 'Failed')], default='Queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['queue', 'status', 'run_after'], name='job_claim_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0011_background_jobs_and_async_analysis'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status'], name='project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['category'], name='project_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectsubmission',
+            index=models.Index(fields=['group', 'status', 'submitted_at'], name='submission_group_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectsubmission',
+            index=models.Index(fields=['student', 'status', 'submitted_at'], name='submission_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectsubmission',
+            index=models.Index(fields=['status', '-innovation_score', '-relevance_score', '-feasibility_score'], name='submission_status_scores_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectsubmission',
+            index=models.Index(fields=['-submitted_at', '-id'], name='submission_recent_idx'),
+        ),
+    ]
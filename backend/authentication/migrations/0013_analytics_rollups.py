@@ -0,0 +1,83 @@
+# Generated by Django 5.2.5 on 2026-10-17 06:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_rollups(apps, schema_editor):
+    """Fills the rollup tables from the existing projects."""
+    Project = apps.get_model('authentication', 'Project')
+    User = apps.get_model('authentication', 'User')
+    AnalyticsCounter = apps.get_model('authentication', 'AnalyticsCounter')
+    ProjectScoreRollup = apps.get_model('authentication', 'ProjectScoreRollup')
+    LeaderboardEntry = apps.get_model('authentication', 'LeaderboardEntry')
+
+    for dimension in ('status', 'category'):
+        AnalyticsCounter.objects.bulk_create([
+            AnalyticsCounter(dimension=dimension, value=row[dimension], count=row['count'])
+            for row in Project.objects.values(dimension).annotate(count=Count('id'))
+        ])
+    ProjectScoreRollup.objects.bulk_create([
+        ProjectScoreRollup(
+            project_id=row['id'], title=row['title'], status=row['status'],
+            innovation_score=row['submission__innovation_score'],
+        )
+        for row in Project.objects.values('id', 'title', 'status', 'submission__innovation_score')
+    ])
+    totals = User.objects.filter(active_projects__project__status='Completed').annotate(
+        total=Sum('active_projects__project__submission__innovation_score'),
+        completed=Count('active_projects'),
+    ).values_list('id', 'total', 'completed')
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(user_id=user_id, total_innovation=total, completed_projects=completed)
+        for user_id, total, completed in totals if total is not None
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0012_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('status', 'Status'), ('category', 'Category')], max_length=20)),
+                ('value', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value'), name='analytics_counter_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_innovation', models.FloatField()),
+                ('completed_projects', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total_innovation'], name='leaderboard_total_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectScoreRollup',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_rollup', serialize=False, to='authentication.project')),
+                ('title', models.CharField(max_length=255)),
+                ('status', models.CharField(max_length=20)),
+                ('innovation_score', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', '-innovation_score'], name='rollup_status_score_idx')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 07:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0014_chat_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VivaQuestionSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.CharField(choices=[('design', 'Initial design (under 30%)'), ('implementation', 'Implementation (30-79%)'), ('final', 'Final review (80% and over)')], max_length=20)),
+                ('questions', models.JSONField(default=list)),
+                ('source_digest', models.CharField(max_length=64)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='viva_question_sets', to='authentication.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'band'), name='viva_question_set_unique')],
+            },
+        ),
+    ]
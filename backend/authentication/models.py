@@ -1,7 +1,10 @@
 # authentication/models.py
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.db.models import JSONField 
+from project_management.vector_codec import pack_vector, unpack_vector
 
 class Group(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -25,6 +28,8 @@ class User(AbstractUser):
 
 class ProjectSubmission(models.Model):
     STATUS_CHOICES = (
+        ('Pending Analysis', 'Pending Analysis'),
+        ('Blocked', 'Blocked'),
         ('Submitted', 'Submitted'),
         ('Approved', 'Approved'),
         ('Rejected', 'Rejected'),
@@ -32,6 +37,9 @@ class ProjectSubmission(models.Model):
         ('Completed', 'Completed'),
         ('Archived', 'Archived'),
     )
+    # Attempts still being analysed, or stopped by the similarity check: the
+    # student sees them, teachers have nothing to review yet
+    PRE_REVIEW_STATUSES = ('Pending Analysis', 'Blocked')
     
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='submissions')
     group = models.ForeignKey(Group, on_delete=models.SET_NULL, null=True, blank=True) # New Field
@@ -44,17 +52,67 @@ class ProjectSubmission(models.Model):
     transcribed_text = models.TextField(null=True, blank=True)
     
     # New AI analysis fields
-    embedding = JSONField(null=True, blank=True)
+    # Embedding stored as raw float32/int8 bytes (see project_management/vector_codec.py)
+    EMBEDDING_DTYPE_CHOICES = (
+        ('float32', 'float32'),
+        ('int8', 'int8'),
+    )
+    embedding_vector = models.BinaryField(null=True, blank=True)
+    embedding_dim = models.PositiveIntegerField(null=True, blank=True)
+    embedding_dtype = models.CharField(max_length=8, choices=EMBEDDING_DTYPE_CHOICES, default='float32')
+    embedding_scale = models.FloatField(null=True, blank=True)  # int8 dequantisation factor
+    embedding_model = models.CharField(max_length=64, blank=True, default='')
     relevance_score = models.FloatField(null=True, blank=True)
     feasibility_score = models.FloatField(null=True, blank=True)
     innovation_score = models.FloatField(null=True, blank=True)
+
+    # Plagiarism verdict, filled in by the background analysis job
+    originality_status = models.CharField(max_length=30, blank=True, default='')
+    similarity_score = models.FloatField(null=True, blank=True)
+    analysis_report = models.TextField(blank=True, default='')
+    similar_submission = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Submitted')
 
     submitted_at = models.DateTimeField(auto_now_add=True)
+    # Part of the similarity index signature (authentication/similarity.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Composite indexes matching the dashboard filters and their ordering
+        indexes = [
+            models.Index(fields=['group', 'status', 'submitted_at'], name='submission_group_status_idx'),
+            models.Index(fields=['student', 'status', 'submitted_at'], name='submission_student_status_idx'),
+            models.Index(
+                fields=['status', '-innovation_score', '-relevance_score', '-feasibility_score'],
+                name='submission_status_scores_idx',
+            ),
+            models.Index(fields=['-submitted_at', '-id'], name='submission_recent_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} by {self.student.username}'
+
+    def set_embedding(self, vector, model_version='', dtype=None):
+        """Packs `vector` into the binary embedding columns (does not save)."""
+        if vector is None or len(vector) == 0:
+            self.embedding_vector = None
+            self.embedding_dim = None
+            self.embedding_scale = None
+            self.embedding_model = ''
+            return
+        dtype = dtype or settings.EMBEDDING_STORAGE_DTYPE
+        self.embedding_vector, self.embedding_scale = pack_vector(vector, dtype)
+        self.embedding_dim = len(vector)
+        self.embedding_dtype = dtype
+        self.embedding_model = model_version
+
+    def get_embedding(self):
+        """Returns the stored embedding as a float32 NumPy array, or None."""
+        if self.embedding_vector is None:
+            return None
+        return unpack_vector(self.embedding_vector, self.embedding_dtype, self.embedding_scale)
+
 class Project(models.Model):
     # A status field specific to the project's lifecycle
     STATUS_CHOICES = (
@@ -85,6 +143,12 @@ class Project(models.Model):
     # Progress field for conditional viva
     progress_percentage = models.IntegerField(default=0) # New field for progress tracking
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status'], name='project_status_idx'),
+            models.Index(fields=['category'], name='project_category_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -94,4 +158,165 @@ class Team(models.Model):
     members = models.ManyToManyField('User', related_name='active_projects')
 
     def __str__(self):
-        return f'Team for {self.project.title}'
\ No newline at end of file
+        return f'Team for {self.project.title}'
+
+
+# --- Analytics rollups (kept up to date by authentication/signals.py) ---
+
+class AnalyticsCounter(models.Model):
+    """Number of projects per status and per category."""
+    DIMENSION_CHOICES = (
+        ('status', 'Status'),
+        ('category', 'Category'),
+    )
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    value = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value'], name='analytics_counter_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.dimension}={self.value}: {self.count}'
+
+
+class ProjectScoreRollup(models.Model):
+    """Copy of each project's status and innovation score, for top-N reads without a join."""
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='score_rollup')
+    title = models.CharField(max_length=255)
+    status = models.CharField(max_length=20)
+    innovation_score = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-innovation_score'], name='rollup_status_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.title}: {self.innovation_score}'
+
+
+class LeaderboardEntry(models.Model):
+    """Total innovation score of each user's completed projects."""
+    user = models.OneToOneField('User', on_delete=models.CASCADE, primary_key=True, related_name='leaderboard_entry')
+    total_innovation = models.FloatField()
+    completed_projects = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-total_innovation'], name='leaderboard_total_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.total_innovation}'
+
+
+# --- Viva questions (see authentication/viva.py) ---
+
+class VivaQuestionSet(models.Model):
+    """
+    Viva questions of a project for one progress band, generated in the
+    background (see authentication/viva.py) so the viva page is a database read.
+    """
+    BAND_CHOICES = (
+        ('design', 'Initial design (under 30%)'),
+        ('implementation', 'Implementation (30-79%)'),
+        ('final', 'Final review (80% and over)'),
+    )
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='viva_question_sets')
+    band = models.CharField(max_length=20, choices=BAND_CHOICES)
+    questions = JSONField(default=list)
+    # Hash of the title, abstract and prompt version the questions were generated from
+    source_digest = models.CharField(max_length=64)
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'band'], name='viva_question_set_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.project} ({self.band})'
+
+
+# --- Chatbot conversations (see authentication/chat.py) ---
+
+class ChatSession(models.Model):
+    """
+    A stored conversation of a user, optionally about one project. Messages up
+    to `summarized_through` are folded into `summary`; only the later ones are
+    sent verbatim.
+    """
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='chat_sessions')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='chat_sessions')
+    summary = models.TextField(blank=True, default='')
+    summarized_through = models.BigIntegerField(default=0)  # id of the last summarized ChatMessage
+    unsummarized_tokens = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Chat #{self.id} of {self.user}'
+
+
+class ChatMessage(models.Model):
+    ROLE_CHOICES = (
+        ('user', 'User'),
+        ('model', 'Model'),
+    )
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=5, choices=ROLE_CHOICES)
+    content = models.TextField()
+    token_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['session', '-id'], name='chat_message_window_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.role}: {self.content[:50]}'
+
+
+# --- Background jobs (see authentication/jobs.py) ---
+
+class BackgroundJob(models.Model):
+    """
+    A unit of work in the database-backed job queue (see authentication/jobs.py).
+    Workers started with `manage.py run_worker` claim and execute these rows.
+    """
+    STATUS_CHOICES = (
+        ('Queued', 'Queued'),
+        ('Running', 'Running'),
+        ('Succeeded', 'Succeeded'),
+        ('Failed', 'Failed'),
+    )
+
+    queue = models.CharField(max_length=32, default='analysis')
+    kind = models.CharField(max_length=50)
+    payload = JSONField(default=dict)
+    result = JSONField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Queued')
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_after'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.id} ({self.status})'
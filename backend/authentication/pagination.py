@@ -0,0 +1,32 @@
+# authentication/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Pagination is opt-in so existing clients keep receiving a plain list:
+    it only applies when the request sends `cursor` or `page_size`.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class SubmittedAtCursorPagination(OptInCursorPagination):
+    """Keyset pagination of submissions on (submitted_at, id), newest first."""
+    ordering = ('-submitted_at', '-id')
+
+
+class ProjectCursorPagination(OptInCursorPagination):
+    """
+    Keyset pagination of projects by their submission's date, newest first.
+    The views annotate `submitted_at` from the submission, since the cursor
+    reads its position from an attribute of the row.
+    """
+    ordering = ('-submitted_at', '-id')
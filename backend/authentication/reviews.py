@@ -0,0 +1,115 @@
+# authentication/reviews.py
+"""
+Bulk approval and rejection of submissions by a teacher
+(TeacherBulkReviewView), in one transaction and a fixed number of queries
+however many submissions are reviewed:
+
+* one query reads the submissions (existence, group and status) and locks
+  them until commit; the permission check uses the teacher's group claims;
+* a conditional UPDATE per new status, which leaves alone any submission
+  that is no longer 'Submitted';
+* bulk_create of the Projects, Teams, team memberships and viva question
+  jobs of the approved submissions.
+
+bulk_create and QuerySet.update skip the model signals, so the analytics
+rollups they maintain are updated here (see rollups.py).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from . import rollups, viva
+from .jobs import claim, run_job
+from .models import Project, ProjectSubmission, Team
+from .tokens import teaching_group_ids
+
+REVIEW_STATUSES = ('Approved', 'Rejected')
+
+RESULT_DETAILS = {
+    'invalid': "Each review needs an integer submission_id and a status of 'Approved' or 'Rejected'.",
+    'duplicate': "This submission appears more than once in the batch.",
+    'not_found': "Submission not found.",
+    'forbidden': "You do not have permission to review this project.",
+    'already_reviewed': "This project has already been reviewed.",
+}
+
+
+def review_submissions(user, reviews):
+    """
+    Applies ``reviews`` ([{'submission_id': ..., 'status': ...}]) for the
+    teacher ``user``. Returns one result per review, in order, with
+    ``result`` 'approved', 'rejected' or an error code of RESULT_DETAILS.
+    """
+    results = []
+    wanted = {}  # submission id -> new status
+    for review in reviews:
+        submission_id, new_status = review.get('submission_id'), review.get('status')
+        result = {'submission_id': submission_id, 'status': new_status}
+        if type(submission_id) is not int or new_status not in REVIEW_STATUSES:
+            result['result'] = 'invalid'
+        elif submission_id in wanted:
+            result['result'] = 'duplicate'
+        else:
+            wanted[submission_id] = new_status
+        results.append(result)
+
+    group_ids = set(teaching_group_ids(user))
+    outcomes = {}
+    projects = {}
+    jobs = []
+    with transaction.atomic():
+        rows = {
+            row['id']: row
+            for row in ProjectSubmission.objects.select_for_update().filter(id__in=wanted).values(
+                'id', 'group_id', 'status', 'student_id', 'title', 'abstract_text', 'innovation_score',
+            )
+        }
+        accepted = defaultdict(list)  # new status -> submission ids
+        for submission_id, new_status in wanted.items():
+            row = rows.get(submission_id)
+            if row is None:
+                outcomes[submission_id] = 'not_found'
+            elif row['group_id'] not in group_ids:
+                outcomes[submission_id] = 'forbidden'
+            elif row['status'] != 'Submitted':
+                outcomes[submission_id] = 'already_reviewed'
+            else:
+                accepted[new_status].append(submission_id)
+                outcomes[submission_id] = new_status.lower()
+
+        for new_status, submission_ids in accepted.items():
+            ProjectSubmission.objects.filter(id__in=submission_ids, status='Submitted').update(status=new_status)
+
+        approved = [rows[submission_id] for submission_id in accepted['Approved']]
+        if approved:
+            projects = {project.submission_id: project for project in _create_projects(approved)}
+            jobs = viva.queue_first_question_sets(projects.values())
+
+    for result in results:
+        result.setdefault('result', outcomes.get(result['submission_id']))
+        if result['result'] == 'approved':
+            result['project_id'] = projects[result['submission_id']].id
+        elif result['result'] in RESULT_DETAILS:
+            result['detail'] = RESULT_DETAILS[result['result']]
+
+    # Inline mode generates the viva questions now, after the batch is committed
+    if not settings.ANALYSIS_ASYNC:
+        for job in jobs:
+            run_job(claim(job.id, 'inline'))
+    return results
+
+
+def _create_projects(rows):
+    """Creates the Project, Team and team membership of each approved submission row."""
+    projects = Project.objects.bulk_create([
+        Project(submission_id=row['id'], title=row['title'], abstract=row['abstract_text'], status='In Progress')
+        for row in rows
+    ])
+    teams = Team.objects.bulk_create([Team(project=project) for project in projects])
+    Team.members.through.objects.bulk_create([
+        Team.members.through(team_id=team.id, user_id=row['student_id']) for team, row in zip(teams, rows)
+    ])
+    # New projects are In Progress, so the leaderboard (completed projects only) is unchanged
+    rollups.add_projects(projects, {row['id']: row['innovation_score'] for row in rows})
+    return projects
@@ -0,0 +1,158 @@
+# authentication/rollups.py
+"""
+Precomputed analytics for the HOD dashboards, so `AnalyticsView` and
+`LeaderboardView` read small indexed tables instead of aggregating over
+every project on each poll.
+
+The rollups are updated incrementally from model signals (see signals.py).
+Code that bypasses signals (`QuerySet.update`, `bulk_create`) must call the
+functions below itself. `check_rollups` compares the live tables with a
+rebuild from scratch and can repair them.
+"""
+import math
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import AnalyticsCounter, LeaderboardEntry, Project, ProjectScoreRollup, User
+
+DIMENSIONS = ('status', 'category')
+
+
+def bump_counters(old, new):
+    """
+    Moves one project between counter buckets. `old` and `new` are
+    {'status': ..., 'category': ...} dicts, or None when the project is
+    created or deleted.
+    """
+    for dimension in DIMENSIONS:
+        before = old[dimension] if old else None
+        after = new[dimension] if new else None
+        if before == after:
+            continue
+        if before is not None:
+            _add(dimension, before, -1)
+        if after is not None:
+            _add(dimension, after, 1)
+
+
+def _add(dimension, value, delta):
+    AnalyticsCounter.objects.get_or_create(dimension=dimension, value=value)
+    AnalyticsCounter.objects.filter(dimension=dimension, value=value).update(count=F('count') + delta)
+
+
+def add_projects(projects, innovation_scores):
+    """
+    The rollup updates for projects created with bulk_create: one counter
+    update per bucket and one insert for the score rows. `innovation_scores`
+    maps submission ids to scores.
+    """
+    for dimension in DIMENSIONS:
+        for value, count in Counter(getattr(project, dimension) for project in projects).items():
+            _add(dimension, value, count)
+    ProjectScoreRollup.objects.bulk_create([
+        ProjectScoreRollup(
+            project_id=project.pk, title=project.title, status=project.status,
+            innovation_score=innovation_scores.get(project.submission_id),
+        )
+        for project in projects
+    ])
+
+
+def sync_project_score(project, innovation_score):
+    ProjectScoreRollup.objects.update_or_create(
+        project_id=project.pk,
+        defaults={'title': project.title, 'status': project.status, 'innovation_score': innovation_score},
+    )
+
+
+def refresh_leaderboard(user_ids):
+    """Recomputes the leaderboard entries of the given users."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    totals = _leaderboard_totals(User.objects.filter(id__in=user_ids))
+    for user_id, (total, completed) in totals.items():
+        LeaderboardEntry.objects.update_or_create(
+            user_id=user_id, defaults={'total_innovation': total, 'completed_projects': completed},
+        )
+    LeaderboardEntry.objects.filter(user_id__in=user_ids - set(totals)).delete()
+
+
+def _leaderboard_totals(users):
+    rows = users.filter(active_projects__project__status='Completed').annotate(
+        total=Sum('active_projects__project__submission__innovation_score'),
+        completed=Count('active_projects'),
+    ).values_list('id', 'total', 'completed')
+    return {user_id: (total, completed) for user_id, total, completed in rows if total is not None}
+
+
+# --- Consistency checks ---
+
+def expected_rollups():
+    """Computes every rollup from scratch."""
+    counters = {}
+    for dimension in DIMENSIONS:
+        for row in Project.objects.values(dimension).annotate(count=Count('id')):
+            counters[(dimension, row[dimension])] = row['count']
+    scores = {
+        row['id']: (row['title'], row['status'], row['submission__innovation_score'])
+        for row in Project.objects.values('id', 'title', 'status', 'submission__innovation_score')
+    }
+    return {'counters': counters, 'scores': scores, 'leaderboard': _leaderboard_totals(User.objects.all())}
+
+
+def live_rollups():
+    return {
+        'counters': {
+            (c.dimension, c.value): c.count for c in AnalyticsCounter.objects.filter(count__gt=0)
+        },
+        'scores': {
+            r.project_id: (r.title, r.status, r.innovation_score) for r in ProjectScoreRollup.objects.all()
+        },
+        'leaderboard': {
+            e.user_id: (e.total_innovation, e.completed_projects) for e in LeaderboardEntry.objects.all()
+        },
+    }
+
+
+def _same(a, b):
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def diff_rollups():
+    """Returns a list of (table, key, expected, live) for every mismatch."""
+    expected, live = expected_rollups(), live_rollups()
+    differences = []
+    for table in expected:
+        for key in expected[table].keys() | live[table].keys():
+            want, have = expected[table].get(key), live[table].get(key)
+            if not _same(want, have):
+                differences.append((table, key, want, have))
+    return differences
+
+
+@transaction.atomic
+def rebuild_rollups():
+    """Replaces the rollup tables with values computed from scratch."""
+    expected = expected_rollups()
+    AnalyticsCounter.objects.all().delete()
+    AnalyticsCounter.objects.bulk_create([
+        AnalyticsCounter(dimension=dimension, value=value, count=count)
+        for (dimension, value), count in expected['counters'].items()
+    ])
+    ProjectScoreRollup.objects.all().delete()
+    ProjectScoreRollup.objects.bulk_create([
+        ProjectScoreRollup(project_id=pk, title=title, status=status, innovation_score=score)
+        for pk, (title, status, score) in expected['scores'].items()
+    ])
+    LeaderboardEntry.objects.all().delete()
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(user_id=pk, total_innovation=total, completed_projects=completed)
+        for pk, (total, completed) in expected['leaderboard'].items()
+    ])
@@ -2,8 +2,40 @@
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from djoser.serializers import UserSerializer as BaseUserSerializer
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from .models import User, ProjectSubmission, Group, Project, Team
 from django.db.models import JSONField
+from django.conf import settings
+from .tokens import ClaimsRefreshToken
+from .uploads import ABSTRACT_EXTENSIONS, AUDIO_EXTENSIONS, check_upload
+
+
+class SparseFieldsMixin:
+    """
+    Lets list endpoints return only the columns a dashboard displays, e.g.
+    `?fields=id,title,status`. Only applies to the top-level serializer.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        top_level = self.parent is None or (
+            isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+        )
+        if request is None or not top_level:
+            return fields
+
+        requested = requested_fields(request)
+        if requested:
+            for name in set(fields) - requested:
+                fields.pop(name)
+        return fields
+
+
+def requested_fields(request):
+    """Returns the set of names in the `fields` query parameter (empty if absent)."""
+    raw = request.query_params.get('fields', '') if request is not None else ''
+    return {name.strip() for name in raw.split(',') if name.strip()}
 
 
 # User serializers
@@ -18,22 +50,51 @@ class UserSerializer(BaseUserSerializer):
         fields = ('id', 'username', 'email', 'role') # 'role' field must be here
         read_only_fields = ('role',)
 
+# JWT serializers: access tokens carry role and group claims (see tokens.py)
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
+
 # Main Project Submission serializer
-class ProjectSubmissionSerializer(serializers.ModelSerializer):
+class ProjectSubmissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # This serializer is used for both students and teachers
     student = UserSerializer(read_only=True)
     group = serializers.PrimaryKeyRelatedField(queryset=Group.objects.all())
 
     class Meta:
         model = ProjectSubmission
-        fields = ('id', 'student', 'title', 'abstract_text', 'abstract_file', 'audio_file', 'transcribed_text', 'submitted_at', 'group','embedding', # This field is important for Plagiarism Check
+        fields = ('id', 'student', 'title', 'abstract_text', 'abstract_file', 'audio_file', 'transcribed_text', 'submitted_at', 'group',
             'relevance_score', # Missing field
             'feasibility_score', # Missing field
             'innovation_score','status')
         read_only_fields = ('student', 'submitted_at', 'transcribed_text')
+        # The abstract may come from the uploaded file or audio instead (filled in by background jobs)
+        extra_kwargs = {'abstract_text': {'required': False, 'allow_blank': True}}
+
+    def validate_abstract_file(self, value):
+        error = value and check_upload(value, ABSTRACT_EXTENSIONS, settings.ABSTRACT_FILE_MAX_BYTES)
+        if error:
+            raise serializers.ValidationError(error)
+        return value
+
+    def validate_audio_file(self, value):
+        error = value and check_upload(value, AUDIO_EXTENSIONS, settings.AUDIO_FILE_MAX_BYTES)
+        if error:
+            raise serializers.ValidationError(error)
+        return value
+
+    def validate(self, attrs):
+        provided = attrs.get('abstract_text', '').strip() or attrs.get('abstract_file') or attrs.get('audio_file')
+        if self.instance is None and not provided:
+            raise serializers.ValidationError({'abstract_text': "Provide an abstract, an abstract file or an audio abstract."})
+        return attrs
+
     def create(self, validated_data):
         # 1. Pop the custom, calculated fields that are passed by the view's serializer.save()
         embedding = validated_data.pop('embedding', None)
+        embedding_model = validated_data.pop('embedding_model', '')
         relevance_score = validated_data.pop('relevance_score', 0.0)
         feasibility_score = validated_data.pop('feasibility_score', 0.0)
         innovation_score = validated_data.pop('innovation_score', 0.0)
@@ -42,7 +103,7 @@ class ProjectSubmissionSerializer(serializers.ModelSerializer):
         instance = ProjectSubmission.objects.create(**validated_data)
         
         # 3. Manually assign the popped fields to the instance
-        instance.embedding = embedding
+        instance.set_embedding(embedding, embedding_model)
         instance.relevance_score = relevance_score
         instance.feasibility_score = feasibility_score
         instance.innovation_score = innovation_score
@@ -51,7 +112,7 @@ class ProjectSubmissionSerializer(serializers.ModelSerializer):
         return instance
 
 # Serializer for the teacher dashboard (read-only)
-class TeacherSubmissionSerializer(serializers.ModelSerializer):
+class TeacherSubmissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student = UserSerializer(read_only=True)
     group_name = serializers.CharField(source='group.name', read_only=True) # NEW FIELD
 
@@ -61,7 +122,7 @@ class TeacherSubmissionSerializer(serializers.ModelSerializer):
                   'relevance_score', 'feasibility_score', 'innovation_score', 'status')
         read_only_fields = ('id', 'student', 'group', 'group_name', 'status')
         
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     submission = ProjectSubmissionSerializer(read_only=True)
     team = serializers.StringRelatedField(read_only=True)
 
@@ -84,7 +145,7 @@ class SimilarProjectSerializer(serializers.Serializer):
     title = serializers.CharField()
     student = serializers.CharField()
     abstract_text = serializers.CharField()
-class ApprovedProjectSerializer(serializers.ModelSerializer):
+class ApprovedProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the teacher's view of approved and in-progress projects.
     """
@@ -102,7 +163,7 @@ class ApprovedProjectSerializer(serializers.ModelSerializer):
             'progress_percentage', 
             'category'
         )
-class StudentSubmissionSerializer(serializers.ModelSerializer):
+class StudentSubmissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the student's dashboard, including project progress.
     """
@@ -118,4 +179,42 @@ class StudentSubmissionSerializer(serializers.ModelSerializer):
             'title', 
             'status', 
             'progress' # <-- The missing field is now included
-        )
\ No newline at end of file
+        )
+
+class SubmissionAnalysisSerializer(serializers.ModelSerializer):
+    """
+    Status of the background AI analysis for a submission (polled by the client).
+    """
+    similar_project = serializers.SerializerMethodField()
+    job = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProjectSubmission
+        fields = (
+            'id',
+            'status',
+            'originality_status',
+            'similarity_score',
+            'relevance_score',
+            'feasibility_score',
+            'innovation_score',
+            'analysis_report',
+            'similar_project',
+            'job',
+        )
+
+    def get_similar_project(self, obj):
+        similar = obj.similar_submission
+        if similar is None:
+            return None
+        return SimilarProjectSerializer({
+            'title': similar.title,
+            'student': similar.student.username,
+            'abstract_text': similar.abstract_text,
+        }).data
+
+    def get_job(self, obj):
+        job = self.context.get('job')
+        if job is None:
+            return None
+        return {'id': job.id, 'status': job.status, 'attempts': job.attempts, 'last_error': job.last_error}
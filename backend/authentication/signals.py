@@ -0,0 +1,136 @@
+# authentication/signals.py
+"""
+Keeps the analytics rollups (see rollups.py) in step with projects, scores
+and teams, drops cached chatbot project context (see chat.py) when a
+project changes, and makes JWT role and group claims (see tokens.py) stale
+when a user or a group membership changes.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import chat, rollups
+from .models import Group, Project, ProjectSubmission, Team, User
+from .tokens import claims_changed
+
+
+def _members(project_id):
+    return list(Team.members.through.objects.filter(team__project_id=project_id).values_list('user_id', flat=True))
+
+
+# --- Projects ---
+
+@receiver(pre_save, sender=Project)
+def remember_project_state(sender, instance, **kwargs):
+    instance._rollup_old = None
+    if instance.pk:
+        instance._rollup_old = Project.objects.filter(pk=instance.pk).values('status', 'category', 'title').first()
+
+
+@receiver(post_save, sender=Project)
+def update_project_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else getattr(instance, '_rollup_old', None)
+    rollups.bump_counters(old, {'status': instance.status, 'category': instance.category})
+
+    # Score changes arrive through update_submission_score; only the copied project fields matter here
+    if old is None or old['status'] != instance.status or old['title'] != instance.title:
+        score = ProjectSubmission.objects.filter(pk=instance.submission_id).values_list('innovation_score', flat=True).first()
+        rollups.sync_project_score(instance, score)
+    if old is not None and old['status'] != instance.status and 'Completed' in (old['status'], instance.status):
+        rollups.refresh_leaderboard(_members(instance.pk))
+
+
+@receiver(post_delete, sender=Project)
+def remove_project_rollups(sender, instance, **kwargs):
+    rollups.bump_counters({'status': instance.status, 'category': instance.category}, None)
+
+
+# --- Scores ---
+
+@receiver(pre_save, sender=ProjectSubmission)
+def remember_submission_score(sender, instance, **kwargs):
+    instance._rollup_score = None
+    if instance.pk:
+        instance._rollup_score = ProjectSubmission.objects.filter(pk=instance.pk).values_list(
+            'innovation_score', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=ProjectSubmission)
+def update_submission_score(sender, instance, created, raw=False, **kwargs):
+    if raw or created or getattr(instance, '_rollup_score', None) == instance.innovation_score:
+        return
+    project = Project.objects.filter(submission_id=instance.pk).first()
+    if project is None:
+        return
+    rollups.sync_project_score(project, instance.innovation_score)
+    if project.status == 'Completed':
+        rollups.refresh_leaderboard(_members(project.pk))
+
+
+# --- Team membership ---
+
+@receiver(m2m_changed, sender=Team.members.through)
+def update_member_leaderboard(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._rollup_cleared = [instance.pk] if reverse else list(instance.members.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        rollups.refresh_leaderboard(getattr(instance, '_rollup_cleared', []))
+    elif action in ('post_add', 'post_remove'):
+        rollups.refresh_leaderboard([instance.pk] if reverse else pk_set)
+
+
+@receiver(pre_delete, sender=Team)
+def remember_team_members(sender, instance, **kwargs):
+    instance._rollup_members = list(instance.members.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Team)
+def update_team_leaderboard(sender, instance, **kwargs):
+    rollups.refresh_leaderboard(getattr(instance, '_rollup_members', []))
+
+
+# --- Chatbot project context ---
+
+@receiver(post_save, sender=Project)
+def refresh_project_chat_context(sender, instance, **kwargs):
+    chat.invalidate_project_context(instance.pk)
+
+
+@receiver(post_save, sender=ProjectSubmission)
+def refresh_submission_chat_context(sender, instance, created, **kwargs):
+    if created:
+        return
+    project_id = Project.objects.filter(submission_id=instance.pk).values_list('id', flat=True).first()
+    if project_id is not None:
+        chat.invalidate_project_context(project_id)
+
+
+# --- JWT claims ---
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_user_claims(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        claims_changed([instance.pk])
+
+
+@receiver(m2m_changed, sender=Group.teachers.through)
+@receiver(m2m_changed, sender=Group.students.through)
+def refresh_membership_claims(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._claims_cleared = [instance.pk]
+        else:
+            related = instance.teachers if sender is Group.teachers.through else instance.students
+            instance._claims_cleared = list(related.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        claims_changed(getattr(instance, '_claims_cleared', []))
+    elif action in ('post_add', 'post_remove'):
+        claims_changed([instance.pk] if reverse else pk_set)
+
+
+@receiver(pre_delete, sender=Group)
+def refresh_group_claims(sender, instance, **kwargs):
+    claims_changed(set(instance.teachers.values_list('pk', flat=True)) | set(instance.students.values_list('pk', flat=True)))
@@ -0,0 +1,106 @@
+# authentication/similarity.py
+"""
+Keeps a per-process vector index of archived submissions so a new idea is
+only compared (by the LLM) against its nearest neighbours.
+"""
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max, Q
+
+from project_management.vector_codec import stack_vectors
+from project_management.vector_index import build_index
+from .models import ProjectSubmission
+
+_lock = threading.Lock()
+_cache = {'index': None, 'signature': None, 'key': None}
+
+
+def _eligible_submissions():
+    return ProjectSubmission.objects.filter(~Q(status__in=['Rejected', 'Blocked']))
+
+
+def _load_rows(queryset, dim):
+    """Loads (ids, float32 matrix) straight from the binary embedding column."""
+    ids, matrices = [], []
+    rows = queryset.values_list('id', 'embedding_vector', 'embedding_dtype', 'embedding_scale')
+    by_dtype = {}
+    for row_id, blob, dtype, scale in rows:
+        group = by_dtype.setdefault(dtype, ([], [], []))
+        group[0].append(row_id)
+        group[1].append(blob)
+        group[2].append(scale)
+    for dtype, (row_ids, blobs, scales) in by_dtype.items():
+        ids.extend(row_ids)
+        matrices.append(stack_vectors(blobs, dim, dtype, scales))
+    if not matrices:
+        return ids, matrices
+    return ids, matrices[0] if len(matrices) == 1 else np.vstack(matrices)
+
+
+def get_submission_index(dim, model_version):
+    """
+    Returns an index over all non-rejected submissions embedded with
+    ``model_version``. The index is reused between requests and only rebuilt
+    when rows were removed or changed (status or embedding, seen through
+    ``updated_at``); new rows are appended.
+    """
+    queryset = _eligible_submissions().filter(
+        embedding_vector__isnull=False, embedding_dim=dim, embedding_model=model_version
+    )
+    signature = queryset.aggregate(max_id=Max('id'), total=Count('id'), updated_at=Max('updated_at'))
+    key = (dim, model_version)
+
+    with _lock:
+        index = _cache['index']
+        previous = _cache['signature']
+        if index is not None and _cache['key'] == key and previous == signature:
+            return index
+
+        grew_only = (
+            index is not None and _cache['key'] == key and previous is not None
+            and (signature['max_id'] or 0) >= (previous['max_id'] or 0)
+            and signature['total'] - previous['total']
+            == queryset.filter(id__gt=previous['max_id'] or 0).count()
+            and (
+                previous['updated_at'] is None  # no rows yet
+                or not queryset.filter(id__lte=previous['max_id'], updated_at__gt=previous['updated_at']).exists()
+            )
+        )
+        if grew_only:
+            ids, vectors = _load_rows(queryset.filter(id__gt=previous['max_id'] or 0), dim)
+        else:
+            index = build_index(
+                settings.SIMILARITY_INDEX_BACKEND, dim, **settings.SIMILARITY_INDEX_OPTIONS
+            )
+            ids, vectors = _load_rows(queryset, dim)
+        index.add(ids, vectors)
+
+        _cache['index'] = index
+        _cache['signature'] = signature
+        _cache['key'] = key
+        return index
+
+
+def find_similar_submissions(embedding, model_version, k=None, exclude_id=None):
+    """
+    Returns up to ``k`` candidate submissions (dicts with ``abstract_text``,
+    ``title``, ``student__username`` and ``similarity``) ordered by vector
+    similarity. Without an embedding there is nothing to rank by, so the most
+    recent submissions are returned instead.
+    """
+    k = k or settings.SIMILARITY_TOP_K
+    fields = ('id', 'abstract_text', 'title', 'student__username')
+
+    if not embedding:
+        recent = _eligible_submissions().exclude(id=exclude_id).order_by('-submitted_at')
+        return [dict(row, similarity=None) for row in recent.values(*fields)[:settings.SIMILARITY_FALLBACK_LIMIT]]
+
+    index = get_submission_index(len(embedding), model_version)
+    hits = [
+        (row_id, score) for row_id, score in index.search(embedding, k + 1)
+        if row_id != exclude_id and score >= settings.SIMILARITY_MIN_SCORE
+    ][:k]
+    rows = {row['id']: row for row in ProjectSubmission.objects.filter(id__in=[h[0] for h in hits]).values(*fields)}
+    return [dict(rows[row_id], similarity=score) for row_id, score in hits if row_id in rows]
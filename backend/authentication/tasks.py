@@ -0,0 +1,187 @@
+# authentication/tasks.py
+"""Background job handlers (executed by `manage.py run_worker`)."""
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from project_management.project_analyzer import analyzer
+from project_management.transcription import TranscriptionUnavailable, get_transcriber
+from . import chat, viva
+from .jobs import RetryJob, enqueue, register
+from .models import Project, ProjectSubmission
+from .similarity import find_similar_submissions
+from .uploads import InvalidUpload, extract_text, local_path, validate_abstract_file, validate_audio_file
+
+
+def _analysis_failed(job):
+    """Lets teachers review the submission manually when analysis never succeeds."""
+    ProjectSubmission.objects.filter(
+        id=job.payload['submission_id'], status='Pending Analysis'
+    ).update(status='Submitted', originality_status='ANALYSIS_FAILED')
+
+
+def _prepare_uploads(submission):
+    """
+    First stage of the analysis: checks the content of the uploaded files and
+    fills an empty abstract from the abstract file. Invalid files are removed.
+    Returns notes for the analysis report.
+    """
+    notes = []
+    if submission.abstract_file:
+        name = submission.abstract_file.name
+        try:
+            with local_path(submission.abstract_file) as path:
+                validate_abstract_file(path, name)
+                if not submission.abstract_text.strip():
+                    submission.abstract_text = extract_text(path, name)
+        except InvalidUpload as e:
+            notes.append(str(e))
+            submission.abstract_file.delete(save=False)
+        except Exception as e:
+            # Corrupt but plausible files are kept for the teacher to open
+            notes.append(f"Could not extract text from the abstract file: {e}")
+
+    if submission.audio_file:
+        try:
+            with local_path(submission.audio_file) as path:
+                validate_audio_file(path)
+        except InvalidUpload as e:
+            notes.append(str(e))
+            submission.audio_file.delete(save=False)
+
+    submission.save(update_fields=['abstract_text', 'abstract_file', 'audio_file'])
+    return notes
+
+
+@register('analyze_submission', on_failure=_analysis_failed)
+def analyze_submission(job):
+    """Runs the similarity check and scoring for a 'Pending Analysis' submission."""
+    try:
+        submission = ProjectSubmission.objects.get(id=job.payload['submission_id'])
+    except ProjectSubmission.DoesNotExist:
+        return {'detail': 'Submission was deleted before analysis.'}
+    if submission.status != 'Pending Analysis':
+        return {'detail': f'Submission is already {submission.status}.'}
+
+    upload_notes = _prepare_uploads(submission)
+    text_to_analyze = submission.abstract_text or submission.title
+    model_version = analyzer.embedding_model.model_version
+    embedding = analyzer.get_embedding(text_to_analyze)
+    candidates = find_similar_submissions(embedding, model_version, exclude_id=submission.id)
+
+    result = analyzer.check_plagiarism_and_suggest_features(
+        title=submission.title,
+        abstract=text_to_analyze,
+        existing_submissions=candidates,
+    )
+    # The analyzer swallows Gemini errors; retry those while attempts remain. Without a
+    # similarity verdict the submission stays pending, and the last attempt fails the job
+    # (see _analysis_failed) rather than letting it pass as original.
+    if result['originality_status'] == 'SIMILARITY_FAIL':
+        raise RetryJob(result['full_report'])
+    if result['originality_status'] == 'API_FAIL' and job.attempts < job.max_attempts:
+        raise RetryJob(result['full_report'])
+
+    blocked = result['originality_status'] == 'BLOCKED_HIGH_SIMILARITY'
+    similar = result['most_similar_project'] or {}
+
+    submission.set_embedding(embedding, model_version)
+    submission.relevance_score = result['relevance']
+    submission.feasibility_score = result['feasibility']
+    submission.innovation_score = result['innovation']
+    submission.originality_status = result['originality_status']
+    submission.similarity_score = result['similarity_score']
+    submission.analysis_report = result['full_report']
+    if upload_notes:
+        submission.analysis_report += '\n\n**Upload checks:** ' + ' '.join(upload_notes)
+    submission.similar_submission_id = similar.get('id')
+    submission.status = 'Blocked' if blocked else 'Submitted'
+    submission.save()
+
+    return {
+        'submission_id': submission.id,
+        'status': submission.status,
+        'originality_status': submission.originality_status,
+    }
+
+
+# --- Transcription (queue 'transcription', run by a dedicated worker pool) ---
+
+def _start_analysis(submission_id):
+    """Queues the analysis of a submission that was waiting for its transcript."""
+    if ProjectSubmission.objects.filter(id=submission_id, status='Pending Analysis').exists():
+        enqueue('analyze_submission', {'submission_id': submission_id})
+
+
+def _transcription_failed(job):
+    # Analyse what the student typed or uploaded rather than leaving the submission pending
+    _start_analysis(job.payload['submission_id'])
+
+
+@register('transcribe_submission', on_failure=_transcription_failed)
+def transcribe_submission(job):
+    """Transcribes a submission's audio abstract, then queues its analysis."""
+    try:
+        submission = ProjectSubmission.objects.get(id=job.payload['submission_id'])
+    except ProjectSubmission.DoesNotExist:
+        return {'detail': 'Submission was deleted before transcription.'}
+
+    transcript = None
+    if submission.audio_file:
+        try:
+            transcriber = get_transcriber()
+        except TranscriptionUnavailable as e:
+            # Queued before the backend was switched off: analyse the text instead
+            _start_analysis(submission.id)
+            return {'submission_id': submission.id, 'detail': str(e)}
+        with local_path(submission.audio_file) as path:
+            validate_audio_file(path)
+            transcript = transcriber.transcribe(path)
+        submission.transcribed_text = transcript.text
+        if not submission.abstract_text.strip():
+            submission.abstract_text = transcript.text
+        submission.save(update_fields=['transcribed_text', 'abstract_text'])
+
+    _start_analysis(submission.id)
+    if transcript is None:
+        return {'submission_id': submission.id, 'detail': 'No audio file.'}
+    return {
+        'submission_id': submission.id,
+        'model': transcriber.model_version,
+        'audio_seconds': round(transcript.duration, 2),
+        'real_time_factor': round(transcript.elapsed / (transcript.duration or 1), 3),
+    }
+
+
+def _discard_prompt_audio(job):
+    default_storage.delete(job.payload['path'])
+
+
+@register('transcribe_prompt', on_failure=_discard_prompt_audio)
+def transcribe_prompt(job):
+    """Transcribes a chatbot voice prompt stored at payload['path']; the text is the job result."""
+    path = job.payload['path']
+    transcriber = get_transcriber(**settings.TRANSCRIPTION_CHAT_OPTIONS)
+    with local_path(path) as local:
+        transcript = transcriber.transcribe(local)
+    default_storage.delete(path)
+    return {'text': transcript.text, 'audio_seconds': round(transcript.duration, 2)}
+
+
+@register('summarize_chat')
+def summarize_chat(job):
+    """Folds older chatbot messages into the session summary (see chat.py)."""
+    return chat.summarize_session(job.payload['session_id'])
+
+
+@register('generate_viva_questions')
+def generate_viva_questions(job):
+    """Fills the viva question bank of a project for one progress band (see viva.py)."""
+    try:
+        question_set = viva.generate_question_set(job.payload['project_id'], job.payload['band'])
+    except Project.DoesNotExist:
+        return {'detail': 'Project was deleted before its viva questions were generated.'}
+    if question_set is None:
+        if job.attempts < job.max_attempts:
+            raise RetryJob("Gemini did not return viva questions.")
+        return {'detail': 'Gemini did not return viva questions.'}
+    return {'project_id': job.payload['project_id'], 'band': question_set.band, 'questions': len(question_set.questions)}
@@ -1,3 +1,1348 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import wave
+import zipfile
+from pathlib import Path
 
-# Create your tests here.
+import numpy as np
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from unittest import mock
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from google.api_core import exceptions as api_exceptions
+from prometheus_client import REGISTRY
+
+from . import chat, similarity
+from .jobs import HANDLERS, claim, claim_next, enqueue, requeue_stale_jobs, run_job
+from .models import BackgroundJob, ChatMessage, ChatSession, Group, LeaderboardEntry, Project, ProjectScoreRollup, ProjectSubmission, Team, User, VivaQuestionSet
+from .rollups import diff_rollups
+from .tokens import ClaimsRefreshToken
+from .uploads import InvalidUpload, extract_text, validate_abstract_file, validate_audio_file
+from project_management import database, llm_limits, profiling, transcription
+from project_management.project_analyzer import analyzer
+from project_management.database import ReadReplicaRouter, replica_reads
+from project_management.embeddings import create_embedder
+from project_management.fake_gemini import FakeGeminiServer, canned_reply
+from project_management.llm_cache import DjangoCacheBackend, LLMCache, MemoryBackend, SQLiteBackend, make_key
+from project_management.llm_limits import LLMBusy, LLMGate, MemoryTokenBucket
+from project_management.llm_resilience import CircuitBreaker, CircuitOpen, ResilientCaller
+from project_management.llm_transport import RestGenerativeModel
+from project_management.transcription import SAMPLE_RATE, Transcript, iter_audio_chunks
+from project_management.vector_codec import pack_vector, stack_vectors, unpack_vector
+from project_management.vector_index import BruteForceIndex, IVFIndex
+
+
+class VectorIndexTests(SimpleTestCase):
+    """The exact index against NumPy, and the IVF index's recall against the exact one."""
+
+    def clustered_vectors(self, n, dim=32, clusters=20, seed=1):
+        rng = np.random.default_rng(seed)
+        centers = rng.normal(size=(clusters, dim))
+        return centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+
+    def test_brute_force_matches_numpy(self):
+        vectors = self.clustered_vectors(300)
+        index = BruteForceIndex(32)
+        index.add(np.arange(300) + 1000, vectors)
+        query = vectors[7] + 0.1
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5] + 1000
+        hits = index.search(query, 5)
+        self.assertEqual([row_id for row_id, _ in hits], expected.tolist())
+        self.assertEqual([score for _, score in hits], sorted((score for _, score in hits), reverse=True))
+        with self.assertRaises(ValueError):
+            index.add([1], np.ones((1, 16)))
+
+    def test_ivf_recall_against_brute_force(self):
+        vectors = self.clustered_vectors(2000)
+        exact, approximate = BruteForceIndex(32), IVFIndex(32, nprobe=8)
+        for index in (exact, approximate):
+            index.add(np.arange(2000), vectors)
+        queries = self.clustered_vectors(50, seed=2)
+        found = sum(
+            len({row_id for row_id, _ in approximate.search(query, 10)} & {row_id for row_id, _ in exact.search(query, 10)})
+            for query in queries
+        )
+        self.assertGreaterEqual(found / (50 * 10), 0.9)
+
+    def test_ivf_retrains_after_doubling(self):
+        vectors = self.clustered_vectors(1000)
+        index = IVFIndex(32)
+        index.add(np.arange(100), vectors[:100])
+        self.assertEqual((index.trained_size, index.centroids.shape[0]), (100, 10))
+        index.add(np.arange(100, 200), vectors[100:200])
+        self.assertEqual(index.trained_size, 100)  # not yet past twice the trained size
+        index.add(np.arange(200, 1000), vectors[200:])
+        self.assertEqual((index.trained_size, index.centroids.shape[0]), (1000, 31))
+        self.assertEqual(index.search(vectors[500], 1)[0][0], 500)
+
+
+class SimilaritySearchTests(TestCase):
+    """find_similar_submissions ranks by the stored embeddings and follows changes to them."""
+
+    def setUp(self):
+        patcher = mock.patch.dict(similarity._cache, {'index': None, 'signature': None, 'key': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.student = User.objects.create(username='ranked', role='Student')
+
+    def submission(self, title, vector, status='Submitted'):
+        submission = ProjectSubmission(student=self.student, title=title, abstract_text=title, status=status)
+        submission.set_embedding(vector, 'test-model')
+        submission.save()
+        return submission
+
+    def titles(self, vector, **kwargs):
+        return [row['title'] for row in similarity.find_similar_submissions(vector, 'test-model', **kwargs)]
+
+    def test_nearest_submissions_first_and_index_follows_changes(self):
+        self.submission('Drone mapping', [1, 0, 0, 0])
+        farm = self.submission('Smart farm', [0, 1, 0, 0])
+        self.submission('Rejected farm', [0, 1, 0.1, 0], status='Rejected')
+        self.submission('Greenhouse', [0, 0.8, 0.6, 0])
+        self.assertEqual(self.titles([0, 1, 0.2, 0], k=2), ['Smart farm', 'Greenhouse'])
+
+        # appended without a rebuild
+        index = similarity._cache['index']
+        self.submission('Irrigation', [0, 1, 0.2, 0])
+        self.assertEqual(self.titles([0, 1, 0.2, 0], k=1), ['Irrigation'])
+        self.assertIs(similarity._cache['index'], index)
+
+        # re-embedded in place: same ids and count, newer updated_at
+        farm.set_embedding([0, 0, 0, 1], 'test-model')
+        farm.save()
+        self.assertEqual(self.titles([0, 0, 0, 1], k=1), ['Smart farm'])
+        self.assertIsNot(similarity._cache['index'], index)
+        self.assertNotIn('Smart farm', self.titles([0, 1, 0.2, 0], k=3))
+
+
+class EmbeddingTests(SimpleTestCase):
+    """The hashing embedder returns one unit-length float32 row per text."""
+
+    def test_shape_and_normalization(self):
+        embedder = create_embedder('hashing', dim=64)
+        matrix = embedder.encode(['Smart irrigation with soil sensors', '', 'Drone mapping of farms'])
+        self.assertEqual((matrix.shape, matrix.dtype), ((3, 64), np.float32))
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), [1, 0, 1], atol=1e-6)
+        self.assertEqual(embedder.encode('single text').shape, (1, 64))
+        self.assertEqual(embedder.model_version, 'hashing-v1-64')
+
+    def test_related_texts_score_higher_and_idf_keeps_norm(self):
+        embedder = create_embedder('hashing', dim=512)
+        irrigation, sensors, drones = embedder.encode([
+            'Smart irrigation system using soil moisture sensors',
+            'Soil moisture sensors for a smart irrigation controller',
+            'Face recognition attendance app for classrooms',
+        ])
+        self.assertGreater(irrigation @ sensors, irrigation @ drones)
+        embedder.fit_idf(['soil sensors', 'soil irrigation', 'classroom attendance'])
+        np.testing.assert_allclose(np.linalg.norm(embedder.encode(['soil moisture']), axis=1), [1], atol=1e-6)
+
+    def test_analyzer_embedding_and_unknown_backend(self):
+        with mock.patch.object(analyzer, 'embedding_model', create_embedder('hashing', dim=32)):
+            self.assertEqual(analyzer.get_embedding('   '), [])
+            vector = analyzer.get_embedding('Smart farm')
+        self.assertEqual(len(vector), 32)
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        with self.assertRaises(ValueError):
+            create_embedder('word2vec')
+
+
+class VectorCodecTests(SimpleTestCase):
+    """pack_vector/unpack_vector round-trips for both stored dtypes."""
+
+    def test_float32_round_trip_is_exact(self):
+        vector = np.random.default_rng(3).normal(size=64).astype(np.float32)
+        data, scale = pack_vector(vector, 'float32')
+        self.assertEqual((len(data), scale), (64 * 4, None))
+        np.testing.assert_array_equal(unpack_vector(data, 'float32', scale), vector)
+
+    def test_int8_round_trip_within_half_a_step(self):
+        vector = np.random.default_rng(4).normal(size=64)
+        data, scale = pack_vector(vector, 'int8')
+        self.assertEqual(len(data), 64)
+        self.assertAlmostEqual(scale, np.abs(vector).max() / 127, places=6)
+        np.testing.assert_array_less(np.abs(unpack_vector(data, 'int8', scale) - vector), scale / 2 + 1e-6)
+
+    def test_stack_and_unknown_dtype(self):
+        vectors = np.random.default_rng(5).normal(size=(3, 8))
+        packed = [pack_vector(vector, 'int8') for vector in vectors]
+        stacked = stack_vectors([data for data, _ in packed], 8, 'int8', [scale for _, scale in packed])
+        np.testing.assert_allclose(stacked, [unpack_vector(data, 'int8', scale) for data, scale in packed])
+        with self.assertRaises(ValueError):
+            pack_vector(vectors[0], 'float16')
+
+
+class EmbeddingMigrationTests(TransactionTestCase):
+    """0010 packs the JSON embeddings into float32 bytes, and unpacks them when reversed."""
+
+    before = [('authentication', '0009_projectsubmission_updated_at')]
+    after = [('authentication', '0010_projectsubmission_binary_embedding')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_json_embeddings_round_trip(self):
+        apps = self.migrate(self.before)
+        student = apps.get_model('authentication', 'User').objects.create(username='legacy', role='Student')
+        ProjectSubmission = apps.get_model('authentication', 'ProjectSubmission')
+        vector = [0.25, -1.5, 3.0]
+        embedded = ProjectSubmission.objects.create(student=student, title='Old', abstract_text='a', embedding=vector)
+        ProjectSubmission.objects.create(student=student, title='None', abstract_text='b')
+
+        ProjectSubmission = self.migrate(self.after).get_model('authentication', 'ProjectSubmission')
+        row = ProjectSubmission.objects.get(id=embedded.id)
+        self.assertEqual((row.embedding_dim, row.embedding_dtype, row.embedding_model), (3, 'float32', 'legacy-json'))
+        np.testing.assert_array_equal(unpack_vector(bytes(row.embedding_vector), 'float32', row.embedding_scale), vector)
+        self.assertIsNone(ProjectSubmission.objects.get(title='None').embedding_vector)
+
+        ProjectSubmission = self.migrate(self.before).get_model('authentication', 'ProjectSubmission')
+        self.assertEqual(ProjectSubmission.objects.get(id=embedded.id).embedding, vector)
+
+
+class ListEndpointQueryCountTests(TestCase):
+    """
+    Every list endpoint must run a constant number of queries. Each test
+    counts the queries for a small and a larger data set and fails if the
+    count grows with the number of rows (an N+1 regression).
+    """
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role='Teacher')
+        self.own_group = Group.objects.create(name='own')
+        self.other_group = Group.objects.create(name='other')
+        self.own_group.teachers.add(self.teacher)
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(self.teacher)
+        self.created = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.created += 1
+            n = self.created
+            student = User.objects.create(username=f'student{n}', role='Student')
+            for group in (self.own_group, self.other_group):
+                group.students.add(student)
+                submission = ProjectSubmission.objects.create(
+                    student=student, group=group, title=f'Project {n} {group.name}',
+                    abstract_text='Abstract', innovation_score=n,
+                )
+                project = Project.objects.create(
+                    submission=submission, title=submission.title, abstract='Abstract', status='Completed',
+                )
+                Team.objects.create(project=project).members.add(student)
+            ProjectSubmission.objects.create(
+                student=student, group=self.own_group, title=f'Pending {n}', abstract_text='Abstract',
+            )
+            ProjectSubmission.objects.filter(student=student, project__isnull=False).update(status='Completed')
+            Group.objects.create(name=f'extra{n}').students.add(student)
+
+    def count_queries(self, url, client=None):
+        with CaptureQueriesContext(connection) as context:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url, client_factory=None):
+        self.add_rows(2)
+        client = client_factory() if client_factory else None
+        small = self.count_queries(url, client)
+        self.add_rows(8)
+        large = self.count_queries(url, client)
+        self.assertEqual(small, large, f'{url} ran {small} queries for 2 rows but {large} for 10')
+
+    def test_teacher_submissions(self):
+        self.assertConstantQueries('/teacher/submissions/')
+
+    def test_appointed_teacher_dashboard(self):
+        self.assertConstantQueries('/teacher/appointed/')
+
+    def test_unappointed_teacher_dashboard(self):
+        self.assertConstantQueries('/teacher/unappointed/')
+
+    def test_approved_projects(self):
+        self.assertConstantQueries('/teacher/approved-projects/')
+
+    def test_all_projects(self):
+        self.assertConstantQueries('/projects/all/')
+
+    def test_analytics(self):
+        self.assertConstantQueries('/analytics/')
+
+    def test_leaderboard(self):
+        self.assertConstantQueries('/leaderboard/')
+
+    def test_admin_dashboard(self):
+        self.assertConstantQueries('/admin/dashboard/')
+
+    def test_top_alumni_projects(self):
+        self.assertConstantQueries('/alumni/top-projects/')
+
+    def test_student_dashboard_and_alumni_portal(self):
+        self.add_rows(1)
+        student = User.objects.get(username='student1')
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(student)
+        urls = ('/student/submissions/', '/alumni/my-projects/')
+        before = [self.count_queries(url, client) for url in urls]
+
+        for i in range(5):
+            submission = ProjectSubmission.objects.create(
+                student=student, group=self.own_group, title=f'Extra {i}', abstract_text='A', status='Archived',
+            )
+            Project.objects.create(submission=submission, title=submission.title, abstract='A', status='Archived')
+
+        self.assertEqual(before, [self.count_queries(url, client) for url in urls])
+
+
+class ListPaginationTests(TestCase):
+    """Opt-in cursor pagination and `?fields=` projections of the project lists."""
+
+    def setUp(self):
+        teacher = User.objects.create(username='pager', role='Teacher')
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(teacher)
+        student = User.objects.create(username='paged-student', role='Student')
+        now = timezone.now()
+        # Submission dates out of id order, with a tie broken by id
+        self.expected = []
+        for days in (3, 0, 5, 1, 1):
+            submission = ProjectSubmission.objects.create(student=student, title=f'Paged {days}', abstract_text='Abstract')
+            ProjectSubmission.objects.filter(id=submission.id).update(submitted_at=now - timezone.timedelta(days=days))
+            project = Project.objects.create(submission=submission, title=submission.title, abstract='Long abstract')
+            self.expected.append((days, -project.id, project.id))
+        self.expected = [project_id for _, _, project_id in sorted(self.expected)]
+
+    def pages(self, url):
+        ids = []
+        while url:
+            body = self.client.get(url).json()
+            ids += [row['id'] for row in body['results']]
+            url = body['next']
+        return ids
+
+    def test_newest_submission_first_across_pages(self):
+        for url in ('/projects/all/', '/teacher/approved-projects/'):
+            self.assertEqual([row['id'] for row in self.client.get(url).json()], self.expected)
+            self.assertEqual(self.pages(f'{url}?page_size=2'), self.expected)
+
+    def test_fields_projection_skips_unrequested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.client.get('/projects/all/?fields=id,title').json()
+        self.assertEqual([set(row) for row in rows], [{'id', 'title'}] * 5)
+        self.assertFalse([query for query in queries if '"authentication_project"."abstract"' in query['sql']])
+        full = self.client.get('/projects/all/').json()
+        self.assertEqual(full[0]['abstract'], 'Long abstract')
+
+
+class RollupConsistencyTests(TestCase):
+    """The signal-maintained rollups must match a rebuild from scratch after any change."""
+
+    def assertConsistent(self):
+        self.assertEqual(diff_rollups(), [])
+
+    def test_project_lifecycle(self):
+        students = [User.objects.create(username=f'student{i}', role='Student') for i in range(3)]
+        projects = []
+        for i, student in enumerate(students):
+            submission = ProjectSubmission.objects.create(
+                student=student, title=f'Project {i}', abstract_text='Abstract', innovation_score=i + 1,
+            )
+            project = Project.objects.create(submission=submission, title=submission.title, abstract='Abstract')
+            Team.objects.create(project=project).members.add(student)
+            projects.append(project)
+        self.assertConsistent()
+
+        projects[0].status = 'Completed'
+        projects[0].category = 'IoT'
+        projects[0].save()
+        projects[1].status = 'Completed'
+        projects[1].save()
+        projects[1].team.members.add(students[2])
+        self.assertConsistent()
+        self.assertEqual(LeaderboardEntry.objects.get(user=students[2]).total_innovation, 2)
+
+        submission = projects[1].submission
+        submission.innovation_score = 9
+        submission.save()
+        students[0].active_projects.clear()
+        self.assertConsistent()
+
+        projects[1].status = 'Archived'
+        projects[1].save()
+        projects[2].submission.delete()
+        self.assertConsistent()
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+    def test_unrelated_project_save_skips_the_rollups(self):
+        submission = ProjectSubmission.objects.create(
+            student=User.objects.create(username='progress', role='Student'), title='Farm', abstract_text='Abstract',
+        )
+        project = Project.objects.create(submission=submission, title='Farm', abstract='Abstract')
+        project.progress_percentage = 40
+        with self.assertNumQueries(2):  # the state lookup and the project UPDATE
+            project.save()
+        project.title = 'Smart farm'
+        project.save()
+        self.assertEqual(ProjectScoreRollup.objects.get(project_id=project.id).title, 'Smart farm')
+        self.assertConsistent()
+
+
+def verdict(originality_status, similar=None):
+    """A check_plagiarism_and_suggest_features result."""
+    return {
+        'originality_status': originality_status, 'similarity_score': 0.9 if similar else 0.1,
+        'relevance': 8.0, 'feasibility': 7.0, 'innovation': 6.0,
+        'full_report': 'Scores and suggestions.', 'most_similar_project': similar,
+    }
+
+
+class SubmissionAnalysisTests(TestCase):
+    """Submitting an idea: 201 or 409 when analysed inline, 202 and a pollable verdict when queued."""
+
+    def setUp(self):
+        self.student = User.objects.create(username='submitter', role='Student')
+        group = Group.objects.create(name='submitters')
+        group.students.add(self.student)
+        self.earlier = ProjectSubmission.objects.create(
+            student=User.objects.create(username='earlier', role='Student'), group=group,
+            title='Smart farm', abstract_text='Soil sensors over LoRa.', status='Approved',
+        )
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(self.student).access_token}')
+        self.blocked = verdict('BLOCKED_HIGH_SIMILARITY', similar={
+            'id': self.earlier.id, 'title': 'Smart farm', 'student': 'earlier', 'abstract_text': 'Soil sensors over LoRa.',
+        })
+
+    def submit(self, result, title='Farm monitor'):
+        with mock.patch.object(analyzer, 'check_plagiarism_and_suggest_features', return_value=result):
+            return self.client.post('/projects/submit/', {'title': title, 'abstract_text': 'Soil moisture alerts.'})
+
+    def run_queued_jobs(self, result):
+        with mock.patch.object(analyzer, 'check_plagiarism_and_suggest_features', return_value=result):
+            # retries are due at once
+            while BackgroundJob.objects.filter(status='Queued').update(run_after=timezone.now()):
+                run_job(claim_next('analysis', 'test-worker'))
+
+    @override_settings(ANALYSIS_ASYNC=False)
+    def test_inline_analysis_answers_201_or_409(self):
+        response = self.submit(verdict('ORIGINAL_PASSED'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ProjectSubmission.objects.get(title='Farm monitor').status, 'Submitted')
+
+        response = self.submit(self.blocked, title='Farm monitor 2')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['similar_project']['title'], 'Smart farm')
+        self.assertFalse(ProjectSubmission.objects.filter(title='Farm monitor 2').exists())
+
+    @override_settings(ANALYSIS_ASYNC=True)
+    def test_queued_analysis_answers_202_and_the_verdict_is_polled(self):
+        response = self.submit(self.blocked)
+        self.assertEqual(response.status_code, 202)
+        analysis_url = response.json()['analysis_url']
+        self.assertEqual(self.client.get(analysis_url).json()['status'], 'Pending Analysis')
+
+        self.run_queued_jobs(self.blocked)
+        analysis = self.client.get(analysis_url).json()
+        self.assertEqual(analysis['status'], 'Blocked')
+        self.assertEqual(analysis['similar_project']['title'], 'Smart farm')
+        self.submit(self.blocked, title='Still pending')
+
+        # the student sees both attempts, teachers neither
+        self.assertEqual(
+            [row['status'] for row in self.client.get('/student/submissions/').json()], ['Pending Analysis', 'Blocked'],
+        )
+        teacher = User.objects.create(username='reviewer', role='Teacher')
+        self.client.force_authenticate(teacher)
+        for url in ('/teacher/submissions/', '/teacher/unappointed/'):
+            self.assertEqual([row['title'] for row in self.client.get(url).json()], ['Smart farm'])
+
+    @override_settings(ANALYSIS_ASYNC=True)
+    def test_failed_similarity_check_is_retried_and_never_passes(self):
+        self.submit(verdict('SIMILARITY_FAIL'))
+        submission = ProjectSubmission.objects.get(title='Farm monitor')
+        with mock.patch.object(analyzer, 'check_plagiarism_and_suggest_features', return_value=verdict('SIMILARITY_FAIL')):
+            run_job(claim_next('analysis', 'test-worker'))
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, 'Pending Analysis')
+        self.assertEqual(BackgroundJob.objects.get(kind='analyze_submission').status, 'Queued')
+
+        with self.assertLogs('authentication.jobs', 'WARNING'):
+            self.run_queued_jobs(verdict('SIMILARITY_FAIL'))
+        submission.refresh_from_db()
+        self.assertEqual((submission.status, submission.originality_status), ('Submitted', 'ANALYSIS_FAILED'))
+        self.assertEqual(BackgroundJob.objects.get(kind='analyze_submission').status, 'Failed')
+
+
+class JobLeaseTests(TransactionTestCase):
+    """A running job keeps its lease; a worker that lost it cannot overwrite the new run."""
+
+    def run_handler(self, handler):
+        with mock.patch.dict(HANDLERS, {'lease_test': (handler, None)}):
+            job = enqueue('lease_test', {}, queue='lease-test')
+            return run_job(claim(job.id, 'worker-1'))
+
+    @override_settings(JOB_QUEUE={**settings.JOB_QUEUE, 'LEASE_SECONDS': 0.3})
+    def test_heartbeat_keeps_a_long_job_from_being_requeued(self):
+        def slow(job):
+            time.sleep(0.6)
+            return {'requeued': requeue_stale_jobs('lease-test')}
+
+        job = self.run_handler(slow)
+        self.assertEqual((job.status, job.result), ('Succeeded', {'requeued': 0}))
+
+    def test_outcome_after_a_lost_lease_is_discarded(self):
+        def superseded(job):
+            # the lease ran out, and the requeued job was claimed by another worker
+            BackgroundJob.objects.filter(id=job.id).update(status='Queued')
+            claim(job.id, 'worker-2')
+            return {'done': True}
+
+        with self.assertLogs('authentication.jobs', 'WARNING'):
+            job = self.run_handler(superseded)
+        row = BackgroundJob.objects.get(id=job.id)
+        self.assertEqual((row.status, row.locked_by, row.attempts, row.result), ('Running', 'worker-2', 2, None))
+
+
+def pdf_bytes(text):
+    """A one-page PDF showing `text`."""
+    stream = f'BT /F1 12 Tf 72 712 Td ({text}) Tj ET'.encode()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R'
+        b' /Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    body, offsets = b'%PDF-1.4\n', []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b'%d 0 obj\n%s\nendobj\n' % (number, obj)
+    xref = len(body)
+    body += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    body += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    return body + b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+
+
+def docx_bytes(*paragraphs, document=True):
+    """A DOCX archive with one paragraph per argument."""
+    namespace = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    with tempfile.TemporaryFile() as file:
+        with zipfile.ZipFile(file, 'w') as archive:
+            archive.writestr('[Content_Types].xml', '<Types/>')
+            if document:
+                archive.writestr('word/document.xml', f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>')
+        file.seek(0)
+        return file.read()
+
+
+class UploadValidationTests(SimpleTestCase):
+    """Content checks and text extraction for uploaded abstracts and audio."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.tmp.name) / name
+        path.write_bytes(content)
+        return str(path)
+
+    def test_abstract_content_must_match_extension(self):
+        for name, content in (('a.pdf', pdf_bytes('x')), ('a.docx', docx_bytes('x')), ('a.txt', b'plain')):
+            validate_abstract_file(self.write(name, content), name)
+        for name, content in (
+            ('a.pdf', b'plain text'),
+            ('a.docx', b'PK not a zip'),
+            ('a.docx', docx_bytes(document=False)),
+            ('a.txt', b'MZ\x90\x00\x03'),
+        ):
+            with self.subTest(name=name, content=content[:12]), self.assertRaises(InvalidUpload):
+                validate_abstract_file(self.write(name, content), name)
+
+    def test_audio_magic_bytes(self):
+        for content in (
+            wav_bytes(0.01), b'ID3\x04' + bytes(12), b'\xff\xfb\x90' + bytes(13), b'OggS' + bytes(12),
+            b'fLaC' + bytes(12), b'\x1a\x45\xdf\xa3' + bytes(12), bytes(4) + b'ftypM4A ' + bytes(4),
+        ):
+            validate_audio_file(self.write('audio', content))
+        for content in (b'', b'RIFF\x00\x00\x00\x00AVI LIST', pdf_bytes('x')):
+            with self.subTest(content=content[:12]), self.assertRaises(InvalidUpload):
+                validate_audio_file(self.write('audio', content))
+
+    def test_extract_text(self):
+        self.assertEqual(extract_text(self.write('a.pdf', pdf_bytes('Soil moisture sensors')), 'a.pdf'), 'Soil moisture sensors')
+        docx = self.write('a.docx', docx_bytes('Smart farm', 'Soil  sensors'))
+        self.assertEqual(extract_text(docx, 'a.docx'), 'Smart farm Soil sensors')
+        txt = self.write('a.txt', 'Smart\n\nfarm \u00e9t\u00e9 abstract'.encode('utf-8'))
+        self.assertEqual(extract_text(txt, 'a.txt'), 'Smart farm \u00e9t\u00e9 abstract')
+        self.assertEqual(extract_text(txt, 'a.txt', max_chars=5), 'Smart')
+
+
+def wav_bytes(seconds, rate=8000, channels=2, width=2, amplitude=0.5):
+    """A WAV file holding a 440 Hz tone."""
+    samples = amplitude * np.sin(2 * np.pi * 440 * np.arange(int(seconds * rate)) / rate)
+    if width == 1:
+        frames = (samples * 127 + 128).astype(np.uint8)
+    else:
+        frames = (samples * np.iinfo(np.int16).max).astype(np.int16)
+    with tempfile.TemporaryFile() as file:
+        with wave.open(file, 'wb') as audio:
+            audio.setnchannels(channels)
+            audio.setsampwidth(width)
+            audio.setframerate(rate)
+            audio.writeframes(np.repeat(frames, channels).tobytes())
+        file.seek(0)
+        return file.read()
+
+
+class StubTranscriber:
+    """Transcription backend that decodes the audio like Whisper would but returns fixed text."""
+    model_version = 'stub'
+
+    def __init__(self, chunk_seconds=30, **options):
+        self.chunk_seconds = chunk_seconds
+
+    def transcribe(self, path):
+        duration = sum(len(chunk) for chunk in iter_audio_chunks(path, self.chunk_seconds)) / SAMPLE_RATE
+        return Transcript('spoken abstract', duration, 0.01)
+
+
+class TranscriptionTests(TestCase):
+    """WAV decoding into 16 kHz windows, and the transcription jobs with a stub backend."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media.name, ANALYSIS_ASYNC=True, TRANSCRIPTION_WAIT_SECONDS=0,
+            TRANSCRIPTION_BACKEND={'NAME': 'stub', 'OPTIONS': {'chunk_seconds': 1}},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for patcher in (
+            mock.patch.dict(transcription.TRANSCRIPTION_BACKENDS, {'stub': StubTranscriber}),
+            mock.patch.dict(transcription._models, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.student = User.objects.create(username='speaker', role='Student')
+        Group.objects.create(name='speakers').students.add(self.student)
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(self.student).access_token}')
+
+    def chunks(self, content, chunk_seconds=1):
+        path = Path(self.media.name) / 'tone.wav'
+        path.write_bytes(content)
+        return list(iter_audio_chunks(path, chunk_seconds))
+
+    def test_wav_windows_are_resampled_to_16khz_mono(self):
+        chunks = self.chunks(wav_bytes(2.5, rate=8000, channels=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [SAMPLE_RATE, SAMPLE_RATE, SAMPLE_RATE // 2])
+        self.assertTrue(all(chunk.dtype == np.float32 for chunk in chunks))
+        self.assertAlmostEqual(float(np.abs(np.concatenate(chunks)).max()), 0.5, delta=0.01)
+
+        [chunk] = self.chunks(wav_bytes(0.5, rate=44100, channels=1, width=1), chunk_seconds=30)
+        self.assertEqual(len(chunk), SAMPLE_RATE // 2)
+        self.assertAlmostEqual(float(np.abs(chunk).max()), 0.5, delta=0.02)
+
+    def submit_audio(self):
+        return self.client.post('/projects/submit/', {
+            'title': 'Voice idea', 'abstract_text': 'Typed abstract.',
+            'audio_file': SimpleUploadedFile('abstract.wav', wav_bytes(2.5), content_type='audio/wav'),
+        })
+
+    def test_audio_submission_is_transcribed_then_analysed(self):
+        response = self.submit_audio()
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('transcription_job', response.json())
+
+        job = run_job(claim_next('transcription', 'test-worker'))
+        self.assertEqual(job.status, 'Succeeded')
+        self.assertEqual((job.result['model'], job.result['audio_seconds']), ('stub', 2.5))
+        self.assertEqual(ProjectSubmission.objects.get(title='Voice idea').transcribed_text, 'spoken abstract')
+        self.assertTrue(BackgroundJob.objects.filter(kind='analyze_submission', status='Queued').exists())
+
+    def test_voice_prompt_is_transcribed_and_its_audio_removed(self):
+        response = self.client.post('/ai/chat/', {
+            'audio_file': SimpleUploadedFile('prompt.wav', wav_bytes(1), content_type='audio/wav'),
+        })
+        self.assertEqual(response.status_code, 202)
+        job = run_job(claim_next('transcription', 'test-worker'))
+        self.assertEqual(job.result, {'text': 'spoken abstract', 'audio_seconds': 1.0})
+        self.assertFalse(list(Path(self.media.name).rglob('*.wav')))
+
+    def test_without_a_backend_audio_is_not_queued(self):
+        with override_settings(TRANSCRIPTION_BACKEND={'NAME': '', 'OPTIONS': {}}):
+            response = self.submit_audio()
+            self.assertEqual(response.status_code, 202)
+            self.assertIn('analysis_job', response.json())
+            self.assertFalse(BackgroundJob.objects.filter(queue='transcription').exists())
+
+            response = self.client.post('/ai/chat/', {
+                'audio_file': SimpleUploadedFile('prompt.wav', wav_bytes(1), content_type='audio/wav'),
+            })
+            self.assertEqual(response.status_code, 503)
+
+
+class BulkReviewTests(TestCase):
+    """Bulk review reports per-item results, uses a fixed number of queries and keeps the rollups right."""
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='bulk-teacher', role='Teacher')
+        self.group = Group.objects.create(name='bulk')
+        self.group.teachers.add(self.teacher)
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(self.teacher).access_token}')
+
+    def submissions(self, count, group=None, status='Submitted'):
+        return [
+            ProjectSubmission.objects.create(
+                student=User.objects.create(username=f'bulk-student-{time.time_ns()}', role='Student'),
+                group=group or self.group, title=f'Bulk project {i}', abstract_text='Abstract', status=status,
+            ).id
+            for i in range(count)
+        ]
+
+    def review(self, reviews):
+        response = self.client.post('/teacher/submissions/bulk-review/', {'reviews': reviews}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_batch_results_and_query_count(self):
+        self.review([{'submission_id': i, 'status': 'Approved'} for i in self.submissions(1)])  # creates the counter rows
+        for count in (2, 12):
+            reviews = [{'submission_id': i, 'status': 'Approved'} for i in self.submissions(count)]
+            with self.assertNumQueries(13):
+                batch = self.review(reviews)
+            self.assertEqual(batch['approved'], count)
+
+        approved, rejected = self.submissions(2)
+        [other_group] = self.submissions(1, group=Group.objects.create(name='other'))
+        body = self.review([
+            {'submission_id': approved, 'status': 'Approved'},
+            {'submission_id': rejected, 'status': 'Rejected'},
+            {'submission_id': approved, 'status': 'Rejected'},
+            {'submission_id': other_group, 'status': 'Approved'},
+            {'submission_id': batch['results'][0]['submission_id'], 'status': 'Rejected'},
+            {'submission_id': 999999, 'status': 'Approved'},
+            {'submission_id': rejected, 'status': 'Pending'},
+        ])
+        self.assertEqual(
+            [result['result'] for result in body['results']],
+            ['approved', 'rejected', 'duplicate', 'forbidden', 'already_reviewed', 'not_found', 'invalid'],
+        )
+        project = Project.objects.get(id=body['results'][0]['project_id'])
+        self.assertEqual(list(project.team.members.all()), [ProjectSubmission.objects.get(id=approved).student])
+        self.assertEqual(ProjectSubmission.objects.get(id=rejected).status, 'Rejected')
+        self.assertEqual(Project.objects.count(), 16)
+        self.assertEqual(diff_rollups(), [])
+
+
+class TokenClaimsTests(TestCase):
+    """Role and group claims in access tokens replace the user and membership queries."""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='claims-teacher', password='pw-12345', role='Teacher')
+        self.group = Group.objects.create(name='claims')
+        self.group.teachers.add(self.teacher)
+        student = User.objects.create(username='claims-student', role='Student')
+        self.submission = ProjectSubmission.objects.create(
+            student=student, group=self.group, title='Claims project', abstract_text='Abstract', status='Submitted',
+        )
+        self.client = APIClient(HTTP_HOST='localhost')
+
+    def get(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/teacher/appointed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        return len(context)
+
+    def test_claims_token_skips_the_user_and_group_queries(self):
+        response = self.client.post('/auth/jwt/create/', {'username': 'claims-teacher', 'password': 'pw-12345'})
+        claims_token = response.data['access']
+        self.assertEqual(AccessToken(claims_token)['teaching_groups'], [self.group.id])
+        self.assertEqual(self.get(AccessToken.for_user(self.teacher)) - self.get(claims_token), 2)
+
+    def test_membership_change_makes_older_claims_stale(self):
+        token = ClaimsRefreshToken.for_user(self.teacher).access_token
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.teachers.remove(self.teacher)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.patch(f'/teacher/submissions/{self.submission.id}/', {'status': 'Approved'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class MetricsTests(TestCase):
+    """Per-view latency and database work are exported at /metrics."""
+
+    def test_request_is_recorded_per_view(self):
+        teacher = User.objects.create(username='metrics-teacher', role='Teacher')
+        client = APIClient(HTTP_HOST='localhost')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(teacher)}')
+        labels = {'view': 'teacher-appointed-submissions'}
+        before = REGISTRY.get_sample_value('http_request_db_queries_sum', labels) or 0
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(client.get('/teacher/appointed/').status_code, 200)
+
+        self.assertEqual(REGISTRY.get_sample_value('http_request_db_queries_sum', labels) - before, len(context))
+        body = client.get('/metrics').content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",status="200",view="teacher-appointed-submissions"}', body)
+
+    @override_settings(METRICS_AUTH_TOKEN='scrape-secret')
+    def test_token_is_required_when_configured(self):
+        client = APIClient(HTTP_HOST='localhost')
+        self.assertEqual(client.get('/metrics').status_code, 401)
+        client.credentials(HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(client.get('/metrics').status_code, 200)
+
+
+class ProfilingTests(TestCase):
+    """Requests with a signed X-Profile header get a flamegraph and a SQL report."""
+
+    def test_signed_header_profiles_the_request(self):
+        teacher = User.objects.create(username='profiled-teacher', role='Teacher')
+        with tempfile.TemporaryDirectory() as output_dir, override_settings(REQUEST_PROFILING={
+            'ENABLED': True, 'SAMPLE_RATE': 0, 'SLOW_MS': 0, 'INTERVAL_MS': 1, 'TOP': 5, 'TOKEN_MAX_AGE': 60,
+            'OUTPUT_DIR': output_dir,
+        }):
+            client = APIClient(HTTP_HOST='localhost')
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(teacher)}')
+            self.assertNotIn('X-Profile-Id', client.get('/teacher/appointed/', HTTP_X_PROFILE='forged'))
+
+            response = client.get('/teacher/appointed/', HTTP_X_PROFILE=profiling.make_token())
+            report = (Path(output_dir) / f"{response['X-Profile-Id']}.txt").read_text()
+            self.assertTrue((Path(output_dir) / f"{response['X-Profile-Id']}.folded").exists())
+            self.assertIn('authentication_group', report)
+            self.assertEqual((Path(output_dir) / 'slow.log').read_text().count('GET /teacher/appointed/'), 2)
+
+
+@override_settings(
+    ANALYSIS_ASYNC=False, CHAT_HISTORY_TOKEN_BUDGET=100, CHAT_SUMMARY_TRIGGER_TOKENS=150, CHAT_SUMMARY_MAX_CHARS=200,
+)
+class ChatMemoryTests(TestCase):
+    """The prompt context of a chat session stays bounded however long the conversation gets."""
+
+    def setUp(self):
+        self.shared_cache = tempfile.TemporaryDirectory()
+        self.addCleanup(self.shared_cache.cleanup)
+        overrides = override_settings(CACHES={**settings.CACHES, 'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.shared_cache.name,
+        }})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_history_is_windowed_and_summarized(self):
+        student = User.objects.create(username='chatter', role='Student')
+        session = chat.open_session(student)
+        with mock.patch('project_management.project_analyzer.analyzer.summarize_conversation',
+                        return_value='Earlier the student asked about sensors.') as summarize:
+            for i in range(40):
+                chat.record_exchange(session, f'Question {i} ' + 'word ' * 20, f'Answer {i} ' + 'word ' * 20)
+                session.refresh_from_db()
+                self.assertLessEqual(len(chat.conversation_history(session)), 1000)
+
+        self.assertTrue(summarize.called)
+        self.assertEqual(session.summary, 'Earlier the student asked about sensors.')
+        self.assertLess(session.unsummarized_tokens, 150)
+        history = chat.conversation_history(session)
+        self.assertIn('Question 39', history)
+        self.assertNotIn('Question 0 ', history)
+
+    def test_project_context_is_cached_and_refreshed(self):
+        student = User.objects.create(username='chatter', role='Student')
+        submission = ProjectSubmission.objects.create(student=student, title='Smart farm', abstract_text='Abstract')
+        project = Project.objects.create(submission=submission, title='Smart farm', abstract='Soil sensors')
+        session = chat.open_session(student, project_id=project.id)
+
+        chat.project_context(project.id)
+        with CaptureQueriesContext(connection) as queries:
+            chat.project_context(project.id)
+        self.assertEqual(len(queries), 0)
+        project.progress_percentage = 60
+        project.save()
+        self.assertIn('60% complete', chat.conversation_history(session))
+        with self.assertRaises(Project.DoesNotExist):
+            chat.open_session(User.objects.create(username='other', role='Student'), project_id=project.id)
+        with self.assertRaises(ChatSession.DoesNotExist):
+            chat.open_session(User.objects.create(username='third', role='Student'), session_id=session.id)
+
+    def test_project_context_invalidation_reaches_other_workers(self):
+        student = User.objects.create(username='chatter', role='Student')
+        submission = ProjectSubmission.objects.create(student=student, title='Smart farm', abstract_text='Abstract')
+        project = Project.objects.create(submission=submission, title='Smart farm', abstract='Soil sensors')
+        chat.project_context(project.id)
+
+        # another worker process: its own client of the same cache
+        other_worker = FileBasedCache(self.shared_cache.name, {})
+        key = chat._project_context_key(project.id)
+        self.assertIn('Title: Smart farm', other_worker.get(key))
+        project.title = 'Smart greenhouse'
+        project.save()
+        self.assertIsNone(other_worker.get(key))
+
+
+class ChatStreamTests(TestCase):
+    """The chatbot answer reaches the client as server-sent events while it is generated."""
+
+    def setUp(self):
+        self.student = User.objects.create(username='streamer', role='Student')
+        self.token = ClaimsRefreshToken.for_user(self.student).access_token
+
+    def post(self, body, authenticated=True):
+        headers = {'authorization': f'Bearer {self.token}'} if authenticated else {}
+        return AsyncClient().post('/ai/chat/stream/', body, content_type='application/json', headers=headers)
+
+    async def test_chunks_are_sent_as_they_are_generated(self):
+        release = asyncio.Event()
+
+        async def answer(prompt, history):
+            yield 'Use a '
+            await release.wait()
+            yield 'soil sensor.'
+
+        ttft_count = REGISTRY.get_sample_value('chat_stream_seconds_count', {'phase': 'first_token'}) or 0
+        with mock.patch.object(analyzer, 'stream_chat_response', answer):
+            response = await self.post({'prompt': 'Which sensor?'})
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            # read in one task, as the ASGI handler does
+            events = asyncio.Queue()
+
+            async def consume():
+                async for event in response.streaming_content:
+                    await events.put(event)
+                await events.put(None)
+
+            consumer = asyncio.create_task(consume())
+            # the first chunk arrives while the answer is still being generated
+            self.assertEqual(await asyncio.wait_for(events.get(), 5), b'data: {"text": "Use a "}\n\n')
+            release.set()
+            await consumer
+            rest = [events.get_nowait() for _ in range(events.qsize())][:-1]
+
+        self.assertEqual(rest[0], b'data: {"text": "soil sensor."}\n\n')
+        done_event, done_data = rest[1].decode().strip().split('\n')
+        self.assertEqual(done_event, 'event: done')
+        session_id = json.loads(done_data.removeprefix('data: '))['session_id']
+        messages = [(m.role, m.content) async for m in ChatMessage.objects.filter(session_id=session_id).order_by('id')]
+        self.assertEqual(messages, [('user', 'Which sensor?'), ('model', 'Use a soil sensor.')])
+        # exported for every worker, not only in this process's /ai/metrics/ window
+        self.assertEqual(REGISTRY.get_sample_value('chat_stream_seconds_count', {'phase': 'first_token'}), ttft_count + 1)
+
+    async def test_bad_requests_are_answered_before_streaming(self):
+        self.assertEqual((await self.post({'prompt': ' '})).status_code, 400)
+        self.assertEqual((await self.post({'prompt': 'Hi', 'session_id': 999999})).status_code, 404)
+        self.assertEqual((await self.post({'prompt': 'Hi'}, authenticated=False)).status_code, 401)
+
+
+class AsyncAIViewTests(TestCase):
+    """The async AI views authenticate the JWT, parse JSON or multipart bodies and map errors to responses."""
+
+    def setUp(self):
+        self.student = User.objects.create(username='async-student', role='Student')
+        self.headers = {'authorization': f'Bearer {ClaimsRefreshToken.for_user(self.student).access_token}'}
+        self.submission = ProjectSubmission.objects.create(student=self.student, title='Smart farm', abstract_text='Soil sensors')
+        self.evaluation = {'project_id': self.submission.id, 'question': 'Why LoRa?', 'answer': 'Range'}
+
+    async def post(self, url, body, content_type='application/json', headers=None):
+        headers = self.headers if headers is None else headers
+        if content_type is None:
+            return await AsyncClient().post(url, body, headers=headers)
+        return await AsyncClient().post(url, body, content_type=content_type, headers=headers)
+
+    async def test_authentication(self):
+        for headers in ({}, {'authorization': 'Bearer not-a-token'}):
+            response = await self.post('/ai/viva/evaluate/', self.evaluation, headers=headers)
+            self.assertEqual(response.status_code, 401)
+
+    async def test_body_parsing(self):
+        for body, detail in (('{"project_id": ', 'JSON parse error.'), ('[1, 2]', 'Expected a JSON object.')):
+            response = await self.post('/ai/viva/evaluate/', body)
+            self.assertEqual((response.status_code, response.json()['detail']), (400, detail))
+
+        seen = []
+
+        async def evaluate(question, answer, abstract):
+            seen.append((question, answer, abstract, llm_limits._current_user.get()))
+            return {'score': '7', 'feedback': 'Good'}
+
+        with mock.patch.object(analyzer, 'aevaluate_viva_answer', side_effect=evaluate):
+            for content_type in ('application/json', None):  # None: multipart form
+                response = await self.post('/ai/viva/evaluate/', self.evaluation, content_type)
+                self.assertEqual((response.status_code, response.json()['score']), (200, '7'))
+        self.assertEqual(seen, [('Why LoRa?', 'Range', 'Soil sensors', self.student.id)] * 2)
+
+    async def test_errors(self):
+        response = await self.post('/ai/viva/evaluate/', {**self.evaluation, 'project_id': 999999})
+        self.assertEqual(response.status_code, 404)
+        for answers in ([], [{'question': 'Why?'}], [{'question': 'Q', 'answer': 'A'}] * 21):
+            response = await self.post('/ai/viva/evaluate/batch/', {'project_id': self.submission.id, 'answers': answers})
+            self.assertEqual(response.status_code, 400)
+
+        with mock.patch.object(analyzer, 'aevaluate_viva_answer', side_effect=LLMBusy('Gemini is busy', retry_after=7)):
+            response = await self.post('/ai/viva/evaluate/', self.evaluation)
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '7'))
+        self.assertEqual(response.json(), {'error': 'Gemini is busy'})
+
+
+@override_settings(ANALYSIS_ASYNC=False)
+class VivaQuestionBankTests(TestCase):
+    """Viva questions are generated on approval and band changes, and the viva page reads them."""
+
+    def test_questions_are_prepared_per_band_and_read_back(self):
+        teacher = User.objects.create(username='viva-teacher', role='Teacher')
+        student = User.objects.create(username='viva-student', role='Student')
+        group = Group.objects.create(name='viva')
+        group.teachers.add(teacher)
+        submission = ProjectSubmission.objects.create(
+            student=student, group=group, title='Smart farm', abstract_text='Soil sensors', status='Submitted',
+        )
+        client = APIClient(HTTP_HOST='localhost')
+
+        with mock.patch.object(analyzer, 'generate_viva_questions', side_effect=lambda title, abstract, progress: [
+            f'1. A {analyzer.viva_band(progress)} question?'
+        ]) as generate:
+            client.force_authenticate(teacher)
+            client.patch(f'/teacher/submissions/{submission.id}/', {'status': 'Approved'}, format='json')
+            client.force_authenticate(student)
+            for progress in (20, 50, 60):
+                client.patch(f'/projects/progress/update/{submission.id}/', {'progress': progress}, format='json')
+        self.assertEqual(generate.call_count, 2)  # approval (design) and the move to 50% (implementation)
+        self.assertEqual(
+            sorted(VivaQuestionSet.objects.values_list('band', flat=True)), ['design', 'implementation'],
+        )
+
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(student)}')
+        with mock.patch.object(analyzer, 'agenerate_viva_questions', new=mock.AsyncMock(
+            return_value=['1. A new question?'],
+        )) as agenerate:
+            response = client.post('/ai/viva/', {'project_id': submission.id}, format='json')
+            self.assertEqual(response.json()['questions'], ['1. A implementation question?'])
+            self.assertFalse(agenerate.called)
+
+            response = client.post('/ai/viva/', {'project_id': submission.id, 'regenerate': True}, format='json')
+            self.assertEqual(response.json()['questions'], ['1. A new question?'])
+            self.assertTrue(agenerate.call_args.kwargs['fresh'])
+        self.assertEqual(VivaQuestionSet.objects.get(band='implementation').questions, ['1. A new question?'])
+
+
+class VivaBatchEvaluationTests(SimpleTestCase):
+    """One call grades a batch of viva answers; what it leaves out is graded individually."""
+
+    qa_pairs = [('What sensors?', 'Soil moisture'), ('Why Django?', 'Why Django?'), ('Power?', 'Solar'), ('Range?', 'LoRa')]
+
+    def reply(self, template, prompt, **kwargs):
+        if template == 'viva_evaluation':
+            return f"Score: 5/10\nFeedback: graded alone ({prompt.split('Question: ')[1].splitlines()[0]})"
+        return self.batch_reply
+
+    def test_parse_ignores_malformed_blocks(self):
+        results = [None] * 4
+        analyzer._parse_viva_batch(
+            "Sure, here you go.\n## Q1\nScore: 7/10\nFeedback: **Good**\n"
+            "### Q2\nScore: great\nFeedback: no number\n"
+            "### Q9\nScore: 9/10\nFeedback: out of range\n"
+            "Q3\nScore: 4.5 /10\n",
+            [0, 1, 3], results,
+        )
+        self.assertEqual(results, [
+            {'score': '7', 'feedback': 'Good'}, None, None, {'score': '4.5', 'feedback': 'No feedback provided.'},
+        ])
+
+    def test_missing_answers_fall_back_to_single_calls(self):
+        self.batch_reply = "### Q1\nScore: 8/10\nFeedback: batch\n### Q3\nFeedback: no score"
+        with mock.patch.object(analyzer, '_generate', side_effect=self.reply) as generate:
+            results = analyzer.evaluate_viva_answers(self.qa_pairs, 'Smart farm')
+        self.assertEqual(results, [
+            {'score': '8', 'feedback': 'batch'},
+            analyzer.REPEATED_QUESTION,
+            {'score': '5', 'feedback': 'graded alone (Power?)'},
+            {'score': '5', 'feedback': 'graded alone (Range?)'},
+        ])
+        self.assertEqual([c.args[0] for c in generate.call_args_list].count('viva_evaluation'), 2)
+
+    def test_failed_batch_call_grades_every_answer_alone(self):
+        async def areply(template, prompt, **kwargs):
+            if template == 'viva_batch_evaluation':
+                raise RuntimeError('quota')
+            return self.reply(template, prompt)
+
+        with mock.patch.object(analyzer, '_agenerate', side_effect=areply), \
+                self.assertLogs('project_management.project_analyzer', 'WARNING'):
+            results = asyncio.run(analyzer.aevaluate_viva_answers(self.qa_pairs, 'Smart farm'))
+        self.assertEqual([result['score'] for result in results], ['5', '0/10', '5', '5'])
+
+
+class ReplicaRouterTests(TestCase):
+    """Reads go to the replica only inside replica_reads() and only when one is configured."""
+
+    router = ReadReplicaRouter()
+
+    def test_routing(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Project), 'default')  # no replica configured
+
+        with mock.patch.dict(connections.databases, {'replica': {}}):
+            self.assertEqual(self.router.db_for_read(Project), 'default')
+            with replica_reads():
+                self.assertEqual(self.router.db_for_read(Project), 'replica')
+                self.assertEqual(self.router.db_for_write(Project), 'default')
+            with self.assertRaises(RuntimeError), replica_reads():
+                raise RuntimeError
+            self.assertEqual(self.router.db_for_read(Project), 'default')
+        self.assertEqual(
+            [self.router.allow_migrate(alias, 'authentication') for alias in ('default', 'replica')], [True, False],
+        )
+
+    def test_only_dashboard_gets_read_from_the_replica(self):
+        reads = []
+
+        def db_for_read(router, model, **hints):
+            reads.append((model.__name__, database._replica_reads.get()))
+            return 'default'
+
+        with mock.patch.object(ReadReplicaRouter, 'db_for_read', autospec=True, side_effect=db_for_read):
+            client = APIClient(HTTP_HOST='localhost')
+            client.force_authenticate(User.objects.create(username='replica-teacher', role='Teacher'))
+            self.assertEqual(client.get('/teacher/approved-projects/').status_code, 200)
+            dashboard_reads, reads[:] = list(reads), []
+            self.assertEqual(client.get('/student/submissions/').status_code, 200)
+        self.assertTrue(dashboard_reads)
+        self.assertTrue(all(replica for _, replica in dashboard_reads))
+        self.assertFalse(any(replica for _, replica in reads))
+
+
+class LLMCacheTests(SimpleTestCase):
+    """Every LLM cache backend expires entries after their TTL and evicts the least recently used."""
+
+    def setUp(self):
+        self.now = 1000.0
+        self.addCleanup(mock.patch.stopall)
+        for target in ('project_management.llm_cache.time.time', 'django.core.cache.backends.locmem.time.time'):
+            mock.patch(target, lambda: self.now).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def lru_backends(self):
+        return [MemoryBackend(2), SQLiteBackend(2, path=Path(self.tmp.name) / 'llm.sqlite3')]
+
+    def backends(self):
+        yield from self.lru_backends()
+        with override_settings(CACHES={'llm': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'llm-test'}}):
+            yield DjangoCacheBackend(2, alias='llm')
+
+    def test_ttl(self):
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                backend.clear()
+                backend.set('key', {'score': 1}, ttl=60)
+                self.now += 59
+                self.assertEqual(backend.get('key'), {'score': 1})
+                self.now += 2
+                self.assertIsNone(backend.get('key'))
+
+    def test_lru_eviction(self):
+        for backend in self.lru_backends():  # the django backend leaves eviction to the cache
+            with self.subTest(backend=type(backend).__name__):
+                for key in ('a', 'b'):
+                    backend.set(key, key, ttl=60)
+                    self.now += 1
+                backend.get('a')
+                self.now += 1
+                backend.set('c', 'c', ttl=60)
+                self.assertEqual([backend.get(key) for key in 'abc'], ['a', None, 'c'])
+
+    def test_keys_and_stats(self):
+        self.assertNotEqual(make_key('similarity', 1, 'abstract'), make_key('similarity', 2, 'abstract'))
+        cache = LLMCache(MemoryBackend(8), ttl=60)
+        key = make_key('similarity', 1, 'abstract')
+        self.assertIsNone(cache.get('similarity', key))
+        cache.set(key, '42')
+        self.assertEqual(cache.get('similarity', key), '42')
+        self.assertEqual(cache.stats(), {'similarity': {'hits': 1, 'misses': 1, 'hit_rate': 0.5}})
+
+
+class LLMGateTests(SimpleTestCase):
+    """Admission control in front of Gemini: coalescing, per-user fairness and the rate limit."""
+
+    def test_identical_concurrent_calls_share_one_upstream_call(self):
+        gate = LLMGate(None, max_concurrency=4, queue_timeout=5)
+        calls = []
+
+        def upstream():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'answer'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(gate.call('same prompt', upstream))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['answer'] * 5)
+        self.assertEqual(gate.stats()['coalesced'], 4)
+
+    def test_waiting_calls_are_served_round_robin_per_user(self):
+        semaphore = LLMGate(None, max_concurrency=1, queue_timeout=5).semaphore
+        semaphore.acquire('holder', 1)
+        order, threads = [], []
+        for user in ['heavy', 'heavy', 'heavy', 'light']:
+            def wait(user=user):
+                semaphore.acquire(user, 5)
+                order.append(user)
+                semaphore.release()
+            threads.append(threading.Thread(target=wait))
+            threads[-1].start()
+            while semaphore.waiting < len(threads):
+                time.sleep(0.001)
+        semaphore.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ['heavy', 'light', 'heavy', 'heavy'])
+
+    def test_calls_over_the_rate_limit_are_rejected_after_the_queue_timeout(self):
+        gate = LLMGate(MemoryTokenBucket(rate=1, burst=2), max_concurrency=4, queue_timeout=0.1)
+        self.assertEqual([gate.call(f'prompt {i}', lambda: 'ok') for i in range(2)], ['ok', 'ok'])
+        with self.assertRaises(LLMBusy):
+            gate.call('prompt 3', lambda: 'ok')
+        self.assertEqual(gate.stats()['rejected'], 1)
+        self.assertEqual(gate.semaphore.active, 0)
+
+
+class ResilienceTests(SimpleTestCase):
+    """Breaker, retries and hedging against a local fake Gemini server."""
+
+    def setUp(self):
+        self.server = FakeGeminiServer().start()
+        self.addCleanup(self.server.stop)
+        model = RestGenerativeModel('gemini-2.0-flash', url=self.server.url, api_key='')
+        self.upstream = lambda: model.generate_content('hi', request_options={'timeout': 2}).text
+
+    def test_transient_errors_are_retried(self):
+        self.server.fail_next = 2
+        caller = ResilientCaller(CircuitBreaker(), retries=2, backoff_base=0.01)
+        self.assertEqual(caller.call(self.upstream), canned_reply('hi'))
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(caller.stats()['retries'], 2)
+
+    def test_breaker_fails_fast_while_open_and_closes_after_a_good_probe(self):
+        breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, open_seconds=0.2)
+        caller = ResilientCaller(breaker, retries=0)
+        self.server.error_rate = 1.0
+        for _ in range(4):
+            with self.assertRaises(Exception):
+                caller.call(self.upstream)
+        with self.assertRaises(CircuitOpen):
+            caller.call(self.upstream)
+        self.assertEqual(self.server.requests, 4)
+
+        self.server.error_rate = 0.0
+        time.sleep(0.25)
+        self.assertEqual(caller.call(self.upstream), canned_reply('hi'))
+        self.assertEqual(breaker.stats()['state'], CircuitBreaker.CLOSED)
+
+    def test_slow_request_is_hedged(self):
+        self.server.stall_next, self.server.stall_seconds = 1, 1.5
+        caller = ResilientCaller(CircuitBreaker(), hedge_after=0.1)
+        start = time.monotonic()
+        self.assertEqual(caller.call(self.upstream), canned_reply('hi'))
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(caller.stats()['hedges_won'], 1)
+
+
+class PlagiarismCheckTests(SimpleTestCase):
+    """The similarity check against the fake Gemini server: a failed or late check never passes as original."""
+    existing = [{'id': 1, 'title': 'Smart farm', 'student__username': 'asha', 'abstract_text': 'Soil sensors over LoRa.'}]
+
+    def setUp(self):
+        self.server = FakeGeminiServer(stall_seconds=1).start()
+        self.addCleanup(self.server.stop)
+        model = RestGenerativeModel('gemini-2.0-flash', url=self.server.url, api_key='')
+        resilience = ResilientCaller(CircuitBreaker(), retries=2, backoff_base=0.01)
+        for name, value in (('llm_model', model), ('cache', None), ('resilience', resilience)):
+            patcher = mock.patch.object(analyzer, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def check(self):
+        # a prompt of its own per test: calls abandoned by an earlier test may still be in the gate
+        abstract = f'Soil moisture alerts ({self._testMethodName}).'
+        return analyzer.check_plagiarism_and_suggest_features('Farm monitor', abstract, self.existing)
+
+    def test_similarity_errors_report_similarity_fail(self):
+        self.server.error_rate = 1.0
+        for fanout in (False, True):
+            with self.subTest(fanout=fanout), override_settings(ANALYSIS_FANOUT=fanout), \
+                    self.assertLogs('project_management.project_analyzer', 'WARNING'):
+                result = self.check()
+                self.assertEqual(result['originality_status'], 'SIMILARITY_FAIL')
+                self.assertIsNone(result['most_similar_project'])
+
+    def test_fanout_calls_stop_at_the_deadline(self):
+        self.server.stall_next = 10
+        start = time.monotonic()
+        with override_settings(ANALYSIS_FANOUT=True, LLM_CALL_TIMEOUT=0.3), \
+                self.assertLogs('project_management.project_analyzer', 'WARNING'):
+            result = self.check()
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(result['originality_status'], 'SIMILARITY_FAIL')
+        time.sleep(0.5)  # long enough for a retry of either call to have gone out
+        self.assertEqual(self.server.requests, 2)
+
+    def test_successful_check_reports_the_verdict(self):
+        result = self.check()
+        self.assertEqual(result['originality_status'], 'ORIGINAL_PASSED')
+        self.assertEqual(result['similarity_score'], 0.2)
+        self.assertEqual(result['most_similar_project']['title'], 'Smart farm')
+
+
+class LLMTransportTests(SimpleTestCase):
+    """The REST transport against the fake Gemini server."""
+
+    def setUp(self):
+        self.server = FakeGeminiServer().start()
+        self.addCleanup(self.server.stop)
+        self.model = RestGenerativeModel('gemini-2.0-flash', url=self.server.url, api_key='')
+
+    def test_async_and_streamed_replies_match_the_canned_format(self):
+        async def collect():
+            reply = await self.model.generate_content_async('Generate 5 viva questions')
+            stream = await self.model.generate_content_async('Explain MQTT', stream=True)
+            return reply.text, [chunk.text async for chunk in stream]
+
+        reply, chunks = asyncio.run(collect())
+        self.assertEqual(reply, canned_reply('Generate 5 viva questions'))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), canned_reply('Explain MQTT'))
+
+    def test_error_statuses_raise_the_client_exceptions(self):
+        self.server.error_status, self.server.fail_next = 429, 1
+        with self.assertRaises(api_exceptions.TooManyRequests):
+            self.model.generate_content('hi')
+        self.server.error_status, self.server.fail_next = 503, 1
+        with self.assertRaises(api_exceptions.ServiceUnavailable):
+            asyncio.run(self.model.generate_content_async('hi'))
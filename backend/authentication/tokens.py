@@ -0,0 +1,118 @@
+"""
+JWTs that carry the user's role and group memberships, so authenticating a
+request, permission checks and group scoping need no database query.
+
+Access tokens get ``username``, ``role``, ``teaching_groups``,
+``student_groups`` and ``claims_at`` (when they were read). Access tokens
+made from a refresh token re-read them, so claims are at most one access
+token lifetime old. When a user's role or memberships change, the time is
+recorded in the ``JWT_CLAIMS_CACHE`` cache; tokens with older claims still
+work but load the user from the database, as plain simplejwt tokens do.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Group, User
+
+CLAIMS = ('username', 'role', 'teaching_groups', 'student_groups', 'claims_at')
+
+
+def user_claims(user):
+    """Reads the role and group claims of ``user`` (two queries)."""
+    return {
+        'username': user.username,
+        'role': user.role,
+        'teaching_groups': list(Group.objects.filter(teachers=user).order_by('id').values_list('id', flat=True)),
+        'student_groups': list(Group.objects.filter(students=user).order_by('id').values_list('id', flat=True)),
+        'claims_at': time.time(),
+    }
+
+
+# --- Invalidation ---
+
+def _changed_key(user_id):
+    return f'auth:claims-changed:{user_id}'
+
+
+def claims_changed(user_ids):
+    """Makes the claims read so far for ``user_ids`` stale, once the current transaction commits."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    def stamp():
+        now = time.time()
+        timeout = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+        caches[settings.JWT_CLAIMS_CACHE].set_many({_changed_key(user_id): now for user_id in user_ids}, timeout)
+
+    transaction.on_commit(stamp)
+
+
+def claims_are_current(token):
+    changed_at = caches[settings.JWT_CLAIMS_CACHE].get(_changed_key(token[api_settings.USER_ID_CLAIM]))
+    return changed_at is None or changed_at < token['claims_at']
+
+
+# --- Tokens ---
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry fresh role and group claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token._claims = user_claims(user)
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        claims = getattr(self, '_claims', None)
+        if claims is None:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: self[api_settings.USER_ID_CLAIM]})
+            claims = user_claims(user)
+        for claim, value in claims.items():
+            access[claim] = value
+        return access
+
+
+def claims_user(token):
+    """
+    A User built from the token claims, without a query. Other columns are
+    deferred, so reading one loads it, and save() writes only loaded columns.
+    """
+    known = {'id': int(token[api_settings.USER_ID_CLAIM]), 'username': token['username'], 'role': token['role'], 'is_active': True}
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in known]  # from_db wants model order
+    user = User.from_db(DEFAULT_DB_ALIAS, fields, [known[name] for name in fields])
+    user.teaching_group_ids = token['teaching_groups']
+    user.student_group_ids = token['student_groups']
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that trusts current role and group claims instead of loading the user."""
+
+    def get_user(self, validated_token):
+        if all(claim in validated_token for claim in CLAIMS) and claims_are_current(validated_token):
+            return claims_user(validated_token)
+        return super().get_user(validated_token)
+
+
+def teaching_group_ids(user):
+    """Ids of the groups ``user`` teaches, from the token claims when available."""
+    if hasattr(user, 'teaching_group_ids'):
+        return user.teaching_group_ids
+    return list(user.teaching_groups.order_by('id').values_list('id', flat=True))
+
+
+def student_group_ids(user):
+    if hasattr(user, 'student_group_ids'):
+        return user.student_group_ids
+    return list(user.student_groups.order_by('id').values_list('id', flat=True))
+
@@ -0,0 +1,161 @@
+# authentication/uploads.py
+"""
+Submission file handling. Uploads are streamed to disk in chunks by Django's
+TemporaryFileUploadHandler (settings.FILE_UPLOAD_HANDLERS) and moved into
+storage without being read into memory. The request only checks names and
+sizes; content checks and text extraction run in the analysis job.
+"""
+import os
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+ABSTRACT_EXTENSIONS = ('.pdf', '.docx', '.txt')
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.ogg', '.webm', '.flac')
+
+DOCX_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class InvalidUpload(Exception):
+    """Raised when an uploaded file is not what its name claims to be."""
+
+
+def extension(name):
+    return os.path.splitext(name or '')[1].lower()
+
+
+def check_upload(upload, allowed_extensions, max_bytes):
+    """Cheap checks done in the request; returns an error message or None."""
+    if extension(upload.name) not in allowed_extensions:
+        return f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}."
+    if upload.size > max_bytes:
+        return f"File is too large (limit {max_bytes // (1024 * 1024)} MB)."
+    return None
+
+
+def _filesystem_path(file):
+    if isinstance(file, str):
+        try:
+            return default_storage.path(file)
+        except NotImplementedError:
+            return None
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    try:
+        path = file.path
+    except (AttributeError, NotImplementedError, ValueError):
+        return None
+    return path if os.path.exists(path) else None
+
+
+@contextmanager
+def local_path(file):
+    """
+    Yields a filesystem path for an upload, a FieldFile or a name in default
+    storage: the temporary file of a streamed upload, the storage path of a
+    local file, or a spooled copy otherwise (in-memory uploads, remote storage).
+    """
+    path = _filesystem_path(file)
+    if path:
+        yield path
+        return
+
+    if isinstance(file, str):
+        file = default_storage.open(file, 'rb')
+    with tempfile.NamedTemporaryFile(suffix=extension(file.name)) as copy:
+        file.open('rb')
+        try:
+            for chunk in file.chunks():
+                copy.write(chunk)
+        finally:
+            file.close()
+        copy.flush()
+        yield copy.name
+
+
+def _header(path, size=16):
+    with open(path, 'rb') as f:
+        return f.read(size)
+
+
+def validate_abstract_file(path, name):
+    """Checks that the content matches the extension."""
+    ext, header = extension(name), _header(path, 8)
+    if ext == '.pdf' and not header.startswith(b'%PDF-'):
+        raise InvalidUpload("Abstract file is not a PDF document.")
+    if ext == '.docx':
+        if not zipfile.is_zipfile(path):
+            raise InvalidUpload("Abstract file is not a DOCX document.")
+        with zipfile.ZipFile(path) as archive:
+            if 'word/document.xml' not in archive.namelist():
+                raise InvalidUpload("Abstract file is not a DOCX document.")
+    if ext == '.txt' and b'\x00' in _header(path, 4096):
+        raise InvalidUpload("Abstract file is not a text file.")
+
+
+def validate_audio_file(path):
+    """Recognises the common audio containers by their magic bytes."""
+    header = _header(path)
+    known = (
+        header.startswith(b'ID3') or header[:2] in (b'\xff\xfb', b'\xff\xf3', b'\xff\xf2')  # mp3
+        or (header.startswith(b'RIFF') and header[8:12] == b'WAVE')
+        or header.startswith(b'OggS') or header.startswith(b'fLaC')
+        or header.startswith(b'\x1a\x45\xdf\xa3')  # webm / matroska
+        or header[4:8] == b'ftyp'  # m4a / mp4
+    )
+    if not known:
+        raise InvalidUpload("Audio file is not in a supported format.")
+
+
+def extract_text(path, name, max_chars=None):
+    """Returns the plain text of a PDF, DOCX or TXT abstract (truncated to max_chars)."""
+    max_chars = max_chars or settings.ABSTRACT_EXTRACT_MAX_CHARS
+    ext = extension(name)
+    if ext == '.pdf':
+        text = _pdf_text(path, max_chars)
+    elif ext == '.docx':
+        text = _docx_text(path, max_chars)
+    else:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read(max_chars)
+    return ' '.join(text.split())[:max_chars]
+
+
+def _pdf_text(path, max_chars):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise InvalidUpload("PDF text extraction needs the 'pypdf' package.")
+    parts, length = [], 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    return '\n'.join(parts)
+
+
+def _docx_text(path, max_chars):
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo('word/document.xml')
+        if info.file_size > settings.ABSTRACT_FILE_MAX_BYTES * 10:
+            raise InvalidUpload("Abstract document is too large to extract.")
+        with archive.open(info) as document:
+            parts, length = [], 0
+            # iterparse keeps memory flat on large documents
+            for _, element in ElementTree.iterparse(document):
+                if element.tag == f'{DOCX_NAMESPACE}t' and element.text:
+                    parts.append(element.text)
+                    length += len(element.text)
+                elif element.tag == f'{DOCX_NAMESPACE}p':
+                    parts.append('\n')
+                    element.clear()
+                if length >= max_chars:
+                    break
+    return ''.join(parts)
+
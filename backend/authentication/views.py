@@ -7,22 +7,85 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticated
 from .models import ProjectSubmission, Project, Team, User, Group
 from .serializers import ProjectSubmissionSerializer, TeacherSubmissionSerializer, UserSerializer
-from project_management.project_analyzer import ProjectAnalyzer
+from project_management.project_analyzer import analyzer
+from project_management.transcription import transcription_enabled
 from .permissions import IsTeacherOrAdmin
 from django.utils import timezone
 from rest_framework import generics
-from django.db.models import Count, Sum
 from .serializers import ProjectSerializer
 from .serializers import GroupSerializer
-from django.db.models import Q
+from django.db.models import F, Q
 import re
 from .models import Project
 from rest_framework import views
 from rest_framework.permissions import AllowAny
 from .serializers import SimilarProjectSerializer
 from .serializers import ApprovedProjectSerializer ,StudentSubmissionSerializer
+from .serializers import SubmissionAnalysisSerializer
+from .models import AnalyticsCounter, BackgroundJob, ChatSession, ProjectScoreRollup
+from . import chat, viva
+from .jobs import claim, enqueue, run_job
+from .reviews import review_submissions
+from . import tasks  # noqa: F401  (registers the job handlers)
+from django.conf import settings
+from django.urls import reverse
+from .pagination import ProjectCursorPagination, SubmittedAtCursorPagination
+from .serializers import requested_fields
+from project_management.database import replica_reads
+from .uploads import extension
+from .jobs import await_job
+from django.core.files.storage import default_storage
+import uuid
+import json
+import time
+from collections import Counter
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from .tokens import ClaimsJWTAuthentication, student_group_ids, teaching_group_ids
+from project_management.latency import latency_summaries, latency_window
+from project_management import metrics
+from project_management.llm_limits import LLMBusy, llm_user
+
+def defer_unrequested(queryset, request, large_fields, always=()):
+    """
+    Skips loading large columns: `always` lists columns no serializer needs,
+    `large_fields` maps serializer field names to columns that are deferred
+    when the client asked for a `?fields=` projection without them.
+    """
+    requested = requested_fields(request)
+    deferred = list(always)
+    if requested:
+        deferred += [column for name, column in large_fields.items() if name not in requested]
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+class ReadReplicaMixin:
+    """
+    Serves GET requests from the read replica (when DATABASE_REPLICA_URL is
+    set). Only for dashboards that tolerate a little replication lag.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            with replica_reads():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+
+def paginated_response(view, request, queryset, serializer_class):
+    """Serializes `queryset` for an APIView, applying cursor pagination when requested."""
+    paginator = SubmittedAtCursorPagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(queryset if page is None else page, many=True, context={'request': request})
+    if page is not None:
+        return paginator.get_paginated_response(serializer.data)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
 
-analyzer = ProjectAnalyzer()
 class ProjectSubmissionView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser, JSONParser,)
@@ -33,11 +96,12 @@ class ProjectSubmissionView(APIView):
         if user.is_anonymous:
              return Response({"error": "User must be logged in."}, status=status.HTTP_401_UNAUTHORIZED)
         
-        student_groups = list(user.student_groups.all())
-        if not student_groups:
+        # Group ids come from the token claims (see tokens.py)
+        group_ids = student_group_ids(user)
+        if not group_ids:
             return Response({"error": "You must be a member of a group to submit a project."}, status=status.HTTP_400_BAD_REQUEST)
         
-        group = student_groups[0]
+        group_id = group_ids[0]
 
         # --- 3. DATA RETRIEVAL & CLEANUP ---
         abstract_text = request.data.get('abstract_text', '').strip()
@@ -50,69 +114,88 @@ class ProjectSubmissionView(APIView):
             'abstract_text': abstract_text,
             'abstract_file': abstract_file,
             'audio_file': audio_file,
-            'group': group.id,
+            'group': group_id,
             'relevance_score': 0.0, 'feasibility_score': 0.0, 'innovation_score': 0.0,
         }
         
-        # --- 4. FILE/AUDIO PROCESSING ---
-        transcribed_text = None
-        if audio_file:
-            transcribed_text = "Transcription successful." # Placeholder
-        if transcribed_text:
-            data['abstract_text'] = transcribed_text
-
-        # --- 5. INITIAL VALIDATION & SERIALIZER ---
+        # --- 4. INITIAL VALIDATION & SERIALIZER ---
         serializer = ProjectSubmissionSerializer(data=data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # --- 6. AI PRE-SCREENING LOGIC ---
-        text_to_analyze = data['abstract_text'] or data['title']
-        new_embedding = analyzer.get_embedding(text_to_analyze)
-        # Retrieve all existing ABSTRACT TEXT (not embeddings)
-        existing_submissions = ProjectSubmission.objects.filter(
-            ~Q(status='Rejected')
-        ).values('abstract_text', 'title', 'student__username')
-        
-        archived_abstracts = [s['abstract_text'] for s in existing_submissions if s['abstract_text']]
-        
-        
-        # Get AI Scores, Suggestions, and Final Report
-        # The analyzer now handles the similarity check internally based on text
-        analysis_result = analyzer.check_plagiarism_and_suggest_features(
-            title=title,
-            abstract=abstract_text,
-            existing_submissions=list(existing_submissions)
+        # --- 5. SAVE AS PENDING & QUEUE THE AI PRE-SCREENING ---
+        # Similarity check and scoring run on a background worker (authentication/tasks.py)
+        submission = serializer.save(
+            student=user,
+            status='Pending Analysis',
         )
-        
-        # --- 7. FINAL DECISION (The Guaranteed Gatekeeper) ---
-        if analysis_result['originality_status'] == "BLOCKED_HIGH_SIMILARITY":
-            similar_project_data = {}
-            if analysis_result['most_similar_project']:
-                similar_project_data = SimilarProjectSerializer(analysis_result['most_similar_project']).data
 
-            return Response({
-                "detail": "Submission Blocked: High Similarity Detected. Please revise your idea.",
-                "suggestions": analysis_result['full_report'],
-                "similar_project": similar_project_data # <-- NEW: Send the similar project data
-            }, status=status.HTTP_409_CONFLICT)
-        
-        # --- 8. SAVE TO DB ---
-        new_embedding = analyzer.get_embedding(text_to_analyze)
-        serializer.save(
-            student=user,
-            embedding=new_embedding,
-            relevance_score=analysis_result['relevance'],
-            feasibility_score=analysis_result['feasibility'],
-            innovation_score=analysis_result['innovation'],
-            transcribed_text=transcribed_text
+        # --- 6. AUDIO ABSTRACTS: TRANSCRIBE FIRST, THE TRANSCRIPTION WORKER THEN QUEUES THE ANALYSIS ---
+        # Without a transcription backend the audio is kept for the teacher and only the text is analysed
+        if audio_file and transcription_enabled():
+            job = enqueue('transcribe_submission', {'submission_id': submission.id}, queue='transcription')
+            data = dict(serializer.data)
+            data['transcription_job'] = job.id
+            data['analysis_url'] = reverse('submission-analysis', args=[submission.id])
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+
+        # --- 7. QUEUE THE ANALYSIS ---
+        # Inline analysis gets a single attempt; queued jobs are retried by the worker
+        job = enqueue(
+            'analyze_submission',
+            {'submission_id': submission.id},
+            max_attempts=None if settings.ANALYSIS_ASYNC else 1,
         )
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        if settings.ANALYSIS_ASYNC:
+            data = dict(serializer.data)
+            data['analysis_job'] = job.id
+            data['analysis_url'] = reverse('submission-analysis', args=[submission.id])
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+
+        # --- 8. SYNCHRONOUS MODE: RUN THE SAME JOB INLINE ---
+        run_job(claim(job.id, 'inline'))
+        submission.refresh_from_db()
+
+        if submission.status == 'Blocked':
+            body = {
+                "detail": "Submission Blocked: High Similarity Detected. Please revise your idea.",
+                "suggestions": submission.analysis_report,
+                "similar_project": SubmissionAnalysisSerializer(submission).data['similar_project'] or {},
+            }
+            # Inline mode keeps nothing of a blocked attempt, as before the queue existed
+            for upload in (submission.abstract_file, submission.audio_file):
+                if upload:
+                    upload.delete(save=False)
+            submission.delete()
+            return Response(body, status=status.HTTP_409_CONFLICT)
+
+        return Response(ProjectSubmissionSerializer(submission).data, status=status.HTTP_201_CREATED)
+
+
+class SubmissionAnalysisView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, submission_id, *args, **kwargs):
+        """Lets the client poll for the plagiarism verdict and scores of a submission."""
+        try:
+            submission = ProjectSubmission.objects.select_related('similar_submission__student').get(id=submission_id)
+        except ProjectSubmission.DoesNotExist:
+            return Response({"detail": "Submission not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if submission.student_id != request.user.id and request.user.role not in ['Teacher', 'HOD/Admin']:
+            return Response({"detail": "You do not have permission to view this analysis."}, status=status.HTTP_403_FORBIDDEN)
+
+        job = BackgroundJob.objects.filter(
+            kind='analyze_submission', payload__submission_id=submission.id
+        ).order_by('-id').first()
+        serializer = SubmissionAnalysisSerializer(submission, context={'job': job})
+        return Response(serializer.data, status=status.HTTP_200_OK)
     
 # authentication/views.py
 # ... (all existing imports and classes)
 
-class TeacherDashboardView(APIView):
+class TeacherDashboardView(ReadReplicaMixin, APIView):
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
 
     def get(self, request, *args, **kwargs):
@@ -121,9 +204,11 @@ class TeacherDashboardView(APIView):
         Teachers can see all projects but will only be able to approve/reject
         projects from groups they are assigned to.
         """
-        submissions = ProjectSubmission.objects.all().order_by('-submitted_at')
-        serializer = TeacherSubmissionSerializer(submissions, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        submissions = ProjectSubmission.objects.exclude(status__in=ProjectSubmission.PRE_REVIEW_STATUSES).select_related(
+            'student', 'group'
+        ).order_by('-submitted_at', '-id')
+        submissions = defer_unrequested(submissions, request, {'abstract_text': 'abstract_text'}, always=['embedding_vector'])
+        return paginated_response(self, request, submissions, TeacherSubmissionSerializer)
     
     def patch(self, request, submission_id, *args, **kwargs):
         """Allows a teacher to approve or reject a project submission."""
@@ -133,8 +218,7 @@ class TeacherDashboardView(APIView):
             return Response({"detail": "Submission not found."}, status=status.HTTP_404_NOT_FOUND)
 
         # Check if the teacher is assigned to the project's group
-        teacher_groups = request.user.teaching_groups.all()
-        if submission.group not in teacher_groups:
+        if submission.group_id not in teaching_group_ids(request.user):
             return Response({"detail": "You do not have permission to review this project."}, status=status.HTTP_403_FORBIDDEN)
 
         new_status = request.data.get('status')
@@ -158,98 +242,302 @@ class TeacherDashboardView(APIView):
             )
             team = Team.objects.create(project=project)
             team.members.add(submission.student)
+            # Prepare the first viva questions in the background
+            viva.queue_question_set(project, submission)
 
         serializer = TeacherSubmissionSerializer(submission)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
+class TeacherBulkReviewView(APIView):
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Approves or rejects several submissions in one transaction (see reviews.py).
+        Body: {"reviews": [{"submission_id": 1, "status": "Approved"}, ...]}; the
+        response has one result per review, in order.
+        """
+        reviews = request.data.get('reviews')
+        if not isinstance(reviews, list) or not reviews or not all(isinstance(review, dict) for review in reviews):
+            return Response({"detail": "A non-empty list of reviews is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(reviews) > settings.BULK_REVIEW_MAX_ITEMS:
+            return Response(
+                {"detail": f"At most {settings.BULK_REVIEW_MAX_ITEMS} reviews per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = review_submissions(request.user, reviews)
+        counts = Counter(result['result'] for result in results)
+        return Response({
+            "results": results,
+            "approved": counts['approved'],
+            "rejected": counts['rejected'],
+            "failed": len(results) - counts['approved'] - counts['rejected'],
+        }, status=status.HTTP_200_OK)
+
+
 class StudentDashboardView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         """Returns a list of project submissions for the authenticated student."""
-        submissions = ProjectSubmission.objects.filter(student=request.user).order_by('-submitted_at')
+        submissions = ProjectSubmission.objects.filter(student=request.user).select_related(
+            'group', 'project'
+        ).order_by('-submitted_at', '-id')
+        submissions = defer_unrequested(submissions, request, {}, always=['embedding_vector', 'abstract_text', 'project__abstract'])
         # Use the new, correct serializer
-        serializer = StudentSubmissionSerializer(submissions, many=True) 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_response(self, request, submissions, StudentSubmissionSerializer)
     
-class AIChatbotView(APIView):
-    permission_classes = [IsAuthenticated]
-    parser_classes = (MultiPartParser, FormParser, JSONParser,) # Add JSONParser here
+async def authenticate_jwt(request):
+    """Resolves the JWT user for plain (non-DRF) async views; None if not authenticated."""
+    try:
+        result = await sync_to_async(ClaimsJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
 
-    def post(self, request, *args, **kwargs):
+
+def sse_event(data, event=None):
+    """Formats one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAIView(View):
+    """
+    Base for the AI endpoints, served as async views under ASGI so a request
+    waiting on Gemini holds no worker thread. DRF's APIView cannot run async
+    handlers, so this does the part of it these views need: JWT
+    authentication (401 otherwise) and parsing JSON or multipart bodies into
+    `self.data`.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await authenticate_jwt(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+        request.user = user
+
+        if request.content_type == 'application/json':
+            try:
+                self.data = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+            if not isinstance(self.data, dict):
+                return JsonResponse({"detail": "Expected a JSON object."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            self.data = {**request.POST.dict(), **request.FILES.dict()}
+
+        try:
+            with llm_user(user.id):
+                return await super().dispatch(request, *args, **kwargs)
+        except LLMBusy as e:
+            return JsonResponse(
+                {"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(e.retry_after)},
+            )
+
+
+class AIChatbotView(AsyncAIView):
+
+    async def post(self, request, *args, **kwargs):
         # Check for either a text prompt or an audio file
-        user_prompt = request.data.get('prompt')
-        audio_file = request.data.get('audio_file')
+        user_prompt = self.data.get('prompt')
+        audio_file = self.data.get('audio_file')
 
         if not user_prompt and not audio_file:
-            return Response({"error": "Prompt or audio file not provided."}, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({"error": "Prompt or audio file not provided."}, status=status.HTTP_400_BAD_REQUEST)
         
-        # If an audio file is provided, transcribe it first
-        if audio_file:
-            user_prompt = analyzer.transcribe_audio(audio_file.temporary_file_path())
+        # If an audio file is provided, a transcription worker turns it into the prompt
+        if audio_file and not transcription_enabled():
             if not user_prompt:
-                return Response({"error": "Failed to transcribe audio."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # We can also pass a project ID to provide additional context
-        # TODO: Implement context fetching logic
+                return JsonResponse(
+                    {"error": "Voice prompts are not enabled on this server."}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+            audio_file = None
+        if audio_file:
+            path = await sync_to_async(default_storage.save)(
+                f'chat_audio/{uuid.uuid4().hex}{extension(audio_file.name)}', audio_file
+            )
+            job = await sync_to_async(enqueue)('transcribe_prompt', {'path': path, 'user_id': request.user.id}, queue='transcription')
+            job = await await_job(job, settings.TRANSCRIPTION_WAIT_SECONDS)
+            if job.status == 'Failed':
+                return JsonResponse({"error": "Failed to transcribe audio."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if job.status != 'Succeeded':
+                # Still queued: the client can poll the job and send the text as a prompt
+                return JsonResponse({
+                    "transcription_job": job.id,
+                    "transcription_url": reverse('transcription-job', args=[job.id]),
+                }, status=status.HTTP_202_ACCEPTED)
+            user_prompt = job.result['text']
         
-        conversation_history = ""
-        ai_response = analyzer.get_chat_response(user_prompt, conversation_history)
+        # The conversation is stored server-side; a project ID adds its context
+        try:
+            session = await sync_to_async(chat.open_session)(request.user, self.data.get('session_id'), self.data.get('project_id'))
+        except (ChatSession.DoesNotExist, Project.DoesNotExist, ValueError):
+            return JsonResponse({"error": "Chat session or project not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        conversation_history = await sync_to_async(chat.conversation_history)(session)
+        ai_response = await analyzer.aget_chat_response(user_prompt, conversation_history)
+        await sync_to_async(chat.record_exchange)(session, user_prompt, ai_response)
         
-        return Response({"response": ai_response}, status=status.HTTP_200_OK)
-    
-class AIVivaView(APIView):
+        data = {"response": ai_response, "session_id": session.id}
+        if audio_file:
+            data["transcript"] = user_prompt
+        return JsonResponse(data, status=status.HTTP_200_OK)
+
+
+class AIChatStreamView(AsyncAIView):
+    """
+    Streams the chatbot answer as server-sent events while Gemini generates
+    it: `data: {"text": ...}` per chunk, then `event: done` with the chat
+    session id and the time to first token.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        prompt = (self.data.get('prompt') or '').strip()
+        if not prompt:
+            return JsonResponse({"error": "Prompt not provided."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = await sync_to_async(chat.open_session)(request.user, self.data.get('session_id'), self.data.get('project_id'))
+        except (ChatSession.DoesNotExist, Project.DoesNotExist, ValueError):
+            return JsonResponse({"error": "Chat session or project not found."}, status=status.HTTP_404_NOT_FOUND)
+        history = await sync_to_async(chat.conversation_history)(session)
+
+        response = StreamingHttpResponse(self._events(session, prompt, history), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # stop nginx-style proxies from buffering the stream
+        return response
+
+    async def _events(self, session, prompt, history):
+        start = time.perf_counter()
+        first_token_ms = None
+        parts = []
+        # The body is sent after dispatch() returns, so the user is set again here
+        with llm_user(session.user_id):
+            async for text in analyzer.stream_chat_response(prompt, history):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                    latency_window('chat_ttft').record(first_token_ms)
+                    metrics.record_chat_stream('first_token', first_token_ms / 1000)
+                parts.append(text)
+                yield sse_event({"text": text})
+        total_ms = (time.perf_counter() - start) * 1000
+        latency_window('chat_stream_total').record(total_ms)
+        metrics.record_chat_stream('total', total_ms / 1000)
+        await sync_to_async(chat.record_exchange)(session, prompt, ''.join(parts).strip())
+        yield sse_event({
+            "session_id": session.id,
+            "ttft_ms": round(first_token_ms or total_ms, 1),
+            "total_ms": round(total_ms, 1),
+        }, event='done')
+
+
+class TranscriptionJobView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def post(self, request, *args, **kwargs):
-        project_id = request.data.get('project_id')
+    def get(self, request, job_id, *args, **kwargs):
+        """Polls a chatbot voice prompt transcription queued by AIChatbotView."""
+        job = BackgroundJob.objects.filter(id=job_id, kind='transcribe_prompt', payload__user_id=request.user.id).first()
+        if job is None:
+            return Response({"detail": "Transcription not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            "id": job.id,
+            "status": job.status,
+            "text": (job.result or {}).get('text'),
+            "error": job.last_error if job.status == 'Failed' else '',
+        }, status=status.HTTP_200_OK)
+    
+class AIMetricsView(APIView):
+    permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
+
+    def get(self, request, *args, **kwargs):
+        """Gemini call queue, circuit breaker, cache and latency figures of this worker process."""
+        return Response({
+            "llm_gate": analyzer.gate.stats(),
+            "llm_resilience": analyzer.resilience.stats(),
+            "llm_cache": analyzer.cache.stats() if analyzer.cache is not None else None,
+            "latency_ms": latency_summaries(),
+        }, status=status.HTTP_200_OK)
+
+
+class AIVivaView(AsyncAIView):
+
+    async def post(self, request, *args, **kwargs):
+        """Returns the stored viva questions for the project's progress; `regenerate` asks Gemini for new ones."""
+        project_id = self.data.get('project_id')
         
         if not project_id:
-            return Response({"error": "Project ID not provided."}, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({"error": "Project ID not provided."}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            submission = ProjectSubmission.objects.get(id=project_id)
+            submission = await ProjectSubmission.objects.aget(id=project_id)
             # Fetch the associated Project instance to get progress
-            project = Project.objects.get(submission=submission)
-            progress = project.progress_percentage
+            project = await Project.objects.aget(submission=submission)
         except ProjectSubmission.DoesNotExist:
-            return Response({"error": "Submission not found."}, status=status.HTTP_404_NOT_FOUND)
+            return JsonResponse({"error": "Submission not found."}, status=status.HTTP_404_NOT_FOUND)
         except Project.DoesNotExist:
             # Handle case where submission is not yet approved and has no Project model
-            progress = 0 
-        
-        # Generate the questions using the AI service
-        questions = analyzer.generate_viva_questions(
-            title=submission.title,
-            abstract=submission.abstract_text,
-            progress_percentage=progress # <-- Passing the progress
-        )
-        
-        return Response({"questions": questions}, status=status.HTTP_200_OK)
-class AIVivaEvaluationView(APIView):
-    permission_classes = [IsAuthenticated]
+            project = None
 
-    def post(self, request, *args, **kwargs):
-        project_id = request.data.get('project_id')
-        question = request.data.get('question')
-        answer = request.data.get('answer')
+        # Read from the question bank (authentication/viva.py)
+        regenerate = self.data.get('regenerate') in (True, 'true', '1')
+        questions = await viva.aquestions(submission, project, regenerate=regenerate)
+
+        return JsonResponse({"questions": questions}, status=status.HTTP_200_OK)
+class AIVivaEvaluationView(AsyncAIView):
+
+    async def post(self, request, *args, **kwargs):
+        project_id = self.data.get('project_id')
+        question = self.data.get('question')
+        answer = self.data.get('answer')
         
         if not all([project_id, question, answer]):
-            return Response({"error": "Project ID, question, and answer are required."}, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({"error": "Project ID, question, and answer are required."}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            project = ProjectSubmission.objects.get(id=project_id)
+            project = await ProjectSubmission.objects.aget(id=project_id)
         except ProjectSubmission.DoesNotExist:
-            return Response({"error": "Project not found."}, status=status.HTTP_404_NOT_FOUND)
+            return JsonResponse({"error": "Project not found."}, status=status.HTTP_404_NOT_FOUND)
             
         # Evaluate the answer using the AI service
-        evaluation_result = analyzer.evaluate_viva_answer(
+        evaluation_result = await analyzer.aevaluate_viva_answer(
             question=question,
             answer=answer,
             abstract=project.abstract_text
         )
         
-        return Response(evaluation_result, status=status.HTTP_200_OK)
+        return JsonResponse(evaluation_result, status=status.HTTP_200_OK)
+
+class AIVivaBatchEvaluationView(AsyncAIView):
+
+    async def post(self, request, *args, **kwargs):
+        """Grades all viva answers for a project with a single AI request."""
+        project_id = self.data.get('project_id')
+        answers = self.data.get('answers')
+
+        if not project_id or not isinstance(answers, list) or not answers:
+            return JsonResponse({"error": "Project ID and a non-empty list of answers are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(answers) > settings.VIVA_BATCH_MAX_ANSWERS:
+            return JsonResponse({"error": f"At most {settings.VIVA_BATCH_MAX_ANSWERS} answers can be evaluated at once."}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(item, dict) and item.get('question') and item.get('answer') for item in answers):
+            return JsonResponse({"error": "Each answer needs a question and an answer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            project = await ProjectSubmission.objects.aget(id=project_id)
+        except ProjectSubmission.DoesNotExist:
+            return JsonResponse({"error": "Project not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        evaluations = await analyzer.aevaluate_viva_answers(
+            qa_pairs=[(item['question'], item['answer']) for item in answers],
+            abstract=project.abstract_text
+        )
+        results = [
+            {"question": item['question'], **evaluation}
+            for item, evaluation in zip(answers, evaluations)
+        ]
+        return JsonResponse({"results": results}, status=status.HTTP_200_OK)
 
 class ProjectArchiveView(APIView):
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
@@ -288,7 +576,7 @@ class ProjectArchiveView(APIView):
         submission.save()
 
         return Response({"detail": f"Project status updated to {new_status}."}, status=status.HTTP_200_OK)
-class AnalyticsView(generics.ListAPIView):
+class AnalyticsView(ReadReplicaMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
 
     def get_queryset(self):
@@ -296,72 +584,72 @@ class AnalyticsView(generics.ListAPIView):
         return None
 
     def list(self, request, *args, **kwargs):
-        # Count projects by status
-        status_counts = Project.objects.values('status').annotate(count=Count('status'))
-
-        # Count projects by category
-        category_counts = Project.objects.values('category').annotate(count=Count('category'))
+        # Counts and top scores come from the rollup tables (see rollups.py)
+        counters = AnalyticsCounter.objects.filter(count__gt=0)
+        status_counts = [{'status': c.value, 'count': c.count} for c in counters if c.dimension == 'status']
+        category_counts = [{'category': c.value, 'count': c.count} for c in counters if c.dimension == 'category']
 
         # Get top 5 most innovative projects (example)
-        top_innovative = Project.objects.filter(status='Completed').order_by('-submission__innovation_score')[:5]
+        top_innovative = ProjectScoreRollup.objects.filter(status='Completed').order_by('-innovation_score')[:5]
         
         top_innovative_data = [
-            {'title': p.title, 'score': p.submission.innovation_score} for p in top_innovative
+            {'title': p.title, 'score': p.innovation_score} for p in top_innovative
         ]
 
         data = {
-            'project_status_counts': list(status_counts),
-            'project_category_counts': list(category_counts),
+            'project_status_counts': status_counts,
+            'project_category_counts': category_counts,
             'top_innovative_projects': top_innovative_data,
         }
         return Response(data, status=status.HTTP_200_OK)
-class LeaderboardView(generics.ListAPIView):
+class LeaderboardView(ReadReplicaMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = UserSerializer
 
     def get_queryset(self):
-        # FIX: We annotate ALL users with their total innovation score (using a left join)
-        # Then, we filter out users with no projects (or where the score is NULL/0)
-        
-        # 1. Annotate all users with a score (NULL if no projects)
-        queryset = User.objects.annotate(
-            total_innovation=Sum(
-                'active_projects__project__submission__innovation_score'
-            )
-        )
-        
-        # 2. Filter out users who have no score (i.e., no completed projects) 
-        # and sort by score, taking the top 10.
-        return queryset.filter(
-            total_innovation__isnull=False,
-            active_projects__project__status='Completed' # Only count COMPLETED projects
-        ).order_by('-total_innovation')[:10]
+        # Totals of COMPLETED projects per user are kept in LeaderboardEntry (see rollups.py)
+        return User.objects.filter(leaderboard_entry__isnull=False).order_by(
+            '-leaderboard_entry__total_innovation'
+        )[:10]
 
     # ... (list method remains the same)
 
 class AlumniPortalView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ProjectSubmissionSerializer # Display full details of the submission
+    pagination_class = SubmittedAtCursorPagination
 
     def get_queryset(self):
         # FIX: Ensure we fetch only the student's own submissions with final statuses
-        return ProjectSubmission.objects.filter(
+        queryset = ProjectSubmission.objects.filter(
             student=self.request.user,
             status__in=['Completed', 'Archived'] # Checks the status field in ProjectSubmission
-        ).order_by('-submitted_at')
+        ).select_related('student').order_by('-submitted_at', '-id')
+        return defer_unrequested(queryset, self.request, {'abstract_text': 'abstract_text'}, always=['embedding_vector'])
     
     
-class AllProjectsView(generics.ListAPIView):
+class AllProjectsView(ReadReplicaMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
-    queryset = Project.objects.all()
     serializer_class = ProjectSerializer # Corrected serializer
+    pagination_class = ProjectCursorPagination
 
-class AdminDashboardView(APIView):
+    def get_queryset(self):
+        # 'team' is a reverse one-to-one, so select_related also fills team.project for Team.__str__
+        queryset = Project.objects.select_related('submission__student', 'team').annotate(
+            submitted_at=F('submission__submitted_at'),
+        ).order_by('-submitted_at', '-id')
+        return defer_unrequested(
+            queryset, self.request,
+            {'abstract': 'abstract', 'submission': 'submission__abstract_text'},
+            always=['submission__embedding_vector'],
+        )
+
+class AdminDashboardView(ReadReplicaMixin, APIView):
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
 
     def get(self, request, *args, **kwargs):
         users = User.objects.all()
-        groups = Group.objects.all()
+        groups = Group.objects.prefetch_related('teachers', 'students')
 
         user_serializer = UserSerializer(users, many=True)
         group_serializer = GroupSerializer(groups, many=True)
@@ -374,40 +662,45 @@ class AdminDashboardView(APIView):
     def patch(self, request, group_id, *args, **kwargs):
         # We will add logic here to update the group members later
         return Response({"detail": "Group update not implemented yet."}, status=status.HTTP_200_OK)
-class AppointedTeacherDashboard(generics.ListAPIView):
+class AppointedTeacherDashboard(ReadReplicaMixin, generics.ListAPIView):
     """
     Dashboard 1: Projects from groups the teacher is assigned to.
     Allows approval/rejection actions (PATCH).
     """
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
     serializer_class = TeacherSubmissionSerializer
+    pagination_class = SubmittedAtCursorPagination
 
     def get_queryset(self):
         # Get all groups the logged-in teacher is part of
-        teacher_groups = self.request.user.teaching_groups.all()
+        teacher_groups = teaching_group_ids(self.request.user)
         
         # Filter submissions that belong to any of these groups and are still 'Submitted'
-        return ProjectSubmission.objects.filter(
+        queryset = ProjectSubmission.objects.filter(
             group__in=teacher_groups,
             status='Submitted'
-        ).order_by('-submitted_at')
+        ).select_related('student', 'group').order_by('-submitted_at', '-id')
+        return defer_unrequested(queryset, self.request, {'abstract_text': 'abstract_text'}, always=['embedding_vector'])
 
-class UnappointedTeacherDashboard(generics.ListAPIView):
+class UnappointedTeacherDashboard(ReadReplicaMixin, generics.ListAPIView):
     """
     Dashboard 2: Projects from all other groups. Read-only view.
     """
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
     serializer_class = TeacherSubmissionSerializer
+    pagination_class = SubmittedAtCursorPagination
 
     def get_queryset(self):
         # Get all groups the logged-in teacher is part of
-        teacher_groups = self.request.user.teaching_groups.all()
+        teacher_groups = teaching_group_ids(self.request.user)
         
         # Filter submissions that DO NOT belong to the teacher's groups
-        # The teacher can view all submissions, regardless of status, if they are not in the group.
-        return ProjectSubmission.objects.filter(
+        # The teacher can view all reviewable submissions, regardless of status, if they are not in the group.
+        queryset = ProjectSubmission.objects.filter(
             ~Q(group__in=teacher_groups)
-        ).order_by('-submitted_at')
+        ).exclude(status__in=ProjectSubmission.PRE_REVIEW_STATUSES).select_related('student', 'group').order_by('-submitted_at', '-id')
+        return defer_unrequested(queryset, self.request, {'abstract_text': 'abstract_text'}, always=['embedding_vector'])
+
 class ProjectProgressView(views.APIView):
     permission_classes = [IsAuthenticated]
     
@@ -446,11 +739,16 @@ class ProgressUpdateView(views.APIView):
             return Response({"error": "You do not own this project."}, status=status.HTTP_403_FORBIDDEN)
 
         # 4. Update and Save
+        old_band = analyzer.viva_band(project.progress_percentage)
         project.progress_percentage = new_progress
         project.save()
 
+        # 5. Prepare the viva questions of a new progress band in the background
+        if analyzer.viva_band(new_progress) != old_band:
+            viva.queue_question_set(project, submission)
+
         return Response({"detail": f"Progress updated to {new_progress}%"}, status=status.HTTP_200_OK)
-class TopAlumniProjectsView(generics.ListAPIView):
+class TopAlumniProjectsView(ReadReplicaMixin, generics.ListAPIView):
     """
     A public view to showcase the top 10 best-rated alumni projects.
     """
@@ -463,22 +761,29 @@ class TopAlumniProjectsView(generics.ListAPIView):
         # Limits the result to the top 10
         return ProjectSubmission.objects.filter(
             status__in=['Completed', 'Archived']
-        ).order_by(
+        ).select_related('student').order_by(
             '-innovation_score', 
             '-relevance_score', 
             '-feasibility_score'
         )[:10]
     
-class ApprovedProjectsView(generics.ListAPIView):
+class ApprovedProjectsView(ReadReplicaMixin, generics.ListAPIView):
     """
     Provides a list of all projects that are 'In Progress' or 'Completed'
     for the teacher dashboard.
     """
     permission_classes = [IsAuthenticated, IsTeacherOrAdmin]
     serializer_class = ApprovedProjectSerializer
+    pagination_class = ProjectCursorPagination
 
     def get_queryset(self):
         # Fetches all projects that are past the submission stage
-        return Project.objects.filter(
+        queryset = Project.objects.filter(
             status__in=['In Progress', 'Completed', 'Archived']
-        ).order_by('-submission__submitted_at')
+        ).select_related('submission__student').annotate(
+            submitted_at=F('submission__submitted_at'),
+        ).order_by('-submitted_at', '-id')
+        return defer_unrequested(
+            queryset, self.request, {},
+            always=['abstract', 'submission__abstract_text', 'submission__embedding_vector'],
+        )
@@ -0,0 +1,94 @@
+# authentication/viva.py
+"""
+Viva question bank: five questions per project and progress band
+(ProjectAnalyzer.VIVA_BANDS), stored in VivaQuestionSet.
+
+A project's questions are generated by a 'generate_viva_questions' job when
+it is approved and when its progress moves into another band, so the viva
+page only reads them. Sets made from an older title, abstract or prompt
+version are regenerated; students can also ask for new questions.
+"""
+import hashlib
+
+from django.conf import settings
+
+from project_management.project_analyzer import PROMPT_VERSIONS, analyzer
+from .jobs import claim, enqueue, enqueue_many, run_job
+from .models import BackgroundJob, Project, VivaQuestionSet
+
+BAND_START = {band: start for band, start, _, _ in analyzer.VIVA_BANDS}
+
+
+def source_digest(submission):
+    source = f"{PROMPT_VERSIONS['viva_questions']}\n{submission.title}\n{submission.abstract_text}"
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def queue_question_set(project, submission):
+    """
+    Queues the questions for the current band of ``project`` unless they are
+    stored or already queued. Runs the job inline when ANALYSIS_ASYNC is off.
+    """
+    band = analyzer.viva_band(project.progress_percentage)
+    if VivaQuestionSet.objects.filter(project=project, band=band, source_digest=source_digest(submission)).exists():
+        return None
+    pending = BackgroundJob.objects.filter(
+        kind='generate_viva_questions', payload__project_id=project.id, payload__band=band,
+        status__in=('Queued', 'Running'),
+    ).exists()
+    if pending:
+        return None
+    job = enqueue('generate_viva_questions', {'project_id': project.id, 'band': band})
+    if not settings.ANALYSIS_ASYNC:
+        run_job(claim(job.id, 'inline'))
+    return job
+
+
+def queue_first_question_sets(projects):
+    """
+    queue_question_set for projects approved in bulk, which have no sets or
+    jobs yet: one INSERT. Returns the jobs; inline mode is left to the caller,
+    to run them outside its transaction.
+    """
+    return enqueue_many('generate_viva_questions', [
+        {'project_id': project.id, 'band': analyzer.viva_band(project.progress_percentage)} for project in projects
+    ])
+
+
+def generate_question_set(project_id, band):
+    """Generates and stores the questions of a project for ``band``; None when Gemini failed."""
+    project = Project.objects.select_related('submission').get(id=project_id)
+    submission = project.submission
+    questions = analyzer.generate_viva_questions(submission.title, submission.abstract_text, BAND_START[band])
+    if questions == [analyzer.VIVA_QUESTIONS_FAILED]:
+        return None
+    question_set, _ = VivaQuestionSet.objects.update_or_create(
+        project=project, band=band, defaults={'questions': questions, 'source_digest': source_digest(submission)},
+    )
+    return question_set
+
+
+async def aquestions(submission, project, regenerate=False):
+    """
+    The viva questions for the viva page: the stored set for the project's
+    band, else (or with ``regenerate``) new ones from Gemini, which are stored.
+    Submissions without a project are not stored.
+    """
+    if project is None:
+        return await analyzer.agenerate_viva_questions(submission.title, submission.abstract_text, 0)
+
+    band = analyzer.viva_band(project.progress_percentage)
+    digest = source_digest(submission)
+    if not regenerate:
+        stored = await VivaQuestionSet.objects.filter(project=project, band=band, source_digest=digest).afirst()
+        if stored is not None:
+            return stored.questions
+
+    questions = await analyzer.agenerate_viva_questions(
+        submission.title, submission.abstract_text, BAND_START[band], fresh=regenerate,
+    )
+    if questions != [analyzer.VIVA_QUESTIONS_FAILED]:
+        await VivaQuestionSet.objects.aupdate_or_create(
+            project=project, band=band, defaults={'questions': questions, 'source_digest': digest},
+        )
+    return questions
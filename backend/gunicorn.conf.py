@@ -0,0 +1,25 @@
+# Read by gunicorn from the working directory (the Procfile's web process).
+import glob
+import os
+from pathlib import Path
+
+# Each web worker writes its Prometheus samples here; /metrics adds them up
+# (project_management/metrics.py). Must be set before the workers import Django.
+# The directory belongs to this server alone: job workers export their own
+# metrics (run_worker --metrics-port), so wiping it on start loses nothing live.
+MULTIPROC_DIR = Path(__file__).resolve().parent / 'prometheus_multiproc' / 'web'
+os.environ['PROMETHEUS_MULTIPROC_DIR'] = str(MULTIPROC_DIR)
+
+
+def on_starting(server):
+    """Starts from empty metric files; those of a previous run would be added in."""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
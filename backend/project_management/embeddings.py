@@ -0,0 +1,160 @@
+"""
+CPU-only embedding backends for ``ProjectAnalyzer.get_embedding``.
+
+Backends expose ``encode(texts) -> np.ndarray`` (float32, one L2-normalised
+row per text), ``dim`` and ``model_version``. The active backend is chosen by
+``settings.EMBEDDING_BACKEND``:
+
+    EMBEDDING_BACKEND = {'NAME': 'hashing', 'OPTIONS': {'dim': 512}}
+
+* ``hashing`` – signed feature hashing of word and character n-grams with
+  sublinear TF and optional IDF weights. Pure NumPy, memory is O(dim).
+* ``onnx``    – a (quantized) sentence-transformer exported to ONNX. Needs
+  the optional ``onnxruntime`` and ``tokenizers`` packages.
+"""
+import re
+import threading
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """Hashed TF-IDF over word uni/bi-grams and character n-grams."""
+
+    version = 1
+
+    def __init__(self, dim=512, char_ngrams=(3, 5), word_ngrams=(1, 2), idf_path=None):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.word_ngrams = word_ngrams
+        self.idf = np.load(idf_path).astype(np.float32) if idf_path else None
+        if self.idf is not None and self.idf.shape != (dim,):
+            raise ValueError(f"IDF weights at {idf_path} do not match dim={dim}.")
+
+    @property
+    def model_version(self):
+        return f"hashing-v{self.version}-{self.dim}"
+
+    def _features(self, text):
+        words = _TOKEN_RE.findall(text.lower())
+        low, high = self.word_ngrams
+        for n in range(low, high + 1):
+            for i in range(len(words) - n + 1):
+                yield 'w:' + ' '.join(words[i:i + n])
+        joined = f" {' '.join(words)} "
+        low, high = self.char_ngrams
+        for n in range(low, high + 1):
+            for i in range(len(joined) - n + 1):
+                yield 'c:' + joined[i:i + n]
+
+    def _counts(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode('utf-8')) for feature in self._features(text)),
+            dtype=np.uint32,
+        )
+        # The top bit picks the sign so collisions cancel out on average
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        np.add.at(vector, (hashes % self.dim).astype(np.intp), signs)
+        return vector
+
+    def encode(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = self._counts(text or '')
+            matrix[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        if self.idf is not None:
+            matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def fit_idf(self, texts):
+        """Computes smoothed IDF weights per hash bucket from a corpus."""
+        document_frequency = np.zeros(self.dim, dtype=np.float64)
+        for text in texts:
+            document_frequency += self._counts(text or '') != 0
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self.idf
+
+
+class OnnxEmbedder:
+    """Mean-pooled sentence embeddings from an ONNX model on CPU."""
+
+    def __init__(self, model_path, tokenizer_path, max_length=256, threads=1):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as exc:
+            raise ImportError(
+                "The 'onnx' embedding backend needs the onnxruntime and tokenizers packages."
+            ) from exc
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        # Keep the memory footprint fixed instead of letting the arena grow per batch
+        options.enable_cpu_mem_arena = False
+        self.session = onnxruntime.InferenceSession(
+            str(model_path), options, providers=['CPUExecutionProvider']
+        )
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dim = self.session.get_outputs()[0].shape[-1]
+        self.model_path = model_path
+
+    @property
+    def model_version(self):
+        return f"onnx-{str(self.model_path).rsplit('/', 1)[-1]}-{self.dim}"
+
+    def encode(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        encodings = self.tokenizer.encode_batch([t or '' for t in texts])
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': ids, 'attention_mask': mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.zeros_like(ids)
+        token_embeddings = self.session.run(None, feeds)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (pooled / norms).astype(np.float32)
+
+
+EMBEDDING_BACKENDS = {
+    'hashing': HashingEmbedder,
+    'onnx': OnnxEmbedder,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_embedder(name, **options):
+    try:
+        backend_class = EMBEDDING_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown embedding backend '{name}'.")
+    return backend_class(**options)
+
+
+def get_embedder():
+    """Returns the process-wide embedder configured in settings."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = settings.EMBEDDING_BACKEND
+                _backend = create_embedder(config['NAME'], **config.get('OPTIONS', {}))
+    return _backend
@@ -0,0 +1,187 @@
+"""
+A local stand-in for the Gemini REST API (``models/<name>:generateContent``
+and ``:streamGenerateContent?alt=sse``). It answers every ProjectAnalyzer
+prompt with a canned reply in the format the analyzer parses, after a
+configurable latency, and can inject failures:
+
+    with FakeGeminiServer(**PROFILES['flaky']) as server:
+        ...  # LLM_TRANSPORT = {'BACKEND': 'rest', 'OPTIONS': {'url': server.url}}
+
+or standalone with ``manage.py run_fake_gemini``. Failures can also be
+scripted: the next ``fail_next`` requests answer with ``error_status`` and
+the next ``stall_next`` requests wait ``stall_seconds`` before answering.
+All attributes may be changed while the server runs.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUS_NAMES = {429: 'RESOURCE_EXHAUSTED', 500: 'INTERNAL', 503: 'UNAVAILABLE', 504: 'DEADLINE_EXCEEDED'}
+
+# Latency and error profiles for load tests
+PROFILES = {
+    'healthy': {'latency': 0.8, 'jitter': 0.4, 'chunk_latency': 0.03},
+    'slow': {'latency': 4.0, 'jitter': 4.0, 'chunk_latency': 0.1},
+    'flaky': {'latency': 0.8, 'jitter': 0.4, 'chunk_latency': 0.03, 'error_rate': 0.1, 'error_status': 503},
+    'throttled': {'latency': 0.8, 'jitter': 0.4, 'chunk_latency': 0.03, 'error_rate': 0.3, 'error_status': 429},
+    'outage': {'latency': 0.2, 'error_rate': 1.0, 'error_status': 503},
+}
+
+
+def canned_reply(prompt):
+    """A reply in the format ProjectAnalyzer expects for ``prompt``."""
+    if 'ARCHIVED IDEAS' in prompt:
+        return "SCORE: 0.20 | INDEX: 0"
+    if '### Q<number>' in prompt:
+        count = len(re.findall(r"^\s*Q\d+:", prompt, flags=re.MULTILINE))
+        return "\n".join(
+            f"### Q{n}\nScore: 7/10\nFeedback: Clear answer, add more detail." for n in range(1, count + 1)
+        )
+    if 'viva questions' in prompt:
+        return "\n".join(f"{n}. Explain design decision {n}." for n in range(1, 6))
+    if 'Evaluate the answer' in prompt:
+        return "Score: 7/10\nFeedback: Clear answer, add more detail."
+    if 'SCORES' in prompt or 'Relevance' in prompt:
+        return "Relevance: 8\nFeasibility: 7\nInnovation: 6\nSUGGESTIONS: 1. Add analytics."
+    return (
+        "This is a stub response. A real answer would explain the concept step by step, "
+        "give an example from the student's project and suggest what to read next."
+    )
+
+
+class FakeGeminiServer:
+
+    def __init__(self, latency=0.0, jitter=0.0, chunk_latency=0.0, error_rate=0.0, error_status=503,
+                 stall_seconds=30.0, reply=canned_reply, host='127.0.0.1', port=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_latency = chunk_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stall_seconds = stall_seconds
+        self.reply = reply
+        self.fail_next = 0
+        self.stall_next = 0
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _plan(self):
+        """Decides (delay before the first byte, error status or None) for the next request."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            if self.stall_next:
+                self.stall_next -= 1
+                delay = self.stall_seconds
+            if self.fail_next:
+                self.fail_next -= 1
+                return delay, self.error_status
+            if self._random.random() < self.error_rate:
+                return delay, self.error_status
+            return delay, None
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                stream = self.path.split('?')[0].endswith(':streamGenerateContent')
+                delay, error_status = fake._plan()
+                time.sleep(delay)
+                if error_status:
+                    self._send(error_status, {'error': {
+                        'code': error_status, 'message': 'Injected failure.',
+                        'status': STATUS_NAMES.get(error_status, 'UNKNOWN'),
+                    }})
+                    return
+                try:
+                    prompt = body['contents'][-1]['parts'][0]['text']
+                except (KeyError, IndexError, TypeError):
+                    self._send(400, {'error': {'code': 400, 'message': 'No prompt.', 'status': 'INVALID_ARGUMENT'}})
+                    return
+                if stream:
+                    self._send_stream(prompt, fake.reply(prompt))
+                else:
+                    reply = fake.reply(prompt)
+                    self._send(200, _candidate(reply, _usage(prompt, reply)))
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up (timeout or losing hedge)
+
+            def _send_stream(self, prompt, text):
+                """Server-sent events, one word per chunk, ``chunk_latency`` apart."""
+                self.close_connection = True
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/event-stream')
+                    self.send_header('Connection', 'close')
+                    self.end_headers()
+                    words = text.split(' ')
+                    for i, word in enumerate(words):
+                        if i:
+                            time.sleep(fake.chunk_latency)
+                        # like Gemini, the last chunk carries the usage for the whole reply
+                        usage = _usage(prompt, text) if i == len(words) - 1 else None
+                        chunk = json.dumps(_candidate(word if i == 0 else ' ' + word, usage))
+                        self.wfile.write(f'data: {chunk}\r\n\r\n'.encode())
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _candidate(text, usage=None):
+    data = {'candidates': [{
+        'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP', 'index': 0,
+    }]}
+    if usage is not None:
+        data['usageMetadata'] = usage
+    return data
+
+
+def _usage(prompt, reply):
+    """Token counts at about 4 characters per token."""
+    prompt_tokens, reply_tokens = len(prompt) // 4 + 1, len(reply) // 4 + 1
+    return {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': reply_tokens, 'totalTokenCount': prompt_tokens + reply_tokens}
@@ -0,0 +1,47 @@
+"""
+Rolling latency samples for in-process metrics (e.g. chatbot time to first
+token). Each window keeps the most recent ``size`` samples in milliseconds.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class LatencyWindow:
+    def __init__(self, size=1000):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, milliseconds):
+        with self._lock:
+            self._samples.append(milliseconds)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            samples = list(self._samples)
+            count = self.count
+        if not samples:
+            return {'count': count, 'p50': None, 'p95': None, 'p99': None}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {'count': count, 'p50': round(float(p50), 1), 'p95': round(float(p95), 1), 'p99': round(float(p99), 1)}
+
+
+_windows = {}
+_windows_lock = threading.Lock()
+
+
+def latency_window(name):
+    """Returns the process-wide window registered under ``name``."""
+    with _windows_lock:
+        if name not in _windows:
+            _windows[name] = LatencyWindow()
+        return _windows[name]
+
+
+def latency_summaries():
+    with _windows_lock:
+        windows = dict(_windows)
+    return {name: window.summary() for name, window in sorted(windows.items())}
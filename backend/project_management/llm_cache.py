@@ -0,0 +1,181 @@
+"""
+Content-addressed cache for ``ProjectAnalyzer`` LLM responses.
+
+Keys are a SHA-256 of the prompt template name, its version (bump it in
+``PROMPT_VERSIONS`` whenever a template changes) and the rendered inputs, so
+identical requests are answered locally without spending API quota.
+
+Backends (``settings.LLM_CACHE['BACKEND']``):
+
+* ``memory`` – per-process LRU with TTL.
+* ``sqlite`` – file-backed LRU shared by every worker on the machine.
+* ``django`` – any configured Django cache (``OPTIONS: {'alias': ...}``).
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+
+def make_key(template, version, *inputs):
+    payload = json.dumps([template, version, *inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries, **options):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteBackend:
+    """LRU cache in a local SQLite file, shared between worker processes."""
+
+    def __init__(self, max_entries, path=None, **options):
+        self.max_entries = max_entries
+        self.path = str(path or settings.BASE_DIR / 'llm_cache.sqlite3')
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        db = self._connection()
+        now = time.time()
+        row = db.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            return None
+        db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        db = self._connection()
+        now = time.time()
+        db.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now),
+        )
+        db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        self._connection().execute("DELETE FROM llm_cache")
+
+
+class DjangoCacheBackend:
+    """Delegates to a Django cache; eviction policy is the cache's own."""
+
+    def __init__(self, max_entries, alias='default', **options):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(f'llm:{key}')
+
+    def set(self, key, value, ttl):
+        self.cache.set(f'llm:{key}', value, ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+
+CACHE_BACKENDS = {
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend,
+    'django': DjangoCacheBackend,
+}
+
+
+class LLMCache:
+    """Cache front-end with hit/miss counters per prompt template."""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, template, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses[template] += 1
+            else:
+                self.hits[template] += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def stats(self):
+        templates = set(self.hits) | set(self.misses)
+        return {
+            t: {
+                'hits': self.hits[t],
+                'misses': self.misses[t],
+                'hit_rate': self.hits[t] / ((self.hits[t] + self.misses[t]) or 1),
+            }
+            for t in sorted(templates)
+        }
+
+
+def build_cache():
+    """Creates the cache configured in ``settings.LLM_CACHE`` (None if disabled)."""
+    config = getattr(settings, 'LLM_CACHE', None)
+    if not config or not config.get('BACKEND'):
+        return None
+    try:
+        backend_class = CACHE_BACKENDS[config['BACKEND']]
+    except KeyError:
+        raise ValueError(f"Unknown LLM cache backend '{config['BACKEND']}'.")
+    backend = backend_class(config.get('MAX_ENTRIES', 2048), **config.get('OPTIONS', {}))
+    return LLMCache(backend, config.get('TTL', 24 * 60 * 60))
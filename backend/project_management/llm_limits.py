@@ -0,0 +1,365 @@
+"""
+Admission control for outbound Gemini calls made by ``ProjectAnalyzer``.
+
+Every call that misses the response cache goes through an ``LLMGate``:
+
+1. Single flight: identical prompts in flight at the same time share one
+   upstream call (keyed like the response cache).
+2. Fair queue: at most ``MAX_CONCURRENCY`` calls per process run at once.
+   Waiting calls are served round-robin per user, so one user's burst cannot
+   starve everybody else.
+3. Token bucket: ``REQUESTS_PER_MINUTE`` (with ``BURST``) across all
+   workers when the bucket lives in a shared SQLite file.
+
+A call that cannot start within ``QUEUE_TIMEOUT`` seconds raises ``LLMBusy``
+instead of spending quota. Configured by ``settings.LLM_LIMITS``; the user of
+the current request is set with ``llm_user()``.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from . import metrics
+from .latency import latency_window
+
+_current_user = ContextVar('llm_user', default=None)
+
+
+class LLMBusy(Exception):
+    """Raised when a Gemini call could not get a slot and a rate-limit token in time."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def llm_user(user_id):
+    """Attributes the Gemini calls made inside the block to ``user_id`` for fair queuing."""
+    token = _current_user.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+# --- Token buckets ---
+
+class MemoryTokenBucket:
+    """Per-process bucket."""
+
+    def __init__(self, rate, burst, **options):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Takes a token; returns 0, or the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class SQLiteTokenBucket:
+    """Bucket in a local SQLite file, shared by every worker process on the machine."""
+
+    def __init__(self, rate, burst, path=None, name='gemini', **options):
+        self.rate = rate
+        self.burst = burst
+        self.name = name
+        self.path = str(path or settings.BASE_DIR / 'llm_rate_limit.sqlite3')
+        self._local = threading.local()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_rate_limit ("
+                " name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def take(self):
+        db = self._connection()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT tokens, updated_at FROM llm_rate_limit WHERE name = ?", (self.name,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + (now - row[1]) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            db.execute(
+                "INSERT OR REPLACE INTO llm_rate_limit (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.name, tokens, now),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return wait
+
+
+RATE_LIMIT_BACKENDS = {
+    'memory': MemoryTokenBucket,
+    'sqlite': SQLiteTokenBucket,
+}
+
+
+# --- Fair concurrency limit ---
+
+class _Waiter:
+    __slots__ = ('user', 'event', 'loop', 'future', 'granted')
+
+    def __init__(self, user, loop=None):
+        self.user = user
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+
+
+class FairSemaphore:
+    """
+    Counting semaphore usable from threads and event loops alike. When all
+    slots are taken, waiters queue per user and a released slot goes to the
+    next user in round-robin order.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self._queues = OrderedDict()  # user -> deque of waiters
+        self._lock = threading.Lock()
+
+    def _enqueue(self, user, loop=None):
+        """Takes a free slot (returns None) or queues a waiter."""
+        with self._lock:
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                return None
+            waiter = _Waiter(user, loop)
+            self._queues.setdefault(user, deque()).append(waiter)
+            self.waiting += 1
+            return waiter
+
+    def _withdraw(self, waiter):
+        """Removes a waiter that gave up; returns True if it was granted a slot meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            queue = self._queues[waiter.user]
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.user]
+            self.waiting -= 1
+            return False
+
+    def acquire(self, user, timeout):
+        waiter = self._enqueue(user)
+        if waiter is None or waiter.event.wait(timeout) or self._withdraw(waiter):
+            return
+        raise LLMBusy("Too many AI requests are waiting; try again shortly.", retry_after=int(timeout) or 1)
+
+    async def aacquire(self, user, timeout):
+        waiter = self._enqueue(user, asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # A grant still on its way finds the future cancelled and releases the slot
+            # itself; one that already landed is handed back here.
+            if self._withdraw(waiter) and waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise LLMBusy("Too many AI requests are waiting; try again shortly.", retry_after=int(timeout) or 1)
+
+    def release(self):
+        with self._lock:
+            if not self._queues:
+                self.active -= 1
+                return
+            user, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            self.waiting -= 1
+            waiter.granted = True
+        if waiter.loop is None:
+            waiter.event.set()
+        else:
+            waiter.loop.call_soon_threadsafe(self._wake, waiter)
+
+    def _wake(self, waiter):
+        if waiter.future.done():
+            self.release()
+        else:
+            waiter.future.set_result(None)
+
+
+# --- Gate ---
+
+def _record_queue_wait(seconds):
+    latency_window('llm_queue_wait').record(seconds * 1000)
+    metrics.LLM_QUEUE_WAIT_SECONDS.observe(seconds)
+
+
+class LLMGate:
+    """Single flight, fair concurrency limit and rate limit in front of the LLM client."""
+
+    def __init__(self, bucket, max_concurrency, queue_timeout):
+        self.bucket = bucket
+        self.semaphore = FairSemaphore(max_concurrency)
+        self.queue_timeout = queue_timeout
+        self._in_flight = {}  # prompt key -> Future shared by identical calls
+        self._lock = threading.Lock()
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _join(self, key):
+        """Returns (future, is_leader) for the call identified by ``key``."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    def _settle(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._in_flight[key]
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def _rejected(self, error):
+        with self._lock:
+            self.rejected += 1
+        return error
+
+    @contextmanager
+    def slot(self):
+        """Holds a concurrency slot and a rate-limit token for one upstream call."""
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        try:
+            self.semaphore.acquire(_current_user.get(), self.queue_timeout)
+        except LLMBusy as e:
+            raise self._rejected(e)
+        try:
+            while self.bucket is not None and (wait := self.bucket.take()):
+                if time.monotonic() + wait > deadline:
+                    raise self._rejected(LLMBusy("The AI request rate limit is reached.", retry_after=int(wait) + 1))
+                time.sleep(wait)
+            _record_queue_wait(time.monotonic() - start)
+            yield
+        finally:
+            self.semaphore.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        try:
+            await self.semaphore.aacquire(_current_user.get(), self.queue_timeout)
+        except LLMBusy as e:
+            raise self._rejected(e)
+        try:
+            while self.bucket is not None and (wait := await asyncio.to_thread(self.bucket.take)):
+                if time.monotonic() + wait > deadline:
+                    raise self._rejected(LLMBusy("The AI request rate limit is reached.", retry_after=int(wait) + 1))
+                await asyncio.sleep(wait)
+            _record_queue_wait(time.monotonic() - start)
+            yield
+        finally:
+            self.semaphore.release()
+
+    def spare_token(self):
+        """Takes a rate-limit token only if one is available right now (for retries and hedges)."""
+        return self.bucket is None or self.bucket.take() == 0
+
+    @staticmethod
+    def _shared_error(error):
+        """What followers see when the leading call fails: its error, unless it was cancelled."""
+        if isinstance(error, Exception):
+            return error
+        return LLMBusy("The shared AI request was interrupted; try again.")
+
+    def call(self, key, func):
+        """Runs ``func()`` once for all concurrent callers with the same ``key``."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            with self.slot():
+                result = func()
+        except BaseException as e:
+            self._settle(key, future, error=self._shared_error(e))
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def acall(self, key, coroutine_func):
+        """Async ``call``: awaits ``coroutine_func()`` once for all concurrent callers."""
+        future, leader = self._join(key)
+        if not leader:
+            # shield: a cancelled follower must not cancel the shared call
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            async with self.aslot():
+                result = await coroutine_func()
+        except BaseException as e:
+            self._settle(key, future, error=self._shared_error(e))
+            raise
+        self._settle(key, future, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            coalesced, rejected, in_flight = self.coalesced, self.rejected, len(self._in_flight)
+        return {
+            'queue_depth': self.semaphore.waiting,
+            'active': self.semaphore.active,
+            'in_flight_prompts': in_flight,
+            'coalesced': coalesced,
+            'rejected': rejected,
+            'queue_wait_ms': latency_window('llm_queue_wait').summary(),
+        }
+
+
+def build_gate():
+    """Creates the gate configured in ``settings.LLM_LIMITS``."""
+    config = settings.LLM_LIMITS
+    bucket = None
+    if config.get('RATE_LIMIT_BACKEND'):
+        try:
+            bucket_class = RATE_LIMIT_BACKENDS[config['RATE_LIMIT_BACKEND']]
+        except KeyError:
+            raise ValueError(f"Unknown LLM rate limit backend '{config['RATE_LIMIT_BACKEND']}'.")
+        bucket = bucket_class(config['REQUESTS_PER_MINUTE'] / 60, config['BURST'], **config.get('OPTIONS', {}))
+    return LLMGate(bucket, config['MAX_CONCURRENCY'], config['QUEUE_TIMEOUT'])
@@ -0,0 +1,281 @@
+"""
+Failure handling for upstream Gemini calls, applied inside an ``LLMGate`` slot.
+
+* Circuit breaker: once the share of failed calls in the last ``WINDOW``
+  calls reaches ``FAILURE_RATE``, calls fail at once with ``CircuitOpen``
+  (a 503 for the AI views) for ``OPEN_SECONDS``. Then a single probe call
+  decides whether to close it again.
+* Retries: transient errors (5xx, 429, timeouts, connection errors) are
+  retried up to ``RETRIES`` times after a jittered exponential backoff. The
+  client's own retry is disabled, so an outage no longer means waiting out
+  its retry deadline.
+* Deadlines: a caller may pass a deadline, after which no attempt or
+  retry starts (the attempt itself is bounded by its transport timeout).
+* Hedging: with ``HEDGE_AFTER`` set, a second identical request is sent when
+  the first has not answered after that many seconds, and the first answer
+  wins.
+
+Retries and hedges only go out when the rate limiter has a spare token.
+Configured by ``settings.LLM_RESILIENCE``.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from google.api_core import exceptions as api_exceptions
+
+from .llm_limits import LLMBusy
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+
+def _hedge_pool():
+    global _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='llm-hedge')
+        return _hedge_executor
+
+
+class CircuitOpen(LLMBusy):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+def is_transient(error):
+    """Errors worth retrying, which also count against the circuit breaker."""
+    return isinstance(error, (
+        api_exceptions.ServerError,      # 5xx
+        api_exceptions.TooManyRequests,  # 429 / RESOURCE_EXHAUSTED
+        api_exceptions.RetryError,
+        TimeoutError,                    # also asyncio.TimeoutError
+        OSError,                         # connection errors, including requests' timeouts
+    ))
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=10, open_seconds=30):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.times_opened = 0
+        self._outcomes = deque(maxlen=window)  # True for success
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpen unless a call may go out now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpen("The AI service is unavailable; try again shortly.", retry_after=int(remaining) + 1)
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpen("The AI service is recovering; try again shortly.", retry_after=1)
+                self._probing = True
+
+    def record(self, success):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if success:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def abandon(self):
+        """A call was cancelled before its outcome was known."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def stats(self):
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'failure_rate': round(self._outcomes.count(False) / calls, 3) if calls else 0.0,
+                'times_opened': self.times_opened,
+            }
+
+
+class ResilientCaller:
+    """Runs upstream calls through the breaker, with retries and optional hedging."""
+
+    def __init__(self, breaker, retries=2, backoff_base=0.5, backoff_max=8.0, hedge_after=None, spare_token=None):
+        self.breaker = breaker
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.spare_token = spare_token or (lambda: True)
+        self.counts = {'retries': 0, 'hedges': 0, 'hedges_won': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _backoff(self, attempt):
+        """Full jitter: uniform between 0 and the capped exponential delay."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _should_retry(self, error, attempt, delay, deadline):
+        if not is_transient(error) or attempt >= self.retries:
+            return False
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return False
+        if not self.spare_token():
+            return False
+        self._count('retries')
+        return True
+
+    @staticmethod
+    def _check_deadline(deadline):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError("The AI call ran out of time.")
+
+    def call(self, func, deadline=None):
+        """Calls ``func``; no attempt starts after ``deadline`` (time.monotonic()), if given."""
+        attempt = 0
+        while True:
+            self._check_deadline(deadline)
+            self.breaker.before_call()
+            try:
+                result = self._hedged(func) if self.hedge_after else func()
+            except Exception as e:
+                self.breaker.record(not is_transient(e))
+                delay = self._backoff(attempt)
+                if not self._should_retry(e, attempt, delay, deadline):
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.abandon()
+                raise
+            self.breaker.record(True)
+            return result
+
+    async def acall(self, coroutine_func, deadline=None):
+        attempt = 0
+        while True:
+            self._check_deadline(deadline)
+            self.breaker.before_call()
+            try:
+                result = await (self._ahedged(coroutine_func) if self.hedge_after else coroutine_func())
+            except Exception as e:
+                self.breaker.record(not is_transient(e))
+                delay = self._backoff(attempt)
+                if not self._should_retry(e, attempt, delay, deadline):
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.abandon()
+                raise
+            self.breaker.record(True)
+            return result
+
+    @asynccontextmanager
+    async def guard(self):
+        """Breaker check and outcome recording only, for streamed calls that cannot be retried."""
+        self.breaker.before_call()
+        try:
+            yield
+        except Exception as e:
+            self.breaker.record(not is_transient(e))
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        self.breaker.record(True)
+
+    def _hedged(self, func):
+        pool = _hedge_pool()
+        futures = [pool.submit(func)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done and self.spare_token():
+            self._count('hedges')
+            futures.append(pool.submit(func))
+
+        pending, error = set(futures), None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self._count('hedges_won')
+                    return future.result()  # a slower request finishes unobserved
+                error = future.exception()
+        raise error
+
+    async def _ahedged(self, coroutine_func):
+        tasks = [asyncio.ensure_future(coroutine_func())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done and self.spare_token():
+                self._count('hedges')
+                tasks.append(asyncio.ensure_future(coroutine_func()))
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self._count('hedges_won')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        return {'breaker': self.breaker.stats(), **counts}
+
+
+def build_resilience(gate):
+    """Creates the caller configured in ``settings.LLM_RESILIENCE``; spare tokens come from ``gate``."""
+    config = settings.LLM_RESILIENCE
+    breaker = config.get('BREAKER', {})
+    return ResilientCaller(
+        CircuitBreaker(
+            failure_rate=breaker.get('FAILURE_RATE', 0.5),
+            window=breaker.get('WINDOW', 20),
+            min_calls=breaker.get('MIN_CALLS', 10),
+            open_seconds=breaker.get('OPEN_SECONDS', 30),
+        ),
+        retries=config.get('RETRIES', 2),
+        backoff_base=config.get('BACKOFF_BASE', 0.5),
+        backoff_max=config.get('BACKOFF_MAX', 8.0),
+        hedge_after=config.get('HEDGE_AFTER'),
+        spare_token=gate.spare_token,
+    )
@@ -0,0 +1,224 @@
+"""
+Transports for ProjectAnalyzer's Gemini calls, chosen by ``settings.LLM_TRANSPORT``:
+
+* ``gemini``: the google-generativeai client; needs ``GEMINI_API_KEY``.
+* ``rest``: the Gemini REST API at ``OPTIONS['url']``, such as a local fake
+  server (``manage.py run_fake_gemini``) for benchmarks without a key.
+* ``stub``: canned replies in process after ``OPTIONS['latency']`` seconds.
+
+Each one is used like ``genai.GenerativeModel``: ``generate_content(prompt)``
+and ``await generate_content_async(prompt, stream=False)`` return an object
+with ``.text``, or an async iterator of such chunks when streaming.
+"""
+import asyncio
+import json
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from google.api_core import exceptions as api_exceptions
+
+from .fake_gemini import canned_reply
+
+GEMINI_REST_URL = 'https://generativelanguage.googleapis.com'
+
+
+class TextResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class UsageMetadata:
+    """Token counts, named as in the google-generativeai responses."""
+
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+# --- REST ---
+
+def _parse_response(status, payload):
+    """Returns the reply as a TextResponse, or raises the google.api_core error for an HTTP error status."""
+    try:
+        data = json.loads(payload or b'{}')
+    except ValueError:
+        data = {}
+    if status >= 400:
+        message = data.get('error', {}).get('message') or payload[:200].decode(errors='replace')
+        raise api_exceptions.from_http_status(status, message)
+    try:
+        text = ''.join(part.get('text', '') for part in data['candidates'][0]['content']['parts'])
+    except (KeyError, IndexError, TypeError):
+        raise ValueError("The Gemini response has no text (the prompt may have been blocked).")
+    usage = data.get('usageMetadata')
+    if usage:
+        usage = UsageMetadata(usage.get('promptTokenCount'), usage.get('candidatesTokenCount'))
+    return TextResponse(text, usage)
+
+
+class RestGenerativeModel:
+    """
+    Gemini over its REST API with the standard library only. Async calls use
+    asyncio streams, so an in-flight request holds no thread. Requests are
+    HTTP/1.0, so responses end with the connection (no chunked encoding).
+    """
+
+    def __init__(self, model, url=GEMINI_REST_URL, api_key=None):
+        parts = urlsplit(url)
+        self.model = model
+        self.host = parts.hostname
+        self.https = parts.scheme == 'https'
+        self.port = parts.port or (443 if self.https else 80)
+        self.api_key = api_key if api_key is not None else settings.GEMINI_API_KEY
+
+    def _request(self, prompt, stream):
+        method = 'streamGenerateContent?alt=sse' if stream else 'generateContent'
+        body = json.dumps({'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}).encode()
+        headers = {'Host': self.host, 'Content-Type': 'application/json', 'Content-Length': str(len(body))}
+        if self.api_key:
+            headers['x-goog-api-key'] = self.api_key
+        return f'/v1beta/models/{self.model}:{method}', headers, body
+
+    @staticmethod
+    def _timeout(request_options):
+        return (request_options or {}).get('timeout') or settings.LLM_CALL_TIMEOUT
+
+    def generate_content(self, prompt, request_options=None, **kwargs):
+        path, headers, body = self._request(prompt, stream=False)
+        connection_class = HTTPSConnection if self.https else HTTPConnection
+        connection = connection_class(self.host, self.port, timeout=self._timeout(request_options))
+        try:
+            connection.request('POST', path, body, headers)
+            response = connection.getresponse()
+            payload = response.read()
+        finally:
+            connection.close()
+        return _parse_response(response.status, payload)
+
+    async def _open(self, prompt, stream):
+        """Sends the request; returns (reader, writer, status) once the headers are read."""
+        reader, writer = await asyncio.open_connection(
+            self.host, self.port, ssl=ssl.create_default_context() if self.https else None,
+        )
+        path, headers, body = self._request(prompt, stream)
+        head = f'POST {path} HTTP/1.0\r\n' + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        writer.write(head.encode() + b'\r\n' + body)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        while (await reader.readline()).strip():
+            pass
+        return reader, writer, status
+
+    async def _post(self, prompt):
+        reader, writer, status = await self._open(prompt, stream=False)
+        try:
+            payload = await reader.read()
+        finally:
+            writer.close()
+        return _parse_response(status, payload)
+
+    async def generate_content_async(self, prompt, stream=False, request_options=None, **kwargs):
+        timeout = self._timeout(request_options)
+        if stream:
+            return self._stream(prompt, timeout)
+        return await asyncio.wait_for(self._post(prompt), timeout)
+
+    async def _stream(self, prompt, timeout):
+        reader, writer, status = await asyncio.wait_for(self._open(prompt, stream=True), timeout)
+        try:
+            if status >= 400:
+                _parse_response(status, await asyncio.wait_for(reader.read(), timeout))
+            # timeout applies between chunks
+            while line := await asyncio.wait_for(reader.readline(), timeout):
+                if line.startswith(b'data:'):
+                    yield _parse_response(200, line[5:])
+        finally:
+            writer.close()
+
+
+# --- In-process stub ---
+
+class StubGenerativeModel:
+    """
+    Sleeps for ``latency`` seconds and returns the canned reply of the fake
+    server. Streaming calls wait ``latency`` for the first chunk and
+    ``chunk_latency`` for every further word. ``calls`` counts upstream calls
+    and ``peak_in_flight`` is the largest number seen at the same time.
+    """
+
+    def __init__(self, latency=0.0, chunk_latency=0.0):
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _total_latency(self, text):
+        return self.latency + self.chunk_latency * (len(text.split()) - 1)
+
+    def generate_content(self, prompt, **kwargs):
+        text = canned_reply(prompt)
+        with self._call():
+            time.sleep(self._total_latency(text))
+        return TextResponse(text)
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        text = canned_reply(prompt)
+        if stream:
+            return self._stream(text)
+        with self._call():
+            await asyncio.sleep(self._total_latency(text))
+        return TextResponse(text)
+
+    async def _stream(self, text):
+        with self._call():
+            await asyncio.sleep(self.latency)
+            for i, word in enumerate(text.split(' ')):
+                if i:
+                    await asyncio.sleep(self.chunk_latency)
+                yield TextResponse(word if i == 0 else ' ' + word)
+
+
+# --- Factory ---
+
+def _gemini_model(model, api_key=None):
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key or settings.GEMINI_API_KEY)
+    return genai.GenerativeModel(model)
+
+
+TRANSPORTS = {
+    'gemini': _gemini_model,
+    'rest': RestGenerativeModel,
+    'stub': lambda model, **options: StubGenerativeModel(**options),
+}
+
+
+def build_llm_model():
+    """Creates the model client configured in ``settings.LLM_TRANSPORT``."""
+    config = settings.LLM_TRANSPORT
+    try:
+        transport = TRANSPORTS[config['BACKEND']]
+    except KeyError:
+        raise ValueError(f"Unknown LLM transport '{config['BACKEND']}'.")
+    return transport(config.get('MODEL', 'gemini-2.0-flash'), **config.get('OPTIONS', {}))
@@ -0,0 +1,193 @@
+"""
+Prometheus metrics, served in the text format at /metrics.
+
+* Per view (MetricsMiddleware): request latency, and the database query
+  count and time and the Gemini time spent inside the request, so a slow
+  endpoint can be put down to SQLite, Gemini or the rest (serialization and
+  Python). Streamed responses are timed to their first byte.
+* Per ProjectAnalyzer prompt: Gemini call latency and outcome (the error
+  rate), tokens used and response cache hits.
+* Streamed chatbot answers: time to the first token and to the end.
+* Waits: for an LLM concurrency slot and rate-limit token, and for a
+  background job to be claimed; background job run time.
+
+The gunicorn web workers write their samples to files in
+PROMETHEUS_MULTIPROC_DIR (set by gunicorn.conf.py) and /metrics adds them up;
+without it, /metrics shows the serving process only. Background job workers
+record the job and analysis Gemini metrics and serve them on their own port
+(``run_worker --metrics-port``); scrape every worker alongside /metrics.
+"""
+import hmac
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+SECONDS_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+LLM_SECONDS_BUCKETS = (.1, .25, .5, 1, 2, 4, 8, 15, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', "Request latency per view.", ['view', 'method', 'status'], buckets=SECONDS_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', "Database queries per request.", ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds', "Time spent in database queries per request.", ['view'], buckets=SECONDS_BUCKETS,
+)
+REQUEST_LLM_SECONDS = Histogram(
+    'http_request_llm_seconds', "Time spent in Gemini calls per request (summed over concurrent calls).",
+    ['view'], buckets=SECONDS_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    'llm_call_duration_seconds', "ProjectAnalyzer Gemini calls that missed the cache, including queueing and retries.",
+    ['prompt', 'outcome'], buckets=LLM_SECONDS_BUCKETS,
+)
+LLM_TOKENS = Counter('llm_tokens', "Gemini tokens per prompt, as reported by the API (estimated otherwise).", ['prompt', 'kind'])
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    'llm_queue_wait_seconds', "Wait for an LLM concurrency slot and rate-limit token.", buckets=SECONDS_BUCKETS,
+)
+CACHE_REQUESTS = Counter('cache_requests', "Lookups in the application caches.", ['cache', 'result'])
+JOB_QUEUE_WAIT_SECONDS = Histogram(
+    'job_queue_wait_seconds', "Time from a background job becoming runnable to a worker starting it.",
+    ['kind'], buckets=SECONDS_BUCKETS,
+)
+JOB_SECONDS = Histogram('job_duration_seconds', "Background job run time.", ['kind', 'outcome'], buckets=LLM_SECONDS_BUCKETS)
+CHAT_STREAM_SECONDS = Histogram(
+    'chat_stream_seconds', "Streamed chatbot answers: time to the first token and to the last.",
+    ['phase'], buckets=LLM_SECONDS_BUCKETS,
+)
+
+
+# --- Per-request accounting ---
+
+class RequestStats:
+    __slots__ = ('db_queries', 'db_seconds', 'llm_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.llm_seconds = 0.0
+
+
+# Follows the request into sync_to_async threads, where async views run their queries
+_request_stats = ContextVar('request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's stats."""
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+def record_llm_call(prompt, seconds, outcome):
+    LLM_CALL_SECONDS.labels(prompt, outcome).observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.llm_seconds += seconds
+
+
+def record_tokens(prompt, prompt_text, response_text, usage=None):
+    """Counts the tokens of one Gemini call, from its usage metadata or at about 4 characters per token."""
+    prompt_tokens = getattr(usage, 'prompt_token_count', None)
+    response_tokens = getattr(usage, 'candidates_token_count', None)
+    if prompt_tokens is None:
+        prompt_tokens = len(prompt_text) // 4
+    if response_tokens is None:
+        response_tokens = len(response_text or '') // 4
+    LLM_TOKENS.labels(prompt, 'prompt').inc(prompt_tokens)
+    LLM_TOKENS.labels(prompt, 'response').inc(response_tokens)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_chat_stream(phase, seconds):
+    """`phase` is 'first_token' or 'total'."""
+    CHAT_STREAM_SECONDS.labels(phase).observe(seconds)
+
+
+class MetricsMiddleware:
+    """Observes latency, database work and Gemini time per view."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_query_recorder(connection=connection)
+        stats, token, start = self._begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self._finish(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self._begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self._finish(request, response, stats, start)
+        return response
+
+    @staticmethod
+    def _begin():
+        stats = RequestStats()
+        return stats, _request_stats.set(stats), time.perf_counter()
+
+    @staticmethod
+    def _finish(request, response, stats, start):
+        match = request.resolver_match
+        view = (match.view_name or match.route) if match else 'unmatched'
+        REQUEST_SECONDS.labels(view, request.method, response.status_code).observe(time.perf_counter() - start)
+        REQUEST_DB_QUERIES.labels(view).observe(stats.db_queries)
+        REQUEST_DB_SECONDS.labels(view).observe(stats.db_seconds)
+        REQUEST_LLM_SECONDS.labels(view).observe(stats.llm_seconds)
+
+
+# --- Exposition ---
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; needs ``Authorization: Bearer <METRICS_AUTH_TOKEN>`` when that is set."""
+    if settings.METRICS_AUTH_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, settings.METRICS_AUTH_TOKEN):
+            return HttpResponse(status=401)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
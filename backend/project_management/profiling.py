@@ -0,0 +1,264 @@
+"""
+On-demand request profiling (REQUEST_PROFILING in settings).
+
+When enabled, a request is profiled if it sends a valid ``X-Profile`` header
+(a signed token from ``manage.py profile_token``) or is picked at random with
+SAMPLE_RATE. A profiled request gets:
+
+* stack samples of the threads running it, every INTERVAL_MS, written to
+  OUTPUT_DIR/<id>.folded in the folded format read by flamegraph.pl,
+  speedscope and inferno;
+* a report, OUTPUT_DIR/<id>.txt: every SQL query with its time, the Gemini
+  calls, and the top statements and functions (by samples at the top of the
+  stack);
+* an ``X-Profile-Id: <id>`` response header.
+
+Every request slower than SLOW_MS gets a line in OUTPUT_DIR/slow.log, with
+its top offenders when it was profiled. Sync views of an ASGI request are
+sampled in the thread they run in; async views are sampled in the event
+loop thread, whose samples can include other requests' coroutines.
+
+Disabled, the middleware removes itself (MiddlewareNotUsed) and no query
+wrapper is installed.
+"""
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+HEADER = 'X-Profile'
+_SIGNING_SALT = 'project_management.profiling'
+
+# Leaf frames of a thread with nothing to do: the sync executor waiting for work,
+# the event loop waiting for I/O. Left in the flamegraph, left out of the offenders.
+_IDLE_FRAMES = ('_worker (thread.py:', '.select (selectors.py:')
+
+_capture = ContextVar('profile_capture', default=None)
+
+
+def make_token():
+    """A value for the X-Profile header, valid for TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=_SIGNING_SALT).sign('profile')
+
+
+def _valid_token(value):
+    try:
+        signing.TimestampSigner(salt=_SIGNING_SALT).unsign(value, max_age=settings.REQUEST_PROFILING['TOKEN_MAX_AGE'])
+    except signing.BadSignature:
+        return False
+    return True
+
+
+# --- Capture ---
+
+class StackSampler(threading.Thread):
+    """Counts the folded stacks of the watched threads every ``interval`` seconds."""
+
+    def __init__(self, interval):
+        super().__init__(name='request-profiler', daemon=True)
+        self.interval = interval
+        self.thread_ids = set()
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in tuple(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[_fold(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Capture:
+    """What one profiled request did: stack samples, SQL queries and Gemini calls."""
+
+    def __init__(self, interval):
+        self.queries = []  # (sql, seconds)
+        self.llm_calls = []  # (prompt, seconds, outcome)
+        self.sampler = StackSampler(interval)
+        self.sampler.start()
+
+    def watch(self, thread_id):
+        self.sampler.thread_ids.add(thread_id)
+
+    def stop(self):
+        self.sampler.stop()
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper logging each query of a profiled request."""
+    capture = _capture.get()
+    if capture is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        capture.queries.append((sql, time.perf_counter() - start))
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_llm_call(prompt, seconds, outcome):
+    capture = _capture.get()
+    if capture is not None:
+        capture.llm_calls.append((prompt, seconds, outcome))
+
+
+# --- Middleware ---
+
+class ProfilingMiddleware:
+    """Profiles requests picked by a signed header or sampling; logs slow requests."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = settings.REQUEST_PROFILING
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.output_dir = Path(self.config['OUTPUT_DIR'])
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        connection_created.connect(install_query_recorder)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        capture = self._capture_for(request)
+        if capture is None:
+            response = self.get_response(request)
+        else:
+            install_query_recorder(connection=connection)
+            capture.watch(threading.get_ident())
+            token = _capture.set(capture)
+            try:
+                response = self.get_response(request)
+            finally:
+                _capture.reset(token)
+                capture.stop()
+        self._finish(request, response, start, capture)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        capture = self._capture_for(request)
+        if capture is None:
+            response = await self.get_response(request)
+        else:
+            capture.watch(threading.get_ident())
+            # the thread this request's sync views and queries run in
+            capture.watch(await sync_to_async(_enter_sync_thread)())
+            token = _capture.set(capture)
+            try:
+                response = await self.get_response(request)
+            finally:
+                _capture.reset(token)
+                capture.stop()
+        self._finish(request, response, start, capture)
+        return response
+
+    def _capture_for(self, request):
+        header = request.headers.get(HEADER)
+        if (header and _valid_token(header)) or random.random() < self.config['SAMPLE_RATE']:
+            return Capture(self.config['INTERVAL_MS'] / 1000)
+        return None
+
+    def _finish(self, request, response, start, capture):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        match = request.resolver_match
+        view = (match.view_name or match.route) if match else 'unmatched'
+        summary = f"{elapsed_ms:.0f} ms {request.method} {request.path} ({view}) -> {response.status_code}"
+        profile_id = None
+        if capture is not None:
+            profile_id = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{view.replace('/', '_')}"
+            response[f'{HEADER}-Id'] = profile_id
+            self._write_profile(profile_id, summary, capture)
+        if elapsed_ms >= self.config['SLOW_MS']:
+            lines = [f"{datetime.now():%Y-%m-%d %H:%M:%S} {summary}"]
+            if capture is not None:
+                lines += [f"    {line}" for line in _top_offenders(capture, 5)]
+                lines.append(f"    profile: {profile_id}")
+            with open(self.output_dir / 'slow.log', 'a') as log:
+                log.write('\n'.join(lines) + '\n')
+
+    def _write_profile(self, profile_id, summary, capture):
+        stacks = capture.sampler.stacks
+        (self.output_dir / f'{profile_id}.folded').write_text(
+            ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        )
+        sql_ms = sum(seconds for _, seconds in capture.queries) * 1000
+        lines = [
+            summary,
+            f"{len(capture.queries)} SQL queries ({sql_ms:.1f} ms), {len(capture.llm_calls)} Gemini calls, "
+            f"{sum(stacks.values())} samples every {self.config['INTERVAL_MS']} ms",
+            '',
+            'Top offenders:',
+            *(f"  {line}" for line in _top_offenders(capture, self.config['TOP'])),
+            '',
+            'Gemini calls:',
+            *(f"  {seconds * 1000:8.1f} ms  {prompt} ({outcome})" for prompt, seconds, outcome in capture.llm_calls),
+            '',
+            'SQL queries:',
+            *(f"  {seconds * 1000:8.2f} ms  {' '.join(sql.split())}" for sql, seconds in capture.queries),
+        ]
+        (self.output_dir / f'{profile_id}.txt').write_text('\n'.join(lines) + '\n')
+
+
+def _enter_sync_thread():
+    install_query_recorder(connection=connection)
+    return threading.get_ident()
+
+
+def _top_offenders(capture, limit):
+    """The slowest Gemini calls, the statements taking the most time, and the functions sampled most."""
+    lines = [
+        f"gemini {seconds * 1000:8.1f} ms  {prompt} ({outcome})"
+        for prompt, seconds, outcome in sorted(capture.llm_calls, key=lambda call: -call[1])[:limit]
+    ]
+    statements = defaultdict(lambda: [0, 0.0])
+    for sql, seconds in capture.queries:
+        statement = statements[' '.join(sql.split())]
+        statement[0] += 1
+        statement[1] += seconds
+    for sql, (count, seconds) in sorted(statements.items(), key=lambda item: -item[1][1])[:limit]:
+        lines.append(f"sql    {seconds * 1000:8.1f} ms  x{count}  {sql[:200]}")
+    leaves = Counter()
+    for stack, count in capture.sampler.stacks.items():
+        leaf = stack.rsplit(';', 1)[-1]
+        if not any(marker in leaf for marker in _IDLE_FRAMES):
+            leaves[leaf] += count
+    interval_ms = capture.sampler.interval * 1000
+    for function, count in leaves.most_common(limit):
+        lines.append(f"python {count * interval_ms:8.1f} ms  {function}")
+    return lines
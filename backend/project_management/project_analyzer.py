@@ -1,30 +1,250 @@
-import google.generativeai as genai
+import asyncio
+import logging
 # from sentence_transformers import SentenceTransformer, util
 from django.conf import settings
 # import whisper
 import re
 import numpy as np
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 # import torch
+from .embeddings import get_embedder
+from .llm_cache import build_cache, make_key
+from .llm_limits import LLMBusy, build_gate
+from .llm_resilience import build_resilience
+from .llm_transport import build_llm_model
+from . import metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+# Bump a template's version whenever its prompt text changes so stale
+# cached responses are no longer served.
+PROMPT_VERSIONS = {
+    'similarity': 1,
+    'analysis': 1,
+    'chat': 1,
+    'chat_summary': 1,
+    'idea': 1,
+    'viva_questions': 2,
+    'viva_evaluation': 1,
+    'viva_batch_evaluation': 1,
+    'revised_suggestions': 1,
+}
 
 # Create a global instance of the analyzer
 analyzer = None
 
+_fanout_executor = None
+_fanout_lock = threading.Lock()
+
+
+def _fanout_pool():
+    """Shared thread pool for concurrent LLM sub-tasks."""
+    global _fanout_executor
+    if _fanout_executor is None:
+        with _fanout_lock:
+            if _fanout_executor is None:
+                _fanout_executor = ThreadPoolExecutor(
+                    max_workers=settings.ANALYSIS_FANOUT_WORKERS, thread_name_prefix='llm-fanout'
+                )
+    return _fanout_executor
+
+
+def _replace_suggestions(report, suggestions):
+    """Swaps the SUGGESTIONS section of an analysis report for `suggestions`."""
+    match = re.search(r"^.*SUGGESTIONS.*$", report, flags=re.IGNORECASE | re.MULTILINE)
+    head = report[:match.start()].rstrip() if match else report.rstrip()
+    return f"{head}\n\nSUGGESTIONS:\n{suggestions}"
+
 class ProjectAnalyzer:
     def __init__(self):
-        # Configure Gemini API (Main Brain)
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.llm_model = genai.GenerativeModel("gemini-2.0-flash")
+        # Gemini client (Main Brain), or a local stand-in (see settings.LLM_TRANSPORT)
+        self.llm_model = build_llm_model()
+
+        # Lightweight CPU embedding backend (see settings.EMBEDDING_BACKEND)
+        self.embedding_model = get_embedder()
+
+        # Response cache for identical prompts (see settings.LLM_CACHE)
+        self.cache = build_cache()
+
+        # Rate limit, concurrency cap and coalescing of upstream calls (see settings.LLM_LIMITS)
+        self.gate = build_gate()
+
+        # Circuit breaker, jittered retries and hedging (see settings.LLM_RESILIENCE)
+        self.resilience = build_resilience(self.gate)
+
+    def _generate(self, template, prompt, timeout=None, fresh=False, deadline=None):
+        """
+        Single entry point for Gemini calls. Returns the response text, served
+        from the cache when the same template version and prompt were seen.
+        Errors propagate to the caller (and are never cached). `timeout`
+        (seconds) is passed to the client so a slow call is abandoned upstream.
+        `fresh` skips the cache lookup; the new response replaces the cached one.
+        `deadline` (time.monotonic()) caps the timeout of every attempt, and no
+        retry starts after it.
+        """
+        key = make_key(template, PROMPT_VERSIONS[template], prompt)
+        if self.cache is not None and not fresh:
+            cached = self.cache.get(template, key)
+            metrics.record_cache(f'llm:{template}', cached is not None)
+            if cached is not None:
+                return cached
+
+        with self._timed(template):
+            text = self.gate.call(key, lambda: self.resilience.call(
+                lambda: self._complete(template, prompt, timeout, deadline), deadline,
+            ))
+
+        if self.cache is not None:
+            self.cache.set(key, text)
+        return text
+
+    def _complete(self, template, prompt, timeout=None, deadline=None):
+        timeout = timeout or settings.LLM_CALL_TIMEOUT
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise TimeoutError(f"{template} call passed its deadline")
+        # retry=None: retries are ours (llm_resilience), not the client's long default loop
+        request_options = {'timeout': timeout, 'retry': None}
+        response = self.llm_model.generate_content(prompt, request_options=request_options)
+        metrics.record_tokens(template, prompt, response.text, getattr(response, 'usage_metadata', None))
+        return response.text
+
+    @contextmanager
+    def _timed(self, template):
+        """Records the latency and outcome (ok, busy or error) of a Gemini call in the metrics and profile."""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        except LLMBusy:
+            outcome = 'busy'
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            metrics.record_llm_call(template, seconds, outcome)
+            profiling.record_llm_call(template, seconds, outcome)
+
+    async def _agenerate(self, template, prompt, timeout=None, fresh=False):
+        """
+        _generate for async views: awaits the async Gemini client, so an
+        in-flight call holds no thread. Cache lookups run in a thread since the
+        sqlite backend blocks.
+        """
+        key = make_key(template, PROMPT_VERSIONS[template], prompt)
+        if self.cache is not None and not fresh:
+            cached = await asyncio.to_thread(self.cache.get, template, key)
+            metrics.record_cache(f'llm:{template}', cached is not None)
+            if cached is not None:
+                return cached
+
+        with self._timed(template):
+            text = await self.gate.acall(key, lambda: self.resilience.acall(lambda: self._acomplete(template, prompt, timeout)))
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, text)
+        return text
+
+    async def _acomplete(self, template, prompt, timeout=None):
+        request_options = {'timeout': timeout or settings.LLM_CALL_TIMEOUT, 'retry': None}
+        response = await self.llm_model.generate_content_async(prompt, request_options=request_options)
+        metrics.record_tokens(template, prompt, response.text, getattr(response, 'usage_metadata', None))
+        return response.text
 
-        # Local embedding model (disabled on Render Free Tier)
-        # self.embedding_model = SentenceTransformer('all-mpnet-base-v2')
-        
     def get_embedding(self, text):
-        """Placeholder for embedding (disabled to save memory)."""
-        # return self.embedding_model.encode(text, convert_to_tensor=True).tolist()
-        return []  # Mock empty embedding for compatibility
+        """Returns the embedding of `text` as a list of floats ([] for empty text)."""
+        if not text or not text.strip():
+            return []
+        return self.embedding_model.encode(text)[0].tolist()
 
     def check_plagiarism_and_suggest_features(self, title, abstract, existing_submissions):
-        """Uses Gemini API for similarity and originality check."""
+        """
+        Uses Gemini API for similarity and originality check.
+        `existing_submissions` should already be narrowed down to the nearest
+        candidates (see authentication.similarity) so the prompt stays small.
+        """
+        if settings.ANALYSIS_FANOUT:
+            return self._check_plagiarism_concurrently(title, abstract, existing_submissions)
+
+        try:
+            highest_similarity, most_similar_project = self._find_most_similar(abstract, existing_submissions)
+        except Exception as e:
+            return self._similarity_failure(e)
+
+        # Step 2 — Suggest new ideas
+        originality_status, suggestion_prompt = self._originality_verdict(title, highest_similarity)
+        analysis_prompt = self._analysis_prompt(
+            title, abstract, f"{originality_status} (Score: {highest_similarity:.2f})", suggestion_prompt
+        )
+
+        try:
+            final_text = self._generate('analysis', analysis_prompt).strip()
+            return self._analysis_result(originality_status, highest_similarity, final_text, most_similar_project)
+        except Exception as e:
+            return self._analysis_failure(highest_similarity, most_similar_project, e)
+
+    def _check_plagiarism_concurrently(self, title, abstract, existing_submissions):
+        """
+        Fan-out variant: the similarity check and the scoring prompt run at the
+        same time, since scores do not depend on the similarity verdict. Only
+        the suggestions are regenerated when the idea turns out to be blocked.
+        Both calls get the same deadline, which bounds their retries and the
+        transport timeout of each attempt, so they stop when it passes.
+        """
+        timeout = settings.LLM_CALL_TIMEOUT
+        deadline = time.monotonic() + timeout
+        pool = _fanout_pool()
+
+        similarity_future = pool.submit(self._find_most_similar, abstract, existing_submissions, timeout, deadline)
+        analysis_prompt = self._analysis_prompt(
+            title, abstract, "Not yet assessed",
+            "Suggest 5 advanced or innovative features to enhance it."
+        )
+        analysis_future = pool.submit(self._generate, 'analysis', analysis_prompt, timeout, deadline=deadline)
+
+        try:
+            highest_similarity, most_similar_project = similarity_future.result(timeout=max(0, deadline - time.monotonic()))
+        except FuturesTimeoutError:
+            return self._similarity_failure(f"timed out after {timeout}s")
+        except Exception as e:
+            return self._similarity_failure(e)
+
+        originality_status, suggestion_prompt = self._originality_verdict(title, highest_similarity)
+
+        try:
+            final_text = analysis_future.result(timeout=max(0, deadline - time.monotonic())).strip()
+        except FuturesTimeoutError:
+            return self._analysis_failure(highest_similarity, most_similar_project, f"timed out after {timeout}s")
+        except Exception as e:
+            return self._analysis_failure(highest_similarity, most_similar_project, e)
+
+        if originality_status == "BLOCKED_HIGH_SIMILARITY":
+            similar_title = f" '{most_similar_project['title']}'" if most_similar_project else ""
+            revision_prompt = f"""
+            You are a college professor reviewing a project idea.
+            Title: {title}
+            Abstract: {abstract}
+            It closely matches an existing project{similar_title}.
+            {suggestion_prompt}
+            Return only the numbered list of features.
+            """
+            try:
+                suggestions = self._generate('revised_suggestions', revision_prompt, timeout).strip()
+                final_text = _replace_suggestions(final_text, suggestions)
+            except Exception as e:
+                logger.warning("Revising the suggestions failed: %s", e)
+
+        return self._analysis_result(originality_status, highest_similarity, final_text, most_similar_project)
+
+    def _find_most_similar(self, abstract, existing_submissions, timeout=None, deadline=None):
+        """
+        Asks Gemini which candidate is closest; returns (score, project dict or None).
+        Errors propagate: a failed check must not read as a score of 0.
+        """
         highest_similarity = 0.0
         most_similar_project = None
 
@@ -47,46 +267,46 @@ class ProjectAnalyzer:
                SCORE: [highest_score] | INDEX: [number]
             """
 
-            try:
-                response = self.llm_model.generate_content(similarity_prompt)
-                score_match = re.search(r"SCORE:\s*(\d+\.\d+)", response.text)
-                index_match = re.search(r"INDEX:\s*(\d+)", response.text)
-
-                if score_match:
-                    highest_similarity = float(score_match.group(1))
-
-                if index_match:
-                    similar_project_index = int(index_match.group(1))
-                    if 0 <= similar_project_index < len(existing_submissions):
-                        similar_sub = existing_submissions[similar_project_index]
-                        most_similar_project = {
-                            'title': similar_sub['title'],
-                            'student': similar_sub['student__username'],
-                            'abstract_text': similar_sub['abstract_text']
-                        }
-
-            except Exception as e:
-                print(f"Error during AI similarity check: {e}")
-
-        # Step 2 — Suggest new ideas
+            response_text = self._generate('similarity', similarity_prompt, timeout, deadline=deadline)
+            score_match = re.search(r"SCORE:\s*(\d+(?:\.\d+)?)", response_text)
+            index_match = re.search(r"INDEX:\s*(\d+)", response_text)
+
+            if not score_match:
+                raise ValueError(f"unreadable similarity response: {response_text[:200]!r}")
+            highest_similarity = float(score_match.group(1))
+
+            if index_match:
+                similar_project_index = int(index_match.group(1))
+                if 0 <= similar_project_index < len(existing_submissions):
+                    similar_sub = existing_submissions[similar_project_index]
+                    most_similar_project = {
+                        'id': similar_sub.get('id'),
+                        'title': similar_sub['title'],
+                        'student': similar_sub['student__username'],
+                        'abstract_text': similar_sub['abstract_text']
+                    }
+
+        return highest_similarity, most_similar_project
+
+    @staticmethod
+    def _originality_verdict(title, highest_similarity):
         if highest_similarity > 0.60:
-            originality_status = "BLOCKED_HIGH_SIMILARITY"
-            suggestion_prompt = (
+            return "BLOCKED_HIGH_SIMILARITY", (
                 f"The project '{title}' is too similar (Score: {highest_similarity:.2f}). "
                 "Suggest 5–6 new unique features to make it original."
             )
-        else:
-            originality_status = "ORIGINAL_PASSED"
-            suggestion_prompt = (
-                f"The project '{title}' is original. "
-                "Suggest 5 advanced or innovative features to enhance it."
-            )
-
-        analysis_prompt = f"""
+        return "ORIGINAL_PASSED", (
+            f"The project '{title}' is original. "
+            "Suggest 5 advanced or innovative features to enhance it."
+        )
+
+    @staticmethod
+    def _analysis_prompt(title, abstract, originality, suggestion_prompt):
+        return f"""
         You are a college professor analyzing a project idea.
         Title: {title}
         Abstract: {abstract}
-        Originality: {originality_status} (Score: {highest_similarity:.2f})
+        Originality: {originality}
 
         Provide:
         1. SCORES (Rate 1–10):
@@ -97,47 +317,125 @@ class ProjectAnalyzer:
         2. SUGGESTIONS: {suggestion_prompt}
         """
 
-        try:
-            final_response = self.llm_model.generate_content(analysis_prompt)
-            final_text = final_response.text.strip()
-
-            relevance_match = re.search(r"[Rr]elevance.*:\s*(\d+(\.\d+)?)", final_text)
-            feasibility_match = re.search(r"[Ff]easibility.*:\s*(\d+(\.\d+)?)", final_text)
-            innovation_match = re.search(r"[Ii]nnovation.*:\s*(\d+(\.\d+)?)", final_text)
-
-            return {
-                "originality_status": originality_status,
-                "similarity_score": highest_similarity,
-                "relevance": float(relevance_match.group(1)) if relevance_match else 0.0,
-                "feasibility": float(feasibility_match.group(1)) if feasibility_match else 0.0,
-                "innovation": float(innovation_match.group(1)) if innovation_match else 0.0,
-                "full_report": final_text,
-                "most_similar_project": most_similar_project
-            }
-        except Exception as e:
-            return {
-                "originality_status": "API_FAIL",
-                "similarity_score": highest_similarity,
-                "relevance": 0.0, "feasibility": 0.0, "innovation": 0.0,
-                "full_report": f"AI analysis failed. Error: {e}",
-                "most_similar_project": most_similar_project
-            }
-
-    # --- Disabled Heavy Feature ---
-    # def transcribe_audio(self, audio_file_path):
-    #     """Whisper model disabled for Render Free Tier."""
-    #     return "Audio transcription temporarily disabled on this deployment."
+    @staticmethod
+    def _analysis_result(originality_status, highest_similarity, final_text, most_similar_project):
+        relevance_match = re.search(r"[Rr]elevance.*:\s*(\d+(\.\d+)?)", final_text)
+        feasibility_match = re.search(r"[Ff]easibility.*:\s*(\d+(\.\d+)?)", final_text)
+        innovation_match = re.search(r"[Ii]nnovation.*:\s*(\d+(\.\d+)?)", final_text)
+
+        return {
+            "originality_status": originality_status,
+            "similarity_score": highest_similarity,
+            "relevance": float(relevance_match.group(1)) if relevance_match else 0.0,
+            "feasibility": float(feasibility_match.group(1)) if feasibility_match else 0.0,
+            "innovation": float(innovation_match.group(1)) if innovation_match else 0.0,
+            "full_report": final_text,
+            "most_similar_project": most_similar_project
+        }
+
+    @staticmethod
+    def _analysis_failure(highest_similarity, most_similar_project, error, originality_status="API_FAIL"):
+        return {
+            "originality_status": originality_status,
+            "similarity_score": highest_similarity,
+            "relevance": 0.0, "feasibility": 0.0, "innovation": 0.0,
+            "full_report": f"AI analysis failed. Error: {error}",
+            "most_similar_project": most_similar_project
+        }
+
+    @classmethod
+    def _similarity_failure(cls, error):
+        """The similarity check failed or timed out: never reported as original."""
+        logger.warning("AI similarity check failed: %s", error)
+        return cls._analysis_failure(0.0, None, f"similarity check failed: {error}", "SIMILARITY_FAIL")
+
+    @staticmethod
+    def _chat_prompt(prompt, conversation_history):
+        if not conversation_history:
+            return prompt
+        return f"""
+        You are an assistant helping a student with their final-year project.
+        Use the context below when it is relevant to the question.
+
+        {conversation_history}
+
+        Student: {prompt}
+        Assistant:
+        """
 
     def get_chat_response(self, prompt, conversation_history=""):
         """Chat with Gemini API."""
         try:
-            chat_session = self.llm_model.start_chat(history=[])
-            response = chat_session.send_message(prompt)
-            return response.text.strip()
+            return self._generate('chat', self._chat_prompt(prompt, conversation_history)).strip()
+        except LLMBusy:
+            raise
         except Exception as e:
-            print(f"Error during Gemini API call: {e}")
+            logger.warning("Gemini API call failed: %s", e)
             return "Sorry, I am unable to answer that right now."
 
+    async def aget_chat_response(self, prompt, conversation_history=""):
+        """Async get_chat_response."""
+        try:
+            return (await self._agenerate('chat', self._chat_prompt(prompt, conversation_history))).strip()
+        except LLMBusy:
+            raise
+        except Exception as e:
+            logger.warning("Gemini API call failed: %s", e)
+            return "Sorry, I am unable to answer that right now."
+
+    async def stream_chat_response(self, prompt, conversation_history=""):
+        """
+        Async generator of answer chunks, relayed as Gemini produces them.
+        A cached answer is replayed as one chunk; on errors the stream ends
+        with the same apology as get_chat_response.
+        """
+        prompt = self._chat_prompt(prompt, conversation_history)
+        key = None
+        if self.cache is not None:
+            key = make_key('chat', PROMPT_VERSIONS['chat'], prompt)
+            cached = await asyncio.to_thread(self.cache.get, 'chat', key)
+            metrics.record_cache('llm:chat', cached is not None)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        usage = None  # the last chunk carries the usage metadata
+        try:
+            # Streams are not coalesced or retried, but hold a slot and a rate-limit token
+            # and go through the circuit breaker
+            with self._timed('chat_stream'):
+                async with self.gate.aslot(), self.resilience.guard():
+                    response = await self.llm_model.generate_content_async(
+                        prompt, stream=True, request_options={'timeout': settings.LLM_CALL_TIMEOUT, 'retry': None},
+                    )
+                    async for chunk in response:
+                        parts.append(chunk.text)
+                        usage = getattr(chunk, 'usage_metadata', None) or usage
+                        yield chunk.text
+        except Exception as e:
+            logger.warning("Gemini API call failed: %s", e)
+            yield "Sorry, I am unable to answer that right now."
+            return
+
+        metrics.record_tokens('chat_stream', prompt, ''.join(parts), usage)
+        if key is not None:
+            await asyncio.to_thread(self.cache.set, key, ''.join(parts))
+
+    def summarize_conversation(self, previous_summary, transcript):
+        """Merges older chat messages into the running conversation summary."""
+        prompt = f"""
+        Update the summary of a conversation between a student and a project assistant.
+        Keep the facts, decisions and open questions; drop greetings and repetition.
+        Answer with the new summary only, in at most 150 words.
+
+        Current summary: {previous_summary or "(none)"}
+
+        New messages:
+        {transcript}
+        """
+        return self._generate('chat_summary', prompt).strip()
+
     def analyze_idea(self, title, abstract):
         """Analyze project idea."""
         prompt = f"""
@@ -149,66 +447,204 @@ class ProjectAnalyzer:
         with brief reasoning.
         """
         try:
-            response = self.llm_model.generate_content(prompt)
-            return response.text.strip()
+            return self._generate('idea', prompt).strip()
         except Exception as e:
-            print(f"Error during Gemini API call: {e}")
+            logger.warning("Gemini API call failed: %s", e)
             return "Failed to analyze project."
 
-    def generate_viva_questions(self, title, abstract, progress_percentage):
-        """Generate viva questions using Gemini."""
-        if progress_percentage < 30:
-            stage = "Initial Design & Concepts"
-            focus = "fundamental concepts and design choices"
-        elif progress_percentage < 80:
-            stage = "Mid-Review & Implementation"
-            focus = "implementation status and encountered challenges"
-        else:
-            stage = "Final Review"
-            focus = "technical details, optimization, and deployment"
-
-        prompt = f"""
+    # Viva stages by project progress: (band, lowest progress, stage, focus).
+    # The questions depend only on the band, so they can be generated ahead of time.
+    VIVA_BANDS = (
+        ('design', 0, "Initial Design & Concepts", "fundamental concepts and design choices"),
+        ('implementation', 30, "Mid-Review & Implementation", "implementation status and encountered challenges"),
+        ('final', 80, "Final Review", "technical details, optimization, and deployment"),
+    )
+    VIVA_QUESTIONS_FAILED = "Failed to generate viva questions."
+
+    @classmethod
+    def viva_band(cls, progress_percentage):
+        return [band for band, start, _, _ in cls.VIVA_BANDS if progress_percentage >= start][-1]
+
+    @classmethod
+    def _viva_questions_prompt(cls, title, abstract, progress_percentage):
+        band = cls.viva_band(progress_percentage)
+        _, _, stage, focus = next(entry for entry in cls.VIVA_BANDS if entry[0] == band)
+        return f"""
         You are a strict examiner for {stage}.
         Project Title: {title}
         Abstract: {abstract}
-        Progress: {progress_percentage}%
 
         Generate 5 numbered viva questions focusing on {focus}.
         """
 
+    @staticmethod
+    def _parse_viva_questions(response_text):
+        questions = re.findall(r'\d+\.\s*.*', response_text)
+        return [q.strip() for q in questions if q.strip()]
+
+    def generate_viva_questions(self, title, abstract, progress_percentage, fresh=False):
+        """Generate viva questions using Gemini; `fresh` asks for new ones rather than the cached reply."""
+        prompt = self._viva_questions_prompt(title, abstract, progress_percentage)
         try:
-            response = self.llm_model.generate_content(prompt)
-            questions = re.findall(r'\d+\.\s*.*', response.text)
-            return [q.strip() for q in questions if q.strip()]
+            return self._parse_viva_questions(self._generate('viva_questions', prompt, fresh=fresh))
+        except LLMBusy:
+            raise
         except Exception as e:
-            print(f"Error during Gemini API call: {e}")
-            return ["Failed to generate viva questions."]
+            logger.warning("Gemini API call failed: %s", e)
+            return [self.VIVA_QUESTIONS_FAILED]
 
-    def evaluate_viva_answer(self, question, answer, abstract):
-        """Evaluate viva answer with Gemini."""
-        if answer.strip() == question.strip():
-            return {"score": "0/10", "feedback": "Your answer is just the question repeated."}
+    async def agenerate_viva_questions(self, title, abstract, progress_percentage, fresh=False):
+        """Async generate_viva_questions."""
+        prompt = self._viva_questions_prompt(title, abstract, progress_percentage)
+        try:
+            return self._parse_viva_questions(await self._agenerate('viva_questions', prompt, fresh=fresh))
+        except LLMBusy:
+            raise
+        except Exception as e:
+            logger.warning("Gemini API call failed: %s", e)
+            return [self.VIVA_QUESTIONS_FAILED]
 
-        prompt = f"""
+    # --- Viva evaluation ---
+
+    REPEATED_QUESTION = {"score": "0/10", "feedback": "Your answer is just the question repeated."}
+
+    @staticmethod
+    def _viva_evaluation_prompt(question, answer, abstract):
+        return f"""
         Project Abstract: {abstract}
         Question: {question}
         Answer: {answer}
 
         Evaluate the answer (Score out of 10) and provide feedback.
         """
+
+    @staticmethod
+    def _parse_viva_evaluation(evaluation_text):
+        score_match = re.search(r"Score:\s*(\d+(\.\d+)?)\s*/10", evaluation_text)
+        feedback_match = re.search(r"Feedback:([\s\S]*)", evaluation_text)
+
+        score = score_match.group(1).strip() if score_match else 'N/A'
+        feedback = feedback_match.group(1).strip().strip('**') if feedback_match else 'No feedback provided.'
+        return {"score": score, "feedback": feedback}
+
+    def evaluate_viva_answer(self, question, answer, abstract):
+        """Evaluate viva answer with Gemini."""
+        if answer.strip() == question.strip():
+            return dict(self.REPEATED_QUESTION)
+
+        prompt = self._viva_evaluation_prompt(question, answer, abstract)
         try:
-            response = self.llm_model.generate_content(prompt)
-            evaluation_text = response.text.strip()
-            score_match = re.search(r"Score:\s*(\d+(\.\d+)?)\s*/10", evaluation_text)
-            feedback_match = re.search(r"Feedback:([\s\S]*)", evaluation_text)
-
-            score = score_match.group(1).strip() if score_match else 'N/A'
-            feedback = feedback_match.group(1).strip().strip('**') if feedback_match else 'No feedback provided.'
-            return {"score": score, "feedback": feedback}
+            return self._parse_viva_evaluation(self._generate('viva_evaluation', prompt).strip())
+        except LLMBusy:
+            raise
         except Exception as e:
-            print(f"Error during Gemini API call: {e}")
+            logger.warning("Gemini API call failed: %s", e)
             return {"score": "N/A", "feedback": "Failed to evaluate answer."}
 
+    async def aevaluate_viva_answer(self, question, answer, abstract):
+        """Async evaluate_viva_answer."""
+        if answer.strip() == question.strip():
+            return dict(self.REPEATED_QUESTION)
+
+        prompt = self._viva_evaluation_prompt(question, answer, abstract)
+        try:
+            return self._parse_viva_evaluation((await self._agenerate('viva_evaluation', prompt)).strip())
+        except LLMBusy:
+            raise
+        except Exception as e:
+            logger.warning("Gemini API call failed: %s", e)
+            return {"score": "N/A", "feedback": "Failed to evaluate answer."}
+
+    def _split_viva_batch(self, qa_pairs):
+        """Pre-grades repeated questions; returns (results, pending indexes)."""
+        results = [None] * len(qa_pairs)
+        pending = []
+        for i, (question, answer) in enumerate(qa_pairs):
+            if answer.strip() == question.strip():
+                results[i] = dict(self.REPEATED_QUESTION)
+            else:
+                pending.append(i)
+        return results, pending
+
+    @staticmethod
+    def _viva_batch_prompt(qa_pairs, pending, abstract):
+        numbered = "\n".join(
+            f"Q{n}: {qa_pairs[i][0]}\nA{n}: {qa_pairs[i][1]}" for n, i in enumerate(pending, start=1)
+        )
+        return f"""
+        Project Abstract: {abstract}
+
+        Evaluate each numbered answer below (Score out of 10) and provide feedback.
+        {numbered}
+
+        Reply with one block per question, exactly in this format:
+        ### Q<number>
+        Score: <score>/10
+        Feedback: <feedback>
+        """
+
+    @staticmethod
+    def _parse_viva_batch(batch_text, pending, results):
+        blocks = re.split(r"^\s*#*\s*Q(\d+)\s*$", batch_text, flags=re.MULTILINE)
+        for number, block in zip(blocks[1::2], blocks[2::2]):
+            n = int(number)
+            score_match = re.search(r"Score:\s*(\d+(\.\d+)?)\s*/10", block)
+            feedback_match = re.search(r"Feedback:([\s\S]*)", block)
+            if 1 <= n <= len(pending) and score_match:
+                feedback = feedback_match.group(1).strip().strip('**') if feedback_match else 'No feedback provided.'
+                results[pending[n - 1]] = {"score": score_match.group(1).strip(), "feedback": feedback}
+
+    def evaluate_viva_answers(self, qa_pairs, abstract):
+        """
+        Evaluate several viva answers with one Gemini call. `qa_pairs` is a list
+        of (question, answer) tuples; returns one {"score", "feedback"} dict per
+        pair, in order. Answers the batch response does not cover are graded
+        individually with a bounded number of concurrent calls.
+        """
+        results, pending = self._split_viva_batch(qa_pairs)
+        if pending:
+            try:
+                batch_text = self._generate('viva_batch_evaluation', self._viva_batch_prompt(qa_pairs, pending, abstract))
+                self._parse_viva_batch(batch_text, pending, results)
+            except LLMBusy:
+                raise
+            except Exception as e:
+                logger.warning("Gemini API call failed: %s", e)
+
+        missing = [i for i in pending if results[i] is None]
+        if missing:
+            with ThreadPoolExecutor(max_workers=settings.VIVA_EVALUATION_CONCURRENCY) as pool:
+                graded = pool.map(lambda i: self.evaluate_viva_answer(qa_pairs[i][0], qa_pairs[i][1], abstract), missing)
+                for i, result in zip(missing, graded):
+                    results[i] = result
+        return results
+
+    async def aevaluate_viva_answers(self, qa_pairs, abstract):
+        """Async evaluate_viva_answers; the fallback calls share a semaphore instead of a pool."""
+        results, pending = self._split_viva_batch(qa_pairs)
+        if pending:
+            try:
+                batch_text = await self._agenerate(
+                    'viva_batch_evaluation', self._viva_batch_prompt(qa_pairs, pending, abstract)
+                )
+                self._parse_viva_batch(batch_text, pending, results)
+            except LLMBusy:
+                raise
+            except Exception as e:
+                logger.warning("Gemini API call failed: %s", e)
+
+        missing = [i for i in pending if results[i] is None]
+        if missing:
+            limit = asyncio.Semaphore(settings.VIVA_EVALUATION_CONCURRENCY)
+
+            async def grade(i):
+                async with limit:
+                    return await self.aevaluate_viva_answer(qa_pairs[i][0], qa_pairs[i][1], abstract)
+
+            for i, result in zip(missing, await asyncio.gather(*(grade(i) for i in missing))):
+                results[i] = result
+        return results
+
 
 # Create a single instance
 analyzer = ProjectAnalyzer()
@@ -1,6 +1,9 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from .database import postgres_config, sqlite_config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-your-secret-key-here'
@@ -28,6 +31,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'authentication.User'
 
 MIDDLEWARE = [
+    'project_management.metrics.MetricsMiddleware',  # first, so it times the whole request
+    'project_management.profiling.ProfilingMiddleware',  # removes itself unless REQUEST_PROFILING is enabled
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -71,12 +76,33 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'project_management.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# PostgreSQL when DATABASE_URL is set (see project_management/database.py),
+# otherwise a local SQLite file for development; SQLITE_WAL=1 switches it to
+# WAL mode (a lasting change to the file) for web and worker processes side by side.
+# DB_POOL: '' (persistent connections), 'django' (psycopg pool) or 'pgbouncer'.
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+SQLITE_WAL = os.environ.get('SQLITE_WAL', '') == '1'
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL', '')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DB_POOL = os.environ.get('DB_POOL', '')
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+
+if DATABASE_URL:
+    DATABASES = {
+        'default': postgres_config(DATABASE_URL, DB_CONN_MAX_AGE, DB_POOL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
     }
-}
+    if DATABASE_REPLICA_URL:
+        DATABASES['replica'] = postgres_config(
+            DATABASE_REPLICA_URL, DB_CONN_MAX_AGE, DB_POOL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+        )
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+else:
+    DATABASES = {
+        'default': sqlite_config(BASE_DIR / 'db.sqlite3', wal=SQLITE_WAL),
+    }
+# Read-only dashboards read from the 'replica' alias when it exists
+DATABASE_ROUTERS = ['project_management.database.ReadReplicaRouter']
 
 AUTH_PASSWORD_VALIDATORS = [
     { 'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator' },
@@ -94,7 +120,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.tokens.ClaimsJWTAuthentication',
     ),
 }
 
@@ -113,14 +139,154 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'USER_MODEL': 'authentication.User',
+    # Access tokens carry role and group claims (authentication/tokens.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'authentication.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.ClaimsTokenRefreshSerializer',
+}
+
+# Cache shared by the workers on this machine (a file-based one needs no server);
+# point it at Redis or Memcached when the web workers run on several machines.
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'shared_cache',
+    },
 }
+# Where role or membership changes are recorded, making older JWT claims stale;
+# every worker must see it
+JWT_CLAIMS_CACHE = 'shared'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads are streamed in chunks to temporary files, never held in memory
+# (validation and text extraction run in the analysis job, see authentication/uploads.py)
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+ABSTRACT_FILE_MAX_BYTES = 20 * 1024 * 1024
+AUDIO_FILE_MAX_BYTES = 200 * 1024 * 1024
+ABSTRACT_EXTRACT_MAX_CHARS = 20000
 APPEND_SLASH = False
 #GEMINI_API_KEY = ""
 
+# Transport for Gemini calls (project_management/llm_transport.py): 'gemini' (the API,
+# needs GEMINI_API_KEY), 'rest' (the REST API at OPTIONS={'url': ...}, e.g. a local
+# `manage.py run_fake_gemini`) or 'stub' (canned replies in process, OPTIONS={'latency': ...}).
+LLM_TRANSPORT = {
+    'BACKEND': 'gemini',
+    'MODEL': 'gemini-2.0-flash',
+    'OPTIONS': {},
+}
+
 GEMINI_API_KEY = ""
 
+# Plagiarism pre-screening: nearest-neighbour search over stored embeddings.
+# Backend is 'brute' (exact) or 'ivf' (approximate, for large archives).
+SIMILARITY_INDEX_BACKEND = 'brute'
+SIMILARITY_INDEX_OPTIONS = {}  # e.g. {'nlist': 256, 'nprobe': 8, 'retrain_growth': 2.0} for 'ivf'
+SIMILARITY_TOP_K = 5
+SIMILARITY_MIN_SCORE = 0.2
+SIMILARITY_FALLBACK_LIMIT = 50  # used when no embedding is available
+
+# CPU embedding backend used for submission vectors (project_management/embeddings.py).
+# 'hashing' needs only NumPy; 'onnx' takes {'model_path': ..., 'tokenizer_path': ...}.
+EMBEDDING_BACKEND = {
+    'NAME': 'hashing',
+    'OPTIONS': {'dim': 512},
+}
+# Storage format of ProjectSubmission.embedding_vector: 'float32' or 'int8' (4x smaller)
+EMBEDDING_STORAGE_DTYPE = 'float32'
+
+# Submissions are analysed by background workers (`manage.py run_worker`).
+# Set ANALYSIS_ASYNC = False to run the analysis inside the request instead.
+ANALYSIS_ASYNC = True
+JOB_QUEUE = {
+    'CONCURRENCY': 4,            # jobs running at once per worker process
+    'MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF_SECONDS': 5,  # doubled after every failed attempt, with jitter
+    'LEASE_SECONDS': 300,        # a Running job whose lease went unrenewed this long is requeued
+    'POLL_INTERVAL': 1.0,
+}
+
+# Cache for identical ProjectAnalyzer prompts (project_management/llm_cache.py).
+# BACKEND: 'memory' (per process), 'sqlite' (shared file, OPTIONS={'path': ...}),
+# 'django' (OPTIONS={'alias': 'default'}) or None to disable.
+LLM_CACHE = {
+    'BACKEND': 'memory',
+    'TTL': 60 * 60 * 24,
+    'MAX_ENTRIES': 2048,
+    'OPTIONS': {},
+}
+
+# Admission control for Gemini calls (project_management/llm_limits.py).
+# RATE_LIMIT_BACKEND: 'sqlite' (bucket shared by the workers on the machine,
+# OPTIONS={'path': ...}), 'memory' (per process) or None to disable.
+LLM_LIMITS = {
+    'RATE_LIMIT_BACKEND': 'sqlite',
+    'REQUESTS_PER_MINUTE': 1000,  # keep below the project's Gemini quota
+    'BURST': 50,
+    'MAX_CONCURRENCY': 32,  # upstream calls in flight per process; further calls queue fairly per user
+    'QUEUE_TIMEOUT': 20,  # seconds a call may wait before failing with 503
+    'OPTIONS': {},
+}
 
+# Failure handling for Gemini calls (project_management/llm_resilience.py)
+LLM_RESILIENCE = {
+    'RETRIES': 2,  # for 5xx, 429, timeouts and connection errors
+    'BACKOFF_BASE': 0.5,  # seconds; full jitter up to BACKOFF_BASE * 2 ** attempt
+    'BACKOFF_MAX': 8,
+    'HEDGE_AFTER': None,  # seconds (about the p95 latency) before a second request is sent; None disables
+    'BREAKER': {'FAILURE_RATE': 0.5, 'WINDOW': 20, 'MIN_CALLS': 10, 'OPEN_SECONDS': 30},
+}
+
+# Speech-to-text for audio abstracts and chatbot prompts (project_management/transcription.py).
+# Runs only in `manage.py run_worker --queue transcription`. Off by default: set
+# TRANSCRIPTION_BACKEND=faster-whisper for the web and transcription processes and install
+# faster-whisper on the transcription workers. Without it, audio abstracts are stored but
+# not transcribed, and voice prompts are refused.
+TRANSCRIPTION_BACKEND = {
+    'NAME': os.environ.get('TRANSCRIPTION_BACKEND', ''),
+    'OPTIONS': {'model_size': 'base.en', 'compute_type': 'int8', 'cpu_threads': 2, 'chunk_seconds': 30},
+}
+TRANSCRIPTION_CHAT_OPTIONS = {'model_size': 'tiny.en'}  # short prompts favour latency
+TRANSCRIPTION_MODEL_CACHE_SIZE = 2  # models kept loaded per worker process
+TRANSCRIPTION_WAIT_SECONDS = 20  # how long the chatbot waits for a transcript before answering 202
 
+# Chatbot conversation memory (authentication/chat.py). Token counts are estimates.
+CHAT_HISTORY_TOKEN_BUDGET = 2000  # recent messages sent verbatim with each prompt
+CHAT_SUMMARY_TRIGGER_TOKENS = 3000  # unsummarized messages that trigger a summarize_chat job
+CHAT_SUMMARY_MAX_CHARS = 2000
+CHAT_PROJECT_CONTEXT_MAX_CHARS = 1500  # abstract excerpt in the cached project context
+# Shared by all workers so signals.py invalidations reach every process; the TTL
+# bounds staleness after changes that bypass the signals (QuerySet.update)
+CHAT_PROJECT_CONTEXT_CACHE = 'shared'
+CHAT_PROJECT_CONTEXT_TTL = 60 * 60
+
+# Upper bounds for the batch viva evaluation endpoint
+VIVA_BATCH_MAX_ANSWERS = 20
+VIVA_EVALUATION_CONCURRENCY = 4  # parallel single-answer calls when the batch reply is incomplete
+
+# Upper bound for the bulk review endpoint (teacher/submissions/bulk-review/)
+BULK_REVIEW_MAX_ITEMS = 200
+
+# Run the similarity and scoring prompts of a submission analysis concurrently
+ANALYSIS_FANOUT = True
+ANALYSIS_FANOUT_WORKERS = 8
+LLM_CALL_TIMEOUT = 30  # seconds per Gemini call (client timeout; also the fan-out deadline)
+
+# Prometheus scrape endpoint /metrics (project_management/metrics.py). When set,
+# scrapes must send "Authorization: Bearer <token>"; empty leaves it open.
+METRICS_AUTH_TOKEN = os.environ.get('METRICS_AUTH_TOKEN', '')
+
+# Request profiling (project_management/profiling.py). When enabled, requests sending
+# "X-Profile: <manage.py profile_token>", and a SAMPLE_RATE share of the others, get a
+# flamegraph (folded stacks) and a SQL/Gemini report in OUTPUT_DIR; requests slower
+# than SLOW_MS are logged to OUTPUT_DIR/slow.log.
+REQUEST_PROFILING = {
+    'ENABLED': os.environ.get('REQUEST_PROFILING', '') == '1',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', 0)),
+    'SLOW_MS': 1000,
+    'INTERVAL_MS': 2,  # stack sampling period
+    'TOP': 15,  # offenders listed per profile
+    'TOKEN_MAX_AGE': 60 * 60,  # seconds an X-Profile token stays valid
+    'OUTPUT_DIR': BASE_DIR / 'profiles',
+}
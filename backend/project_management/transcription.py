@@ -0,0 +1,184 @@
+"""
+CPU speech-to-text for audio abstracts and chatbot prompts.
+
+Transcription only runs in the ``transcription`` job queue
+(``manage.py run_worker --queue transcription``); web workers never import a
+model. Backends expose ``transcribe(path) -> Transcript`` and
+``model_version``. The active backend is chosen by
+``settings.TRANSCRIPTION_BACKEND``:
+
+    TRANSCRIPTION_BACKEND = {'NAME': 'faster-whisper', 'OPTIONS': {'model_size': 'base.en'}}
+
+An empty NAME (the default) disables transcription; see ``transcription_enabled``.
+
+* ``faster-whisper`` – Whisper on CTranslate2 with int8 weights. Needs the
+  optional ``faster-whisper`` package (which brings PyAV for decoding).
+
+Audio is decoded and transcribed in fixed windows of ``chunk_seconds``, so
+memory stays flat however long the recording is. Loaded models are kept in a
+small LRU cache (``TRANSCRIPTION_MODEL_CACHE_SIZE``).
+"""
+import json
+import threading
+import time
+import wave
+from collections import OrderedDict, namedtuple
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+
+SAMPLE_RATE = 16000
+
+Transcript = namedtuple('Transcript', ['text', 'duration', 'elapsed'])
+
+
+class TranscriptionUnavailable(Exception):
+    """Raised when no transcription backend is configured or installed."""
+
+
+def _resample(samples, rate):
+    if rate == SAMPLE_RATE or len(samples) == 0:
+        return samples
+    positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _wav_chunks(path, chunk_seconds):
+    with wave.open(str(path), 'rb') as audio:
+        width, channels, rate = audio.getsampwidth(), audio.getnchannels(), audio.getframerate()
+        if width not in (1, 2, 4):
+            raise wave.Error(f"Unsupported sample width {width}")
+        frames_per_chunk = int(chunk_seconds * rate)
+        while True:
+            raw = audio.readframes(frames_per_chunk)
+            if not raw:
+                break
+            if width == 1:
+                samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+            else:
+                dtype = np.int16 if width == 2 else np.int32
+                samples = np.frombuffer(raw, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+            yield _resample(samples.reshape(-1, channels).mean(axis=1), rate)
+
+
+def _av_chunks(path, chunk_seconds):
+    try:
+        import av
+    except ImportError as exc:
+        raise TranscriptionUnavailable("Decoding compressed audio needs the 'av' package.") from exc
+
+    chunk_size = int(chunk_seconds * SAMPLE_RATE)
+    buffered, size = [], 0
+    with av.open(str(path)) as container:
+        resampler = av.AudioResampler(format='s16', layout='mono', rate=SAMPLE_RATE)
+        # The trailing None flushes the resampler
+        for frame in chain(container.decode(audio=0), [None]):
+            for out in resampler.resample(frame):
+                samples = out.to_ndarray().reshape(-1).astype(np.float32) / 32768
+                buffered.append(samples)
+                size += len(samples)
+                if size >= chunk_size:
+                    joined = np.concatenate(buffered)
+                    yield joined[:chunk_size]
+                    buffered, size = [joined[chunk_size:]], len(joined) - chunk_size
+    if size:
+        yield np.concatenate(buffered)
+
+
+def iter_audio_chunks(path, chunk_seconds=30):
+    """Yields mono 16 kHz float32 windows of ``chunk_seconds`` from an audio file."""
+    try:
+        yield from _wav_chunks(path, chunk_seconds)
+    except (wave.Error, EOFError):
+        yield from _av_chunks(path, chunk_seconds)
+
+
+class WhisperTranscriber:
+    """Whisper via faster-whisper (CTranslate2), quantized for CPU."""
+
+    def __init__(self, model_size='base.en', compute_type='int8', cpu_threads=2,
+                 chunk_seconds=30, beam_size=1, language=None, download_root=None):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as exc:
+            raise TranscriptionUnavailable(
+                "The 'faster-whisper' transcription backend needs the faster-whisper package."
+            ) from exc
+
+        self.model = WhisperModel(
+            model_size, device='cpu', compute_type=compute_type,
+            cpu_threads=cpu_threads, num_workers=1, download_root=download_root,
+        )
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.chunk_seconds = chunk_seconds
+        self.beam_size = beam_size
+        self.language = language
+
+    @property
+    def model_version(self):
+        return f"faster-whisper-{self.model_size}-{self.compute_type}"
+
+    def stream(self, path):
+        """Yields the text of each audio window as soon as it is decoded."""
+        for samples in iter_audio_chunks(path, self.chunk_seconds):
+            segments, _ = self.model.transcribe(
+                samples, beam_size=self.beam_size, language=self.language,
+                condition_on_previous_text=False, vad_filter=False,
+            )
+            yield len(samples) / SAMPLE_RATE, ' '.join(s.text.strip() for s in segments)
+
+    def transcribe(self, path):
+        start = time.perf_counter()
+        duration, parts = 0.0, []
+        for seconds, text in self.stream(path):
+            duration += seconds
+            if text:
+                parts.append(text)
+        return Transcript(' '.join(parts), duration, time.perf_counter() - start)
+
+
+TRANSCRIPTION_BACKENDS = {
+    'faster-whisper': WhisperTranscriber,
+}
+
+_models = OrderedDict()
+_models_lock = threading.Lock()
+
+
+def create_transcriber(name, **options):
+    try:
+        backend_class = TRANSCRIPTION_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown transcription backend '{name}'.")
+    return backend_class(**options)
+
+
+def transcription_enabled():
+    """Whether a transcription backend is configured, so audio jobs are worth queueing."""
+    config = getattr(settings, 'TRANSCRIPTION_BACKEND', None)
+    return bool(config and config.get('NAME'))
+
+
+def get_transcriber(**overrides):
+    """
+    Returns a transcriber for the configured backend, with ``overrides``
+    applied to its options. Models are loaded once per process and the
+    least recently used one is dropped when the cache is full.
+    """
+    if not transcription_enabled():
+        raise TranscriptionUnavailable("No TRANSCRIPTION_BACKEND is configured.")
+    config = settings.TRANSCRIPTION_BACKEND
+    options = {**config.get('OPTIONS', {}), **overrides}
+    key = (config['NAME'], json.dumps(options, sort_keys=True, default=str))
+
+    with _models_lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+        transcriber = create_transcriber(config['NAME'], **options)
+        _models[key] = transcriber
+        while len(_models) > settings.TRANSCRIPTION_MODEL_CACHE_SIZE:
+            _models.popitem(last=False)
+        return transcriber
@@ -4,13 +4,21 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from project_management.metrics import metrics_view
+
 from authentication.views import (
     ProjectSubmissionView,
+    SubmissionAnalysisView,
     TeacherDashboardView,
+    TeacherBulkReviewView,
     StudentDashboardView,
     AIChatbotView,
+    AIChatStreamView,
+    AIMetricsView,
+    TranscriptionJobView,
     AIVivaView,
     AIVivaEvaluationView,
+    AIVivaBatchEvaluationView,
     ProjectArchiveView,
     AnalyticsView,
     LeaderboardView,
@@ -26,7 +34,8 @@ from authentication.views import (
 )
 
 urlpatterns = [
-    # Admin
+    # Admin (the dashboard route must come before the admin site, which would swallow it)
+    path('admin/dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
     path('admin/', admin.site.urls),
     
     # Authentication
@@ -35,19 +44,28 @@ urlpatterns = [
     
     # Project submission
     path('projects/submit/', ProjectSubmissionView.as_view(), name='project-submit'),
+    path('projects/submit/<int:submission_id>/analysis/', SubmissionAnalysisView.as_view(), name='submission-analysis'),
 
     # Teacher dashboard
     path('teacher/submissions/', TeacherDashboardView.as_view(), name='teacher-submissions'),
     path('teacher/submissions/<int:submission_id>/', TeacherDashboardView.as_view(), name='teacher-submission-detail'),
+    path('teacher/submissions/bulk-review/', TeacherBulkReviewView.as_view(), name='teacher-submissions-bulk-review'),
     
     # Student dashboard
     path('student/submissions/', StudentDashboardView.as_view(), name='student-submissions'),
     
     # AI features
     path('ai/chat/', AIChatbotView.as_view(), name='ai-chat'),
+    path('ai/chat/stream/', AIChatStreamView.as_view(), name='ai-chat-stream'),
+    path('ai/metrics/', AIMetricsView.as_view(), name='ai-metrics'),
+    path('ai/transcriptions/<int:job_id>/', TranscriptionJobView.as_view(), name='transcription-job'),
     path('ai/viva/', AIVivaView.as_view(), name='ai-viva'),
     path('ai/viva/evaluate/', AIVivaEvaluationView.as_view(), name='ai-viva-evaluate'),
+    path('ai/viva/evaluate/batch/', AIVivaBatchEvaluationView.as_view(), name='ai-viva-evaluate-batch'),
     
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+
     # Project archive
     path('projects/archive/<int:project_id>/', ProjectArchiveView.as_view(), name='project-archive'),
     
@@ -62,9 +80,6 @@ urlpatterns = [
     # All projects
     path('projects/all/', AllProjectsView.as_view(), name='projects-all'),
     
-    # Admin dashboard
-    path('admin/dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
-    
     # Teacher appointment dashboards
     path('teacher/appointed/', AppointedTeacherDashboard.as_view(), name='teacher-appointed-submissions'),
     path('teacher/unappointed/', UnappointedTeacherDashboard.as_view(), name='teacher-unappointed-submissions'),
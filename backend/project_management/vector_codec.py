@@ -0,0 +1,48 @@
+"""
+Binary encoding of embedding vectors for ``ProjectSubmission.embedding_vector``.
+
+Vectors are stored as raw little-endian bytes, either ``float32`` or ``int8``
+with a per-vector scale (symmetric quantisation). A stored row can be viewed
+as a NumPy array with ``np.frombuffer`` without parsing any text.
+"""
+import numpy as np
+
+DTYPES = {
+    'float32': np.dtype('<f4'),
+    'int8': np.dtype('i1'),
+}
+
+
+def pack_vector(vector, dtype='float32'):
+    """Returns ``(bytes, scale)`` for a 1-D vector; ``scale`` is None for float32."""
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    if dtype == 'float32':
+        return vector.astype(DTYPES['float32']).tobytes(), None
+    if dtype == 'int8':
+        peak = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = peak / 127.0 if peak else 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(DTYPES['int8'])
+        return quantized.tobytes(), scale
+    raise ValueError(f"Unsupported embedding dtype '{dtype}'.")
+
+
+def unpack_vector(data, dtype='float32', scale=None):
+    """Returns the stored vector as float32 (a read-only view for float32 rows)."""
+    vector = np.frombuffer(data, dtype=DTYPES[dtype])
+    if dtype == 'int8':
+        return vector.astype(np.float32) * np.float32(scale or 1.0)
+    return vector
+
+
+def stack_vectors(blobs, dim, dtype='float32', scales=None):
+    """
+    Builds an (n, dim) float32 matrix from same-typed stored rows. The rows
+    are joined into one contiguous buffer and viewed with ``np.frombuffer``,
+    so float32 archives are loaded without any per-element conversion.
+    """
+    if not blobs:
+        return np.empty((0, dim), dtype=np.float32)
+    matrix = np.frombuffer(b''.join(blobs), dtype=DTYPES[dtype]).reshape(len(blobs), dim)
+    if dtype == 'int8':
+        return matrix.astype(np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
+    return matrix
@@ -0,0 +1,159 @@
+"""
+In-process similarity index used to pre-screen new project ideas.
+
+Vectors are L2-normalised on insert so a dot product is the cosine
+similarity. Two implementations share the same interface:
+
+* ``BruteForceIndex`` – exact top-k with a single matrix multiply.
+* ``IVFIndex``        – approximate top-k (inverted file over k-means
+  centroids); only ``nprobe`` clusters are scanned, then re-ranked exactly.
+  The centroids are retrained once the index has grown ``retrain_growth``
+  times past the size they were trained on.
+"""
+import numpy as np
+
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class BruteForceIndex:
+    """Exact cosine top-k over an (n, dim) float32 matrix."""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    def add(self, ids, vectors):
+        """Append vectors (one row per id) to the index."""
+        if len(ids) == 0:
+            return
+        vectors = _normalize(vectors)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim vectors, got {vectors.shape[1]}.")
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.vectors = np.vstack([self.vectors, vectors])
+
+    def search(self, query, k=5):
+        """Returns ``[(id, score), ...]`` for the k nearest vectors."""
+        if not len(self):
+            return []
+        query = _normalize(query)[0]
+        scores = self.vectors @ query
+        best = _top_k(scores, k)
+        return [(int(self.ids[i]), float(scores[i])) for i in best]
+
+
+class IVFIndex(BruteForceIndex):
+    """
+    Approximate cosine top-k. Vectors are bucketed by their nearest k-means
+    centroid; a query only scans the ``nprobe`` closest buckets.
+    """
+
+    def __init__(self, dim, nlist=None, nprobe=8, train_iterations=10, seed=0, retrain_growth=2.0):
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.retrain_growth = retrain_growth
+        self.trained_size = 0
+        self.centroids = None
+        self.assignments = np.empty(0, dtype=np.int64)
+        self._lists = None
+
+    def train(self):
+        """(Re)build centroids from the vectors currently in the index."""
+        n = len(self)
+        if n == 0:
+            return
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(self.seed)
+
+        sample = self.vectors
+        if n > nlist * 64:
+            sample = self.vectors[rng.choice(n, nlist * 64, replace=False)]
+
+        centroids = sample[rng.choice(sample.shape[0], nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if members.shape[0]:
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        self.centroids = centroids
+        self.trained_size = n
+        self.assignments = self._assign(self.vectors)
+        self._lists = None
+
+    def _assign(self, vectors):
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int64)
+
+    def add(self, ids, vectors):
+        start = len(self)
+        super().add(ids, vectors)
+        if self.centroids is None or len(self) > self.trained_size * self.retrain_growth:
+            # centroids fitted to a much smaller set give unbalanced, less accurate lists
+            self.train()
+        elif len(self) > start:
+            self.assignments = np.concatenate([self.assignments, self._assign(self.vectors[start:])])
+            self._lists = None
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind='stable')
+            bounds = np.searchsorted(self.assignments[order], np.arange(self.centroids.shape[0] + 1))
+            self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(self.centroids.shape[0])]
+        return self._lists
+
+    def search(self, query, k=5):
+        if not len(self):
+            return []
+        query = _normalize(query)[0]
+        lists = self._inverted_lists()
+        probes = _top_k(self.centroids @ query, self.nprobe)
+        rows = np.concatenate([lists[c] for c in probes])
+        if rows.shape[0] < k:
+            return super().search(query, k)
+        scores = self.vectors[rows] @ query
+        best = _top_k(scores, k)
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in best]
+
+
+INDEX_BACKENDS = {
+    'brute': BruteForceIndex,
+    'ivf': IVFIndex,
+}
+
+
+def build_index(backend, dim, **options):
+    """Instantiates the index class registered under ``backend``."""
+    try:
+        index_class = INDEX_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown similarity index backend '{backend}'.")
+    return index_class(dim, **options)
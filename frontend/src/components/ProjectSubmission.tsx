@@ -23,6 +23,22 @@ import { FileText, Mic, Send, AlertTriangle } from 'lucide-react';
 
 const MotionBox = motion(Box);
 
+const API_BASE = 'http://127.0.0.1:8000';
+const BLOCKED_DETAIL = 'Submission Blocked: High Similarity Detected. Please revise your idea.';
+const POLL_INTERVAL_MS = 2000;
+const POLL_TIMEOUT_MS = 3 * 60 * 1000;
+
+// Polls the analysis of a queued submission until it leaves 'Pending Analysis'; null on timeout.
+const waitForAnalysis = async (analysisUrl: string, headers: Record<string, string>) => {
+  const deadline = Date.now() + POLL_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+    const { data } = await axios.get(`${API_BASE}${analysisUrl}`, { headers });
+    if (data.status !== 'Pending Analysis') return data;
+  }
+  return null;
+};
+
 // --- Main Component ---
 const ProjectSubmission: React.FC = () => {
   const [title, setTitle] = useState('');
@@ -63,16 +79,26 @@ const ProjectSubmission: React.FC = () => {
         return;
       }
 
-      await axios.post('http://127.0.0.1:8000/projects/submit/', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-          Authorization: `Bearer ${token}`,
-        },
+      const headers = { Authorization: `Bearer ${token}` };
+      const response = await axios.post(`${API_BASE}/projects/submit/`, formData, {
+        headers: { ...headers, 'Content-Type': 'multipart/form-data' },
       });
 
+      // 202: the AI pre-screening runs in the background (201/409 when the server analyses inline)
+      let description = 'Your project has been sent for review.';
+      if (response.status === 202) {
+        const analysis = await waitForAnalysis(response.data.analysis_url, headers);
+        if (analysis && analysis.status === 'Blocked') {
+          setSubmissionError(BLOCKED_DETAIL);
+          if (analysis.similar_project) setSimilarProject(analysis.similar_project);
+          return;
+        }
+        if (!analysis) description = 'Your project is still being analysed and will then be sent for review.';
+      }
+
       toast({
         title: 'Submission Successful!',
-        description: 'Your project has been sent for review.',
+        description,
         status: 'success',
         duration: 4000,
         isClosable: true,
@@ -24,10 +24,12 @@ import { motion } from 'framer-motion';
 import { ArrowRight, Lock, Plus } from 'lucide-react';
 
 // --- Interfaces & Animation Variants ---
+// 'Pending Analysis' and 'Blocked' are the student's own attempts that the
+// background similarity check has not cleared (yet); teachers never see them.
 interface Submission {
   id: number;
   title: string;
-  status: 'Pending' | 'Approved' | 'Rejected' | 'In Progress';
+  status: 'Pending Analysis' | 'Blocked' | 'Submitted' | 'Approved' | 'Rejected' | 'In Progress' | 'Completed' | 'Archived';
   progress: number | null;
 }
 
@@ -148,6 +150,10 @@ const StudentDashboard: React.FC = () => {
         return { colorScheme: 'yellow', text: 'In Progress' };
       case 'Rejected':
         return { colorScheme: 'red', text: 'Rejected' };
+      case 'Blocked':
+        return { colorScheme: 'red', text: 'Blocked: too similar' };
+      case 'Pending Analysis':
+        return { colorScheme: 'purple', text: 'Analysing' };
       default:
         return { colorScheme: 'gray', text: 'Pending' };
     }